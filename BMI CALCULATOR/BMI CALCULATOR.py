@@ -1,10 +1,13 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import json
 import os
 from datetime import datetime
-import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from bmi_export import HistoryExporter
+from bmi_io import SaveWorker
+from bmi_storage import open_store
+from bmi_trends import TrendCache, build_trend_figure
+from bmi_widgets import VirtualTable
 
 class BMICalculator:
     def __init__(self):
@@ -14,8 +17,10 @@ class BMICalculator:
         self.root.configure(bg='#000000')
         
         # Data file setup
-        self.data_file = "user_data.json"
+        # Prefer a SQLite database once one has been migrated from the JSON file
+        self.data_file = "user_data.db" if os.path.exists("user_data.db") else "user_data.json"
         self.load_data()
+        self.trend_cache = TrendCache()
         
         # Current user
         self.current_user = tk.StringVar()
@@ -58,15 +63,12 @@ class BMICalculator:
                       foreground=[('selected', '#FFFFFF')])
     
     def load_data(self):
-        """Load user data from JSON file"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    self.user_data = json.load(f)
-            except:
-                self.user_data = {}
-        else:
-            self.user_data = {}
+        """Open the storage backend for the user data file"""
+        # Changes update memory right away; the save worker writes them to disk
+        self.store = open_store(self.data_file, deferred=True)
+        self.save_worker = SaveWorker(self.store, self.root, on_error=self.show_save_error)
+        self.save_worker.start()
+        self.root.bind('<Control-D>', lambda e: self.show_save_diagnostics())
     
     def create_interface(self):
         """Create the black-themed GUI interface"""
@@ -84,8 +86,11 @@ class BMICalculator:
         
         self.user_combo = ttk.Combobox(user_frame, textvariable=self.current_user, 
                                      style='Custom.TCombobox', width=15)
-        self.user_combo['values'] = list(self.user_data.keys())
+        self.user_combo['values'] = self.store.users()
         self.user_combo.pack(side=tk.LEFT, padx=5, pady=10)
+        # Records are only read from disk once a user is picked
+        self.user_combo.bind('<<ComboboxSelected>>',
+                             lambda e: self.store.preload(self.current_user.get()))
         
         tk.Button(user_frame, text="➕ New User", command=self.add_new_user,
                  bg='#333333', fg='#FFFFFF', font=('Arial', 10, 'bold'),
@@ -260,10 +265,9 @@ class BMICalculator:
         def save_user():
             username = username_var.get().strip()
             if username:
-                if username not in self.user_data:
-                    self.user_data[username] = []
-                    self.save_data()
-                    self.user_combo['values'] = list(self.user_data.keys())
+                if not self.store.has_user(username):
+                    self.save_data(self.store.add_user, username)
+                    self.user_combo['values'] = self.store.users()
                     self.current_user.set(username)
                     user_window.destroy()
                     messagebox.showinfo("✅ Success", f"User '{username}' added successfully!")
@@ -281,8 +285,6 @@ class BMICalculator:
     def save_bmi_data(self, weight, height, bmi, category):
         """Save BMI calculation to user data"""
         username = self.current_user.get()
-        if username not in self.user_data:
-            self.user_data[username] = []
         
         entry = {
             'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -292,17 +294,25 @@ class BMICalculator:
             'category': category
         }
         
-        self.user_data[username].append(entry)
-        self.save_data()
+        self.save_data(self.store.append_record, username, entry)
+        self.trend_cache.invalidate(username)
     
-    def save_data(self):
-        """Save data to JSON file"""
+    def save_data(self, action, *args):
+        """Apply a change through the storage backend and queue it for saving"""
         try:
-            with open(self.data_file, 'w') as f:
-                json.dump(self.user_data, f, indent=2)
+            action(*args)
+            self.save_worker.request_flush()
         except Exception as e:
             messagebox.showerror("❌ Save Error", f"Could not save data: {str(e)}")
     
+    def show_save_error(self, error):
+        """Report a failed background save"""
+        messagebox.showerror("❌ Save Error", f"Could not save data: {str(error)}")
+    
+    def show_save_diagnostics(self):
+        """Show the save latency histogram (Ctrl+Shift+D)"""
+        messagebox.showinfo("🩺 Save Latency", self.save_worker.latency.summary())
+    
     def show_history(self):
         """Display user's BMI history with FIXED dark theme display"""
         username = self.current_user.get()
@@ -310,7 +320,7 @@ class BMICalculator:
             messagebox.showwarning("⚠️ No User", "Please select a user first!")
             return
             
-        if username not in self.user_data or not self.user_data[username]:
+        if not self.store.count(username):
             messagebox.showinfo("ℹ️ No Data", "No BMI history found for this user!")
             return
         
@@ -328,45 +338,34 @@ class BMICalculator:
         main_frame = tk.Frame(history_window, bg='#1a1a1a', relief=tk.RAISED, bd=2)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # FIXED: Using Text widget instead of Treeview for better dark theme support
-        history_text = tk.Text(main_frame, font=('Courier', 11), bg='#2a2a2a', fg='#FFFFFF',
-                              insertbackground='#FFFFFF', selectbackground='#4a4a4a',
-                              selectforeground='#FFFFFF', bd=0, wrap=tk.NONE)
+        # Column header stays fixed above the scrolling rows
+        header = f"{'#':<6} {'Date & Time':<20} {'Weight (kg)':<12} {'Height (cm)':<12} {'BMI':<8} {'Category':<12}\n"
+        header += "=" * 80
         
-        # Add scrollbars
-        v_scrollbar = tk.Scrollbar(main_frame, orient=tk.VERTICAL, command=history_text.yview)
-        h_scrollbar = tk.Scrollbar(main_frame, orient=tk.HORIZONTAL, command=history_text.xview)
+        tk.Label(main_frame, text=header, font=('Courier', 11), bg='#2a2a2a', fg='#FFFFFF',
+                justify=tk.LEFT, anchor='w').pack(fill=tk.X)
         
-        history_text.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        count = self.store.count(username)
         
-        # Create header
-        header = f"{'#':<3} {'Date & Time':<20} {'Weight (kg)':<12} {'Height (cm)':<12} {'BMI':<8} {'Category':<12}\n"
-        header += "=" * 80 + "\n"
+        def fetch_rows(start, stop):
+            # Row 0 is the newest record, so read the matching slice and reverse it
+            return self.store.records_slice(username, count - stop, count - start)[::-1]
         
-        history_text.insert(tk.END, header)
-        
-        # Add data rows with proper formatting
-        for i, entry in enumerate(reversed(self.user_data[username]), 1):
+        def format_row(index, entry):
             date_str = entry['date'][:16]  # Truncate seconds for display
             weight_str = f"{entry['weight']:.1f}"
             height_str = f"{entry['height']:.0f}"
             bmi_str = f"{entry['bmi']:.1f}"
             category_str = entry['category']
             
-            row = f"{i:<3} {date_str:<20} {weight_str:<12} {height_str:<12} {bmi_str:<8} {category_str:<12}\n"
-            history_text.insert(tk.END, row)
-        
-        # Make text widget read-only
-        history_text.config(state=tk.DISABLED)
-        
-        # Pack everything
-        history_text.grid(row=0, column=0, sticky='nsew')
-        v_scrollbar.grid(row=0, column=1, sticky='ns')
-        h_scrollbar.grid(row=1, column=0, sticky='ew')
+            return f"{index + 1:<6} {date_str:<20} {weight_str:<12} {height_str:<12} {bmi_str:<8} {category_str:<12}"
         
-        # Configure grid weights
-        main_frame.grid_rowconfigure(0, weight=1)
-        main_frame.grid_columnconfigure(0, weight=1)
+        # Only the rows in view are fetched and formatted, however long the history is
+        history_table = VirtualTable(main_frame, count, fetch_rows, format_row,
+                                     font=('Courier', 11), bg='#2a2a2a', fg='#FFFFFF',
+                                     insertbackground='#FFFFFF', selectbackground='#4a4a4a',
+                                     selectforeground='#FFFFFF', bd=0)
+        history_table.pack(fill=tk.BOTH, expand=True)
         
         # Add statistics at bottom
         self.show_statistics(history_window, username)
@@ -383,72 +382,130 @@ class BMICalculator:
     
     def show_statistics(self, parent_window, username):
         """Show BMI statistics"""
-        data = self.user_data[username]
-        if len(data) < 1:
+        stats = self.store.stats(username)
+        if not stats:
             return
-            
-        bmis = [entry['bmi'] for entry in data]
-        avg_bmi = sum(bmis) / len(bmis)
-        min_bmi = min(bmis)
-        max_bmi = max(bmis)
         
         stats_frame = tk.Frame(parent_window, bg='#1a1a1a', relief=tk.RAISED, bd=2)
         stats_frame.pack(fill=tk.X, padx=10, pady=5)
         
         tk.Label(stats_frame, 
-                text=f"📈 Stats: Records: {len(data)} | Avg BMI: {avg_bmi:.1f} | Min: {min_bmi:.1f} | Max: {max_bmi:.1f}",
+                text=f"📈 Stats: Records: {stats['count']} | Avg BMI: {stats['avg_bmi']:.1f} | Std Dev: {stats['std_bmi']:.1f} | Min: {stats['min_bmi']:.1f} | Max: {stats['max_bmi']:.1f}",
                 font=('Arial', 12, 'bold'), bg='#1a1a1a', fg='#00FF41').pack(pady=10)
     
     def delete_record(self, username):
         """Delete the most recent record"""
-        if username in self.user_data and self.user_data[username]:
+        if self.store.count(username):
             if messagebox.askyesno("Confirm Delete", "Delete the most recent BMI record?"):
-                self.user_data[username].pop()  # Remove last record
-                self.save_data()
+                self.save_data(self.store.delete_latest, username)  # Remove last record
+                self.trend_cache.invalidate(username)
                 messagebox.showinfo("✅ Success", "Record deleted successfully!")
         else:
             messagebox.showwarning("⚠️ No Data", "No records to delete!")
     
     def export_history(self, username):
-        """Export history to file"""
-        if username not in self.user_data or not self.user_data[username]:
+        """Export history to file in the background"""
+        if not self.store.count(username):
             messagebox.showwarning("⚠️ No Data", "No history to export!")
             return
         
-        try:
+        export_window = tk.Toplevel(self.root)
+        export_window.title("Export BMI History")
+        export_window.geometry("420x320")
+        export_window.configure(bg='#000000')
+        
+        tk.Label(export_window, text="💾 Export BMI History", font=('Arial', 14, 'bold'),
+                bg='#000000', fg='#FFFFFF').pack(pady=10)
+        
+        options_frame = tk.Frame(export_window, bg='#1a1a1a', relief=tk.RAISED, bd=2)
+        options_frame.pack(fill=tk.X, padx=20, pady=5)
+        
+        all_users = tk.BooleanVar(value=False)
+        tk.Checkbutton(options_frame, text="Export all users", variable=all_users,
+                      bg='#1a1a1a', fg='#FFFFFF', selectcolor='#333333',
+                      activebackground='#1a1a1a', font=('Arial', 11)).grid(row=0, column=0, columnspan=2, sticky='w', padx=10, pady=5)
+        
+        start_var = tk.StringVar()
+        end_var = tk.StringVar()
+        for row, (text, var) in enumerate([("From (YYYY-MM-DD):", start_var), ("To (YYYY-MM-DD):", end_var)], 1):
+            tk.Label(options_frame, text=text, font=('Arial', 11),
+                    bg='#1a1a1a', fg='#FFFFFF').grid(row=row, column=0, sticky='e', padx=10, pady=5)
+            tk.Entry(options_frame, textvariable=var, font=('Arial', 11), width=14, bg='#333333',
+                    fg='#FFFFFF', insertbackground='#FFFFFF', bd=2, relief=tk.FLAT).grid(row=row, column=1, padx=10, pady=5)
+        
+        progress = ttk.Progressbar(export_window, length=360, mode='determinate')
+        progress.pack(pady=10)
+        status_label = tk.Label(export_window, text="", font=('Arial', 10), bg='#000000', fg='#CCCCCC')
+        status_label.pack()
+        
+        btn_frame = tk.Frame(export_window, bg='#000000')
+        btn_frame.pack(pady=10)
+        
+        def poll(exporter):
+            # The exporter runs on its own thread; read its progress from the Tk loop
+            if not export_window.winfo_exists():
+                # The window was closed mid-export: nothing left to report to
+                exporter.cancel()
+                return
+            if exporter.total:
+                progress['value'] = 100 * exporter.done / exporter.total
+            status_label.config(text=f"{exporter.done:,} / {exporter.total:,} records")
+            if exporter.is_alive():
+                export_window.after(100, poll, exporter)
+                return
+            
+            cancel_button.config(state=tk.DISABLED)
+            export_button.config(state=tk.NORMAL)
+            if exporter.error:
+                messagebox.showerror("❌ Export Error", f"Could not export: {str(exporter.error)}")
+            elif exporter.cancelled:
+                status_label.config(text="Export cancelled")
+            else:
+                messagebox.showinfo("✅ Success", f"{exporter.written:,} records exported to {exporter.filename}")
+                export_window.destroy()
+        
+        def start_export():
             from tkinter import filedialog
             filename = filedialog.asksaveasfilename(
                 defaultextension=".txt",
-                filetypes=[("Text files", "*.txt"), ("JSON files", "*.json")],
+                filetypes=[("Text files", "*.txt"), ("JSON files", "*.json"),
+                           ("CSV files", "*.csv"), ("NDJSON files", "*.ndjson")],
                 title="Export BMI History"
             )
+            if not filename:
+                return
             
-            if filename:
-                if filename.endswith('.json'):
-                    with open(filename, 'w') as f:
-                        json.dump({username: self.user_data[username]}, f, indent=2)
-                else:
-                    with open(filename, 'w') as f:
-                        f.write(f"BMI History for {username}\n")
-                        f.write("=" * 50 + "\n\n")
-                        for i, entry in enumerate(self.user_data[username], 1):
-                            f.write(f"Record #{i}\n")
-                            f.write(f"Date: {entry['date']}\n")
-                            f.write(f"Weight: {entry['weight']:.1f} kg\n")
-                            f.write(f"Height: {entry['height']:.0f} cm\n")
-                            f.write(f"BMI: {entry['bmi']:.1f}\n")
-                            f.write(f"Category: {entry['category']}\n")
-                            f.write("-" * 30 + "\n\n")
-                
-                messagebox.showinfo("✅ Success", f"History exported to {filename}")
-        
-        except Exception as e:
-            messagebox.showerror("❌ Export Error", f"Could not export: {str(e)}")
+            start = start_var.get().strip() or None
+            end = end_var.get().strip() or None
+            try:
+                for value in (start, end):
+                    if value:
+                        datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                messagebox.showerror("❌ Invalid Date", "Dates must be in YYYY-MM-DD format!")
+                return
+            if end:
+                end += ' 23:59:59'  # Include the whole last day
+            
+            users = self.store.users() if all_users.get() else [username]
+            exporter = HistoryExporter(self.store, filename, users, start=start, end=end)
+            cancel_button.config(command=exporter.cancel, state=tk.NORMAL)
+            export_button.config(state=tk.DISABLED)
+            exporter.start()
+            poll(exporter)
+        
+        export_button = tk.Button(btn_frame, text="💾 Choose File & Export", command=start_export,
+                                 bg='#9B5DE5', fg='#FFFFFF', font=('Arial', 10, 'bold'), bd=0, padx=10)
+        export_button.pack(side=tk.LEFT, padx=5)
+        
+        cancel_button = tk.Button(btn_frame, text="✖ Cancel", state=tk.DISABLED,
+                                 bg='#FF3333', fg='#FFFFFF', font=('Arial', 10, 'bold'), bd=0, padx=10)
+        cancel_button.pack(side=tk.LEFT, padx=5)
     
     def show_trends(self):
         """Display BMI trends graph"""
         username = self.current_user.get()
-        if not username or username not in self.user_data or len(self.user_data[username]) < 2:
+        if not username or self.store.count(username) < 2:
             messagebox.showwarning("⚠️ Insufficient Data", "Need at least 2 BMI records to show trends!")
             return
         
@@ -458,36 +515,9 @@ class BMICalculator:
         graph_window.geometry("800x600")
         graph_window.configure(bg='#000000')
         
-        # Prepare data
-        data = self.user_data[username]
-        dates = [datetime.strptime(entry['date'], '%Y-%m-%d %H:%M:%S') for entry in data]
-        bmis = [entry['bmi'] for entry in data]
-        
-        # Create matplotlib figure with dark theme
-        plt.style.use('dark_background')
-        fig, ax = plt.subplots(figsize=(10, 6), facecolor='#000000')
-        ax.set_facecolor('#1a1a1a')
-        
-        # Plot with bright colors
-        ax.plot(dates, bmis, marker='o', linewidth=3, markersize=8, 
-               color='#00FF41', markerfacecolor='#FFFFFF', markeredgecolor='#00FF41')
-        
-        # Add BMI category zones
-        ax.axhspan(0, 18.5, alpha=0.2, color='#00BFFF', label='Underweight')
-        ax.axhspan(18.5, 25, alpha=0.2, color='#00FF41', label='Normal')
-        ax.axhspan(25, 30, alpha=0.2, color='#FFB74D', label='Overweight')
-        ax.axhspan(30, 50, alpha=0.2, color='#FF5252', label='Obese')
-        
-        ax.set_title(f'📈 BMI Trends for {username}', fontsize=16, fontweight='bold', color='#FFFFFF')
-        ax.set_xlabel('Date', fontsize=12, color='#FFFFFF')
-        ax.set_ylabel('BMI', fontsize=12, color='#FFFFFF')
-        ax.grid(True, alpha=0.3, color='#666666')
-        ax.legend(facecolor='#2a2a2a', edgecolor='#666666', labelcolor='#FFFFFF')
-        
-        ax.tick_params(colors='#FFFFFF')
-        plt.xticks(rotation=45, color='#FFFFFF')
-        plt.yticks(color='#FFFFFF')
-        plt.tight_layout()
+        # Reuse the rendered figure until the user's records change
+        fig = self.trend_cache.get(username,
+                                   lambda: build_trend_figure(username, self.store.records(username)))
         
         # Embed plot
         canvas = FigureCanvasTkAgg(fig, graph_window)
@@ -501,35 +531,34 @@ class BMICalculator:
             messagebox.showwarning("⚠️ No User", "Please select a user first!")
             return
             
-        if username not in self.user_data or not self.user_data[username]:
+        if not self.store.count(username):
             messagebox.showinfo("ℹ️ No Data", "No BMI history found for this user!")
             return
         
         stats_window = tk.Toplevel(self.root)
         stats_window.title(f"BMI Statistics - {username}")
-        stats_window.geometry("500x400")
+        stats_window.geometry("500x480")
         stats_window.configure(bg='#000000')
         
         tk.Label(stats_window, text=f"📊 BMI Statistics for {username}", 
                 font=('Arial', 16, 'bold'), bg='#000000', fg='#FFFFFF').pack(pady=20)
         
         # Calculate statistics
-        data = self.user_data[username]
-        bmis = [entry['bmi'] for entry in data]
-        weights = [entry['weight'] for entry in data]
-        
-        avg_bmi = sum(bmis) / len(bmis)
-        min_bmi = min(bmis)
-        max_bmi = max(bmis)
-        avg_weight = sum(weights) / len(weights)
+        stats = self.store.stats(username)
+        avg_bmi = stats['avg_bmi']
+        min_bmi = stats['min_bmi']
+        max_bmi = stats['max_bmi']
+        avg_weight = stats['avg_weight']
         
         # Display statistics
         stats_frame = tk.Frame(stats_window, bg='#1a1a1a', relief=tk.RAISED, bd=2)
         stats_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
         
         stats_info = [
-            ("📋 Total Records", len(data)),
+            ("📋 Total Records", stats['count']),
             ("📊 Average BMI", f"{avg_bmi:.1f}"),
+            ("📐 BMI Std Deviation", f"{stats['std_bmi']:.2f}"),
+            ("🔁 Moving Average (last 7)", f"{stats['moving_avg_bmi']:.1f}"),
             ("📉 Minimum BMI", f"{min_bmi:.1f}"),
             ("📈 Maximum BMI", f"{max_bmi:.1f}"),
             ("⚖️ Average Weight", f"{avg_weight:.1f} kg"),
@@ -554,6 +583,9 @@ class BMICalculator:
     def run(self):
         """Start the application"""
         self.root.mainloop()
+        # Flush anything still queued before exiting
+        self.save_worker.close()
+        self.store.close()
 
 # Run the application
 if __name__ == "__main__":
@@ -0,0 +1,151 @@
+import argparse
+import csv
+import itertools
+import sys
+import time
+
+import numpy as np
+
+# Same limits and categories as BMICalculator.validate_input / get_bmi_category
+MAX_WEIGHT = 500
+MAX_HEIGHT = 300
+BMI_THRESHOLDS = np.array([18.5, 25, 30])
+CATEGORIES = np.array(["Underweight", "Normal", "Overweight", "Obese"])
+INVALID = "Invalid"
+
+
+def validate(weight, height):
+    """Boolean mask of rows with a usable weight (kg) and height (cm)"""
+    weight = np.asarray(weight, dtype=np.float64)
+    height = np.asarray(height, dtype=np.float64)
+    return (weight > 0) & (weight <= MAX_WEIGHT) & (height > 0) & (height <= MAX_HEIGHT)
+
+
+def compute_bmi(weight, height):
+    """BMI for arrays of weight in kg and height in cm"""
+    height_m = np.asarray(height, dtype=np.float64) / 100
+    return np.asarray(weight, dtype=np.float64) / (height_m * height_m)
+
+
+def categorize(bmi):
+    """Category codes (indices into CATEGORIES) for an array of BMI values"""
+    return np.digitize(bmi, BMI_THRESHOLDS)
+
+
+def score(weight, height):
+    """Validate, compute and categorize whole arrays at once.
+
+    Returns (valid, bmi, codes); bmi is NaN and codes is -1 for invalid rows.
+    """
+    valid = validate(weight, height)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bmi = np.where(valid, compute_bmi(weight, height), np.nan)
+    codes = np.where(valid, categorize(bmi), -1)
+    return valid, bmi, codes
+
+
+def to_float(values):
+    """Convert text cells to floats, turning unparsable cells into NaN"""
+    try:
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        result = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                result[i] = float(value)
+            except ValueError:
+                pass
+        return result
+
+
+def read_csv_chunks(path, chunk_size, weight_column='weight', height_column='height'):
+    """Yield (weight, height) float arrays for chunk_size rows at a time"""
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        weight_index = header.index(weight_column)
+        height_index = header.index(height_column)
+        while True:
+            rows = list(itertools.islice(reader, chunk_size))
+            if not rows:
+                return
+            yield (to_float([row[weight_index] for row in rows]),
+                   to_float([row[height_index] for row in rows]))
+
+
+def read_parquet_chunks(path, chunk_size, weight_column='weight', height_column='height'):
+    """Yield (weight, height) float arrays from a Parquet file (needs pyarrow)"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Reading Parquet files requires the pyarrow package")
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size,
+                                           columns=[weight_column, height_column]):
+        yield (batch.column(0).to_numpy(zero_copy_only=False).astype(np.float64),
+               batch.column(1).to_numpy(zero_copy_only=False).astype(np.float64))
+
+
+def read_chunks(path, chunk_size, **columns):
+    if path.endswith('.parquet'):
+        return read_parquet_chunks(path, chunk_size, **columns)
+    return read_csv_chunks(path, chunk_size, **columns)
+
+
+def write_chunk(out, weight, height, bmi, codes):
+    """Append scored rows as CSV lines"""
+    labels = np.append(CATEGORIES, INVALID)[codes]
+    bmi_text = np.char.mod('%.1f', bmi)
+    lines = [f"{w:g},{h:g},{b},{c}" if c != INVALID else f"{w:g},{h:g},,{c}"
+             for w, h, b, c in zip(weight.tolist(), height.tolist(), bmi_text.tolist(), labels.tolist())]
+    out.write('\n'.join(lines) + '\n')
+
+
+def score_file(path, out=None, chunk_size=100_000, **columns):
+    """Score every row of a CSV/Parquet file chunk by chunk.
+
+    Writes weight,height,bmi,category rows to out when given and returns
+    (rows, per-category counts, invalid rows, seconds).
+    """
+    start = time.perf_counter()
+    rows = invalid = 0
+    counts = np.zeros(len(CATEGORIES), dtype=np.int64)
+    if out is not None:
+        out.write("weight,height,bmi,category\n")
+
+    for weight, height in read_chunks(path, chunk_size, **columns):
+        valid, bmi, codes = score(weight, height)
+        rows += len(weight)
+        invalid += int(len(weight) - valid.sum())
+        counts += np.bincount(codes[valid], minlength=len(CATEGORIES))
+        if out is not None:
+            write_chunk(out, weight, height, bmi, codes)
+
+    return rows, counts, invalid, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score weight/height files with the BMI categories")
+    parser.add_argument('input', help="CSV or .parquet file with weight (kg) and height (cm) columns")
+    parser.add_argument('-o', '--output', help="write scored rows to this CSV file")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="rows held in memory at once")
+    parser.add_argument('--weight-column', default='weight')
+    parser.add_argument('--height-column', default='height')
+    args = parser.parse_args()
+
+    columns = {'weight_column': args.weight_column, 'height_column': args.height_column}
+    if args.output:
+        with open(args.output, 'w', buffering=1 << 20) as out:
+            rows, counts, invalid, seconds = score_file(args.input, out, args.chunk_size, **columns)
+    else:
+        rows, counts, invalid, seconds = score_file(args.input, None, args.chunk_size, **columns)
+
+    for category, count in zip(CATEGORIES, counts):
+        print(f"{category:<12} {count}")
+    print(f"{INVALID:<12} {invalid}")
+    rate = rows / seconds if seconds else float('inf')
+    print(f"Scored {rows} rows in {seconds:.2f}s ({rate:,.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import csv
+import json
+import os
+import threading
+
+FORMATS = ('txt', 'json', 'csv', 'ndjson')
+CSV_COLUMNS = ['user', 'date', 'weight', 'height', 'bmi', 'category']
+
+
+def format_for(filename):
+    """Export format implied by a file name's extension (txt by default)"""
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    return extension if extension in FORMATS else 'txt'
+
+
+class HistoryExporter(threading.Thread):
+    """Stream BMI history to a file on a background thread.
+
+    Records are read from the store a page at a time and written through one
+    large buffered writer, so neither the records nor the output are ever
+    held in memory as a whole; a date range is read with the store's
+    records_between instead, which the SQLite store answers from its index. ``done``/``total`` report progress, cancel()
+    stops at the next page and nothing is left behind: the export is written
+    to a temp file that is only renamed to ``filename`` when it completes.
+    """
+
+    def __init__(self, store, filename, users, fmt=None, start=None, end=None, page_size=1000):
+        super().__init__(daemon=True)
+        self.store = store
+        self.filename = filename
+        self.users = list(users)
+        self.fmt = fmt or format_for(filename)
+        self.start_date = start
+        self.end_date = end
+        self.page_size = page_size
+
+        self.done = 0
+        self.total = 0
+        self.written = 0
+        self.error = None
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def pages(self, store, username):
+        """Pages of a user's records inside the date range"""
+        if self.start_date is None and self.end_date is None:
+            for page in store.iter_pages(username, self.page_size):
+                if self._cancel.is_set():
+                    return
+                self.done += len(page)
+                yield page
+            return
+
+        records = store.records_between(username, self.start_date, self.end_date)
+        # Records outside the range count as done straight away
+        self.done += store.count(username) - len(records)
+        for start in range(0, len(records), self.page_size):
+            if self._cancel.is_set():
+                return
+            page = records[start:start + self.page_size]
+            self.done += len(page)
+            yield page
+
+    def run(self):
+        tmp_path = self.filename + '.part'
+        store = self.store.reader()
+        try:
+            self.total = sum(store.count(username) for username in self.users)
+            write = getattr(self, f'write_{self.fmt}')
+            with open(tmp_path, 'w', newline='', buffering=1 << 20) as out:
+                write(out, store)
+            if self._cancel.is_set():
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, self.filename)
+        except Exception as e:
+            self.error = e
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        finally:
+            if store is not self.store:
+                store.close()
+
+    def write_txt(self, out, store):
+        for username in self.users:
+            out.write(f"BMI History for {username}\n")
+            out.write("=" * 50 + "\n\n")
+            number = 0
+            for page in self.pages(store, username):
+                chunk = []
+                for entry in page:
+                    number += 1
+                    chunk.append(f"Record #{number}\n"
+                                 f"Date: {entry['date']}\n"
+                                 f"Weight: {entry['weight']:.1f} kg\n"
+                                 f"Height: {entry['height']:.0f} cm\n"
+                                 f"BMI: {entry['bmi']:.1f}\n"
+                                 f"Category: {entry['category']}\n"
+                                 + "-" * 30 + "\n\n")
+                out.write(''.join(chunk))
+                self.written += len(page)
+
+    def write_json(self, out, store):
+        """Same {username: [records]} layout as before, one record per line"""
+        out.write("{")
+        for number, username in enumerate(self.users):
+            out.write(("," if number else "") + f"\n  {json.dumps(username)}: [")
+            first = True
+            for page in self.pages(store, username):
+                if page:
+                    out.write(("," if not first else "")
+                              + ",".join(f"\n    {json.dumps(entry)}" for entry in page))
+                    first = False
+                self.written += len(page)
+            out.write("\n  ]" if not first else "]")
+        out.write("\n}\n")
+
+    def write_ndjson(self, out, store):
+        for username in self.users:
+            for page in self.pages(store, username):
+                out.write(''.join(json.dumps({'user': username, **entry}) + "\n" for entry in page))
+                self.written += len(page)
+
+    def write_csv(self, out, store):
+        writer = csv.writer(out)
+        writer.writerow(CSV_COLUMNS)
+        for username in self.users:
+            for page in self.pages(store, username):
+                writer.writerows([username, entry['date'], entry['weight'], entry['height'],
+                                  entry['bmi'], entry['category']] for entry in page)
+                self.written += len(page)
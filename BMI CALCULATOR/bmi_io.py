@@ -0,0 +1,122 @@
+import bisect
+import queue
+import threading
+import time
+
+# Upper bounds (in milliseconds) of the save latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class LatencyHistogram:
+    """Thread-safe histogram of durations in fixed millisecond buckets"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+            self.total += 1
+            self.max = max(self.max, ms)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples"""
+        with self._lock:
+            if not self.total:
+                return None
+            target = fraction * self.total
+            seen = 0
+            for bound, count in zip(self.bounds, self.counts):
+                seen += count
+                if seen >= target:
+                    return bound
+            return self.max
+
+    def summary(self):
+        """Human-readable bucket counts for diagnostics"""
+        with self._lock:
+            lines = [f"Queued saves: {self.total} | max {self.max:.1f} ms"]
+            lower = 0
+            for bound, count in zip(self.bounds, self.counts):
+                if count:
+                    lines.append(f"{lower:>5}-{bound:<5} ms: {count}")
+                lower = bound
+            if self.counts[-1]:
+                lines.append(f"{'>' + str(lower):>11} ms: {self.counts[-1]}")
+        return "\n".join(lines)
+
+
+class SaveWorker(threading.Thread):
+    """Flushes store changes to disk on a dedicated thread.
+
+    Changes are applied to the store in memory on the Tk thread; each one
+    then calls request_flush(). The worker drains every request queued
+    while it was busy and flushes them with a single store.flush(), so a
+    burst of changes costs one disk write. Outcomes are handed back to Tk
+    with root.after; on_saved and on_error run on the Tk thread.
+    """
+
+    def __init__(self, store, root, on_saved=None, on_error=None, max_pending=64):
+        super().__init__(daemon=True)
+        self.store = store
+        self.root = root
+        self.on_saved = on_saved
+        self.on_error = on_error
+        self.latency = LatencyHistogram()
+        self._queue = queue.Queue(max_pending)
+        self._stopping = False
+
+    def request_flush(self):
+        try:
+            self._queue.put_nowait(time.perf_counter())
+        except queue.Full:
+            # The queued requests already guarantee a flush after this change
+            pass
+
+    def _drain(self, first):
+        """All requests queued so far, starting with first"""
+        requests = [first]
+        while True:
+            try:
+                requests.append(self._queue.get_nowait())
+            except queue.Empty:
+                return requests
+
+    def run(self):
+        while True:
+            requests = self._drain(self._queue.get())
+            stop = None in requests
+            requests = [requested for requested in requests if requested is not None]
+            if requests:
+                try:
+                    self.store.flush()
+                    error = None
+                except Exception as e:
+                    error = e
+                finished = time.perf_counter()
+                for requested in requests:
+                    self.latency.record(finished - requested)
+                self._notify(error, len(requests))
+            if stop:
+                return
+
+    def _notify(self, error, count):
+        callback = self.on_error if error else self.on_saved
+        if callback is None or self._stopping:
+            return
+        try:
+            self.root.after(0, callback, error if error else count)
+        except RuntimeError:
+            # The Tk loop has already gone away
+            pass
+
+    def close(self):
+        """Stop after flushing everything requested so far"""
+        self._stopping = True
+        self._queue.put(None)
+        self.join()
@@ -0,0 +1,281 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from bmi_engine import CATEGORIES, score, to_float
+
+# Bytes of CSV each worker task reads at a time
+READ_CHUNK = 8 << 20
+
+
+class UserAggregates:
+    """Per-user count, BMI sum/min/max and category histogram"""
+
+    def __init__(self, names=()):
+        self.names = list(names)
+        size = len(self.names)
+        self.count = np.zeros(size, dtype=np.int64)
+        self.total = np.zeros(size)
+        self.minimum = np.full(size, np.inf)
+        self.maximum = np.full(size, -np.inf)
+        self.histogram = np.zeros((size, len(CATEGORIES)), dtype=np.int64)
+
+    @classmethod
+    def from_scores(cls, user_ids, names, bmi, codes, valid):
+        """Aggregate scored rows; user_ids index into names"""
+        aggregates = cls(names)
+        size = len(names)
+        user_ids = user_ids[valid]
+        bmi = bmi[valid]
+        codes = codes[valid]
+        if not len(user_ids):
+            return aggregates
+
+        aggregates.count = np.bincount(user_ids, minlength=size)
+        aggregates.total = np.bincount(user_ids, weights=bmi, minlength=size)
+        aggregates.histogram = np.bincount(user_ids * len(CATEGORIES) + codes,
+                                           minlength=size * len(CATEGORIES)).reshape(size, -1)
+
+        # Sort by user once so min/max become segment reductions
+        order = np.argsort(user_ids, kind='stable')
+        sorted_ids = user_ids[order]
+        sorted_bmi = bmi[order]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        present = sorted_ids[starts]
+        aggregates.minimum[present] = np.minimum.reduceat(sorted_bmi, starts)
+        aggregates.maximum[present] = np.maximum.reduceat(sorted_bmi, starts)
+        return aggregates
+
+    def merge(self, other):
+        """Fold another set of aggregates into this one"""
+        positions = {name: i for i, name in enumerate(self.names)}
+        index = np.empty(len(other.names), dtype=np.int64)
+        for i, name in enumerate(other.names):
+            if name not in positions:
+                positions[name] = len(self.names)
+                self.names.append(name)
+            index[i] = positions[name]
+
+        grow = len(self.names) - len(self.count)
+        if grow:
+            self.count = np.concatenate([self.count, np.zeros(grow, dtype=np.int64)])
+            self.total = np.concatenate([self.total, np.zeros(grow)])
+            self.minimum = np.concatenate([self.minimum, np.full(grow, np.inf)])
+            self.maximum = np.concatenate([self.maximum, np.full(grow, -np.inf)])
+            self.histogram = np.concatenate(
+                [self.histogram, np.zeros((grow, len(CATEGORIES)), dtype=np.int64)])
+
+        # Names are unique within other, so fancy-index updates do not collide
+        self.count[index] += other.count
+        self.total[index] += other.total
+        self.minimum[index] = np.minimum(self.minimum[index], other.minimum)
+        self.maximum[index] = np.maximum(self.maximum[index], other.maximum)
+        self.histogram[index] += other.histogram
+        return self
+
+    def write_csv(self, out):
+        writer = csv.writer(out)
+        writer.writerow(['user', 'count', 'mean_bmi', 'min_bmi', 'max_bmi', *CATEGORIES])
+        for i, name in enumerate(self.names):
+            if self.count[i]:
+                writer.writerow([name, self.count[i], f"{self.total[i] / self.count[i]:.2f}",
+                                 f"{self.minimum[i]:.1f}", f"{self.maximum[i]:.1f}",
+                                 *self.histogram[i].tolist()])
+
+
+def aggregate_rows(rows, columns):
+    """Score parsed CSV rows and aggregate them per user"""
+    user_index, weight_index, height_index = columns
+    names, user_ids = np.unique(np.array([row[user_index] for row in rows]), return_inverse=True)
+    weight = to_float([row[weight_index] for row in rows])
+    height = to_float([row[height_index] for row in rows])
+    valid, bmi, codes = score(weight, height)
+    return UserAggregates.from_scores(user_ids.ravel(), names.tolist(), bmi, codes, valid)
+
+
+def score_byte_range(path, start, end, columns):
+    """Worker: aggregate the CSV lines of path that start within [start, end)"""
+    aggregates = UserAggregates()
+    with open(path, 'rb') as f:
+        if start:
+            # Skip the line that began in the previous shard
+            f.seek(start - 1)
+            position = start - 1 + len(f.readline())
+        else:
+            position = len(f.readline())  # header
+        while position < end:
+            lines = f.readlines(min(READ_CHUNK, end - position))
+            if not lines:
+                break
+            # The last line may run past end; it is ours if it started before end
+            kept = []
+            for line in lines:
+                if position >= end:
+                    break
+                kept.append(line.decode())
+                position += len(line)
+            rows = [row for row in csv.reader(kept) if row]
+            if rows:
+                aggregates.merge(aggregate_rows(rows, columns))
+    return aggregates
+
+
+def plan_shards(paths, workers, user_column='user', weight_column='weight', height_column='height'):
+    """Split every file into byte ranges so all workers get similar amounts of work; empty files get none"""
+    sizes = [os.path.getsize(path) for path in paths]
+    target = max(sum(sizes) // (workers * 4), 1 << 20)
+    shards = []
+    for path, size in zip(paths, sizes):
+        with open(path, newline='') as f:
+            header = next(csv.reader(f), None)
+        if header is None:
+            continue
+        columns = (header.index(user_column), header.index(weight_column), header.index(height_column))
+        for start in range(0, max(size, 1), target):
+            shards.append((path, start, min(start + target, size), columns))
+    return shards
+
+
+def score_files(paths, workers=None, **columns):
+    """Aggregate per user across CSV files using a pool of processes"""
+    workers = workers or os.cpu_count()
+    shards = plan_shards(paths, workers, **columns)
+    result = UserAggregates()
+    if not shards:
+        return result
+    with ProcessPoolExecutor(workers) as pool:
+        for aggregates in pool.map(score_byte_range, *zip(*shards)):
+            result.merge(aggregates)
+    return result
+
+
+def _open_block(name):
+    """Attach to a block the parent owns without handing it to this process's resource tracker"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track flag and registers every attached block
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _attach(spec):
+    """Open shared memory blocks described by (name, dtype, length) tuples as arrays"""
+    blocks = [_open_block(name) for name, _, _ in spec]
+    arrays = [np.ndarray((length,), dtype=dtype, buffer=block.buf)
+              for block, (_, dtype, length) in zip(blocks, spec)]
+    return blocks, arrays
+
+
+def score_shared_slice(spec, names, start, stop):
+    """Worker: aggregate rows start..stop of arrays living in shared memory"""
+    blocks, (user_ids, weight, height) = _attach(spec)
+    try:
+        valid, bmi, codes = score(weight[start:stop], height[start:stop])
+        return UserAggregates.from_scores(user_ids[start:stop], names, bmi, codes, valid)
+    finally:
+        del user_ids, weight, height
+        for block in blocks:
+            block.close()
+
+
+def score_arrays(user_ids, names, weight, height, workers=None, pool=None):
+    """Aggregate in-memory arrays per user across processes.
+
+    The arrays are copied once into shared memory; workers receive only the
+    block names and their row range, never the data itself.
+    """
+    workers = workers or os.cpu_count()
+    blocks = []
+    spec = []
+    try:
+        for array in (np.asarray(user_ids, dtype=np.int64), np.asarray(weight, dtype=np.float64),
+                      np.asarray(height, dtype=np.float64)):
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            spec.append((block.name, array.dtype.str, len(array)))
+
+        bounds = np.linspace(0, len(weight), workers + 1).astype(np.int64)
+        tasks = [(spec, names, bounds[i], bounds[i + 1]) for i in range(workers)]
+        result = UserAggregates(names)
+        if pool is None:
+            with ProcessPoolExecutor(workers) as own_pool:
+                parts = list(own_pool.map(score_shared_slice, *zip(*tasks)))
+        else:
+            parts = list(pool.map(score_shared_slice, *zip(*tasks)))
+        for part in parts:
+            result.merge(part)
+        return result
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def benchmark(rows, users=10_000, max_workers=None):
+    """Print throughput of score_arrays for 1, 2, 4, ... workers on synthetic data"""
+    rng = np.random.default_rng(0)
+    user_ids = rng.integers(0, users, rows)
+    names = [f"user{i}" for i in range(users)]
+    weight = rng.uniform(40, 150, rows)
+    height = rng.uniform(140, 205, rows)
+
+    max_workers = max_workers or os.cpu_count()
+    counts = sorted({2 ** i for i in range(max_workers.bit_length()) if 2 ** i <= max_workers} | {max_workers})
+    baseline = None
+    for workers in counts:
+        with ProcessPoolExecutor(workers) as pool:
+            # Warm up the pool so process start-up is not part of the timing
+            list(pool.map(abs, range(workers)))
+            start = time.perf_counter()
+            score_arrays(user_ids, names, weight, height, workers, pool)
+            seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        print(f"{workers:>3} workers: {rows / seconds:>14,.0f} rows/s  speedup {baseline / seconds:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-user BMI aggregates over many files in parallel")
+    parser.add_argument('inputs', nargs='*', help="CSV files with user, weight (kg) and height (cm) columns")
+    parser.add_argument('-o', '--output', help="write per-user aggregates to this CSV file")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--benchmark', type=int, metavar='ROWS',
+                        help="measure scaling on ROWS synthetic rows instead of reading files")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark, max_workers=args.workers)
+        return
+    if not args.inputs:
+        parser.error("no input files given")
+
+    start = time.perf_counter()
+    result = score_files(args.inputs, args.workers)
+    seconds = time.perf_counter() - start
+
+    if args.output:
+        with open(args.output, 'w', newline='') as out:
+            result.write_csv(out)
+    else:
+        result.write_csv(sys.stdout)
+    rows = int(result.count.sum())
+    if not rows:
+        print("No records in the input files", file=sys.stderr)
+        return
+    print(f"Aggregated {rows} valid rows for {len(result.names)} users in {seconds:.2f}s "
+          f"({rows / seconds:,.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import math
+
+# Number of most recent records in the moving average
+WINDOW = 7
+# Entries kept on each min/max stack; a steadily falling or rising series would otherwise keep them all
+STACK_LIMIT = 64
+
+
+class RunningStats:
+    """Count, sum, sum of squares, min/max and Welford variance of a series.
+
+    Values can be removed again in reverse order (the calculator only ever
+    deletes the latest record). Min and max stay exact after a removal
+    because the values that set a new minimum or maximum are kept on two
+    small monotonic stacks together with their position in the series.
+    The stacks keep only their newest STACK_LIMIT entries; removing past
+    the oldest one kept leaves the statistics inexact (see exact).
+    """
+
+    __slots__ = ('count', 'total', 'total_sq', 'mean', 'm2', 'min_stack', 'max_stack')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min_stack = []
+        self.max_stack = []
+
+    def push(self, value):
+        position = self.count
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if not self.min_stack or value <= self.min_stack[-1][1]:
+            self.min_stack.append((position, value))
+            del self.min_stack[:-STACK_LIMIT]
+        if not self.max_stack or value >= self.max_stack[-1][1]:
+            self.max_stack.append((position, value))
+            del self.max_stack[:-STACK_LIMIT]
+
+    def pop(self, value):
+        """Remove value, which must be the most recently pushed one"""
+        self.count -= 1
+        position = self.count
+        self.total -= value
+        self.total_sq -= value * value
+
+        if self.count:
+            old_mean = self.mean
+            self.mean = (old_mean * (self.count + 1) - value) / self.count
+            self.m2 = max(self.m2 - (value - old_mean) * (value - self.mean), 0.0)
+        else:
+            self.mean = 0.0
+            self.m2 = 0.0
+
+        if self.min_stack and self.min_stack[-1][0] == position:
+            self.min_stack.pop()
+        if self.max_stack and self.max_stack[-1][0] == position:
+            self.max_stack.pop()
+
+    @property
+    def min(self):
+        return self.min_stack[-1][1] if self.min_stack else None
+
+    @property
+    def max(self):
+        return self.max_stack[-1][1] if self.max_stack else None
+
+    @property
+    def exact(self):
+        """False once removals have used up a stack that was cut to STACK_LIMIT"""
+        return not self.count or bool(self.min_stack and self.max_stack)
+
+    @property
+    def std(self):
+        """Sample standard deviation"""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for name in cls.__slots__:
+            setattr(stats, name, data[name])
+        stats.min_stack = [tuple(item) for item in stats.min_stack]
+        stats.max_stack = [tuple(item) for item in stats.max_stack]
+        return stats
+
+
+class UserStats:
+    """Running BMI and weight statistics for one user"""
+
+    __slots__ = ('bmi', 'weight', 'recent')
+
+    def __init__(self):
+        self.bmi = RunningStats()
+        self.weight = RunningStats()
+        self.recent = []
+
+    @classmethod
+    def from_records(cls, pages):
+        """Build the statistics from an iterable of record pages"""
+        stats = cls()
+        for page in pages:
+            for entry in page:
+                stats.push(entry)
+        return stats
+
+    def push(self, entry):
+        self.bmi.push(entry['bmi'])
+        self.weight.push(entry['weight'])
+        self.recent.append(entry['bmi'])
+        del self.recent[:-WINDOW]
+
+    def pop(self, entry, recent_entries):
+        """Remove the latest record; recent_entries are the WINDOW records before it"""
+        self.bmi.pop(entry['bmi'])
+        self.weight.pop(entry['weight'])
+        self.recent = [e['bmi'] for e in recent_entries[-WINDOW:]]
+
+    @property
+    def exact(self):
+        """False if the statistics have to be rebuilt from the records"""
+        return self.bmi.exact and self.weight.exact
+
+    def summary(self):
+        """Values shown in the statistics views, or None without records"""
+        if not self.bmi.count:
+            return None
+        return {
+            'count': self.bmi.count,
+            'avg_bmi': self.bmi.mean,
+            'min_bmi': self.bmi.min,
+            'max_bmi': self.bmi.max,
+            'std_bmi': self.bmi.std,
+            'moving_avg_bmi': sum(self.recent) / len(self.recent),
+            'avg_weight': self.weight.mean,
+        }
+
+    def to_dict(self):
+        return {'bmi': self.bmi.to_dict(), 'weight': self.weight.to_dict(), 'recent': self.recent}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.bmi = RunningStats.from_dict(data['bmi'])
+        stats.weight = RunningStats.from_dict(data['weight'])
+        stats.recent = list(data['recent'])
+        return stats
@@ -0,0 +1,897 @@
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from bmi_stats import WINDOW, UserStats
+
+# Key used inside snapshots to record the last journal entry they contain
+SEQ_KEY = '__journal_seq__'
+
+
+def write_json_synced(path, data, indent=2):
+    """Write JSON to path and fsync it"""
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def atomic_write_json(path, data, indent=2):
+    """Write JSON to a temp file and rename it over path"""
+    write_json_synced(path + '.tmp', data, indent)
+    os.replace(path + '.tmp', path)
+
+
+def read_json_file(path):
+    """Read a JSON object from path, returning {} if missing or unreadable"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def read_journal(path):
+    """Yield the operations recorded in a journal file"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Torn final line after a crash: everything before it is valid
+                return
+
+
+class MemoryStore:
+    """Read operations shared by the backends that keep user_data in memory"""
+
+    def users(self):
+        return list(self.user_data.keys())
+
+    def has_user(self, username):
+        return username in self.user_data
+
+    def count(self, username):
+        return len(self.user_data.get(username, []))
+
+    def records(self, username):
+        return list(self.user_data.get(username, []))
+
+    def records_slice(self, username, start, stop):
+        return self.user_data.get(username, [])[max(start, 0):stop]
+
+    def iter_pages(self, username, page_size=256):
+        records = self.user_data.get(username, [])
+        for start in range(0, len(records), page_size):
+            yield records[start:start + page_size]
+
+    def preload(self, username):
+        pass
+
+    def reader(self):
+        """Store to read from on another thread"""
+        return self
+
+    def records_between(self, username, start=None, end=None):
+        """Records with start <= date <= end; dates compare as strings"""
+        return [entry for entry in self.user_data.get(username, [])
+                if (start is None or entry['date'] >= start)
+                and (end is None or entry['date'] <= end)]
+
+    def stats(self, username):
+        user_stats = self._stats.get(username)
+        if user_stats is None:
+            user_stats = UserStats.from_records([self.user_data.get(username, [])])
+            self._stats[username] = user_stats
+        return user_stats.summary()
+
+
+class JSONStore(MemoryStore):
+    """Original backend: rewrites the whole JSON file on every change.
+
+    With ``deferred=True`` changes only update memory and the file is
+    rewritten by the next flush(), so a burst of changes costs one write.
+    """
+
+    def __init__(self, path, deferred=False):
+        self.path = path
+        self.deferred = deferred
+        self.user_data = read_json_file(path)
+        self.user_data.pop(SEQ_KEY, None)
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def _changed(self):
+        self._dirty = True
+        if not self.deferred:
+            self.flush()
+
+    def add_user(self, username):
+        with self._lock:
+            self.user_data.setdefault(username, [])
+        self._changed()
+
+    def append_record(self, username, entry):
+        with self._lock:
+            self.user_data.setdefault(username, []).append(entry)
+            if username in self._stats:
+                self._stats[username].push(entry)
+        self._changed()
+
+    def delete_latest(self, username):
+        with self._lock:
+            records = self.user_data.get(username)
+            if not records:
+                return
+            removed = records.pop()
+            user_stats = self._stats.get(username)
+            if user_stats is not None:
+                user_stats.pop(removed, records[-WINDOW:])
+                if not user_stats.exact:
+                    del self._stats[username]
+        self._changed()
+
+    def flush(self):
+        """Atomically rewrite the file if anything changed since the last flush"""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = {user: list(records) for user, records in self.user_data.items()}
+            self._dirty = False
+        try:
+            atomic_write_json(self.path, snapshot)
+        except Exception:
+            self._dirty = True
+            raise
+
+    def close(self):
+        self.flush()
+
+
+class Delta:
+    """Changes a journal layer makes to one user's records.
+
+    ``trim`` records are dropped from the end of the list built by the
+    layers below, then ``tail`` is appended.
+    """
+
+    __slots__ = ('trim', 'tail')
+
+    def __init__(self):
+        self.trim = 0
+        self.tail = []
+
+
+def compose(count, layers, username):
+    """Visible records as (number of base records kept, extra records)"""
+    extra = []
+    for layer in layers:
+        delta = layer.get(username)
+        if delta is None:
+            continue
+        if delta.trim <= len(extra):
+            del extra[len(extra) - delta.trim:]
+        else:
+            count = max(count - (delta.trim - len(extra)), 0)
+            extra = []
+        extra.extend(delta.tail)
+    return count, extra
+
+
+def empty_index(page_size):
+    return {'seq': 0, 'page_size': page_size, 'users': {}}
+
+
+def fresh_stats(saved, base_seq, last_seq, touched):
+    """Saved per-user statistics that are still valid.
+
+    saved holds the statistics as of journal entry saved['seq']; they are
+    only usable if that entry is between the snapshot and the end of the
+    journal, and users changed after it (touched maps user to the sequence
+    number of their last change) are dropped.
+    """
+    seq = saved.get('seq')
+    if not isinstance(seq, int) or not base_seq <= seq <= last_seq:
+        return {}
+    return {user: values for user, values in saved['users'].items() if touched.get(user, 0) <= seq}
+
+
+class JournalStore:
+    """Paged snapshot file plus an append-only journal of changes.
+
+    Every change is written as a single JSON line to ``<path>.journal`` so
+    saving a record costs the same no matter how much history exists. The
+    snapshot keeps one record per line and ``<path>.idx`` stores each user's
+    record count and the byte offset of every page, so opening the store only
+    reads the index and records are read a page at a time when a view needs
+    them. Recently used pages are kept in an LRU cache; pages of users that
+    have not been looked at for a while are evicted.
+
+    Once ``compact_every`` changes have accumulated the journal is rotated
+    and a background thread streams the snapshot and the rotated changes
+    into a new snapshot, which is written to a temp file and atomically
+    renamed over ``path``. The snapshot remembers the sequence number of the
+    last change it contains, so replaying a journal that was already folded
+    in is harmless after a crash.
+
+    Per-user running statistics are kept up to date on every change and
+    saved to ``<path>.stats`` with each snapshot and on close, tagged with
+    the sequence number they reflect, so the statistics views do not have
+    to read a user's history. Changes made after that (say, before a crash)
+    are replayed from the journal when the statistics are first needed.
+    """
+
+    def __init__(self, path, compact_every=1000, fsync=True, page_size=256, cache_pages=64,
+                 deferred=False):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.stats_path = path + '.stats'
+        self.journal_path = path + '.journal'
+        self.compacting_path = path + '.journal.compacting'
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.page_size = page_size
+        self.cache_pages = cache_pages
+        self.deferred = deferred
+        self.last_error = None
+
+        self._lock = threading.RLock()
+        # Held while journal lines are written; always taken before _lock
+        self._write_lock = threading.Lock()
+        self._buffer = []
+        self._compactor = None
+        self._pending_ops = 0
+        self._page_cache = OrderedDict()
+        self._generation = 0
+        self._stats = None
+        # Sequence number of each user's last change since the snapshot
+        self._touched = {}
+
+        self._load()
+        self._journal = open(self.journal_path, 'a')
+
+        if os.path.exists(self.compacting_path):
+            # A previous compaction never finished; fold everything now
+            self.compact(wait=True)
+
+    def _read_index(self):
+        """Load the page index if it matches the snapshot on disk"""
+        if not os.path.exists(self.path):
+            return empty_index(self.page_size)
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            stat = os.stat(self.path)
+        except (OSError, ValueError):
+            return None
+        if index.get('size') != stat.st_size or index.get('mtime_ns') != stat.st_mtime_ns:
+            return None
+        index['users'] = {name: (count, offsets) for name, count, offsets in index['users']}
+        return index
+
+    def _load(self):
+        """Read the user index and replay any journal entries it is missing"""
+        index = self._read_index()
+        if index is None:
+            # Plain JSON file from an older version: convert it once to the paged format
+            legacy = read_json_file(self.path)
+            seq = legacy.pop(SEQ_KEY, 0)
+            layer = {}
+            for username, records in legacy.items():
+                layer[username] = Delta()
+                layer[username].tail = records
+            index = self._write_snapshot(empty_index(self.page_size), [layer], list(legacy), seq)
+            self._install_snapshot()
+
+        self._base = index
+        self.seq = index['seq']
+        self._users = dict.fromkeys(index['users'])
+        self._layers = [{}]
+
+        for journal in (self.compacting_path, self.journal_path):
+            for op in read_journal(journal):
+                if op.get('seq', 0) <= self.seq:
+                    continue
+                self._apply(op)
+                self.seq = op['seq']
+                self._touched[op['user']] = op['seq']
+                self._pending_ops += 1
+
+    def _apply(self, op):
+        """Apply one journal operation to the live layer"""
+        username = op['user']
+        self._users.setdefault(username, None)
+        if op['op'] == 'add_user':
+            return
+        delta = self._layers[-1].setdefault(username, Delta())
+        if op['op'] == 'append':
+            delta.tail.append(op['entry'])
+        elif op['op'] == 'delete':
+            if delta.tail:
+                delta.tail.pop()
+            elif self.count(username):
+                delta.trim += 1
+
+    def _view(self, username):
+        base_count = self._base['users'].get(username, (0, None))[0]
+        return compose(base_count, self._layers, username)
+
+    def _read_page(self, username, page):
+        """Records of one snapshot page, through the LRU page cache"""
+        key = (self._generation, username, page)
+        records = self._page_cache.get(key)
+        if records is not None:
+            self._page_cache.move_to_end(key)
+            return records
+
+        count, offsets = self._base['users'][username]
+        page_size = self._base['page_size']
+        with open(self.path, 'rb') as f:
+            f.seek(offsets[page])
+            records = [json.loads(f.readline().rstrip(b',\n'))
+                       for _ in range(min(page_size, count - page * page_size))]
+
+        self._page_cache[key] = records
+        if len(self._page_cache) > self.cache_pages:
+            self._page_cache.popitem(last=False)
+        return records
+
+    def users(self):
+        with self._lock:
+            return list(self._users)
+
+    def has_user(self, username):
+        return username in self._users
+
+    def count(self, username):
+        with self._lock:
+            kept, extra = self._view(username)
+            return kept + len(extra)
+
+    def records_slice(self, username, start, stop):
+        """Records start..stop-1 of a user, oldest first"""
+        with self._lock:
+            kept, extra = self._view(username)
+            stop = min(stop, kept + len(extra))
+            page_size = self._base['page_size']
+            result = []
+            position = max(start, 0)
+            while position < min(stop, kept):
+                page, first = divmod(position, page_size)
+                records = self._read_page(username, page)
+                take = min(page_size - first, min(stop, kept) - position)
+                result.extend(records[first:first + take])
+                position += take
+            result.extend(extra[max(position - kept, 0):max(stop - kept, 0)])
+            return result
+
+    def iter_pages(self, username, page_size=None):
+        """Yield a user's records one page at a time, oldest first"""
+        page_size = page_size or self._base['page_size']
+        start = 0
+        while True:
+            page = self.records_slice(username, start, start + page_size)
+            if not page:
+                return
+            yield page
+            start += page_size
+
+    def records(self, username):
+        return self.records_slice(username, 0, self.count(username))
+
+    def records_between(self, username, start=None, end=None):
+        """Records with start <= date <= end; dates compare as strings"""
+        return [entry for page in self.iter_pages(username) for entry in page
+                if (start is None or entry['date'] >= start)
+                and (end is None or entry['date'] <= end)]
+
+    def _load_stats(self):
+        """Read saved statistics and bring them up to date from the journal tail.
+
+        Records appended after the statistics were saved are pushed again;
+        users with a delete in the tail are left out and rebuilt on demand.
+        """
+        self._stats = {}
+        saved = read_json_file(self.stats_path)
+        seq = saved.get('seq')
+        if not isinstance(seq, int) or not self._base['seq'] <= seq <= self.seq:
+            return
+        changed = {username for username, last in self._touched.items() if last > seq}
+        tail = self._journal_tail(seq) if changed else []
+        for username, values in saved['users'].items():
+            user_stats = UserStats.from_dict(values)
+            if username in changed:
+                if tail is None:
+                    continue
+                ops = [op for op in tail if op['user'] == username]
+                if any(op['op'] == 'delete' for op in ops):
+                    continue
+                for op in ops:
+                    if op['op'] == 'append':
+                        user_stats.push(op['entry'])
+            self._stats[username] = user_stats
+
+    def _journal_tail(self, seq):
+        """Operations after seq, oldest first; None unless every one of them could be read"""
+        queued = (json.loads(line) for line in self._buffer)
+        tail = [op for op in itertools.chain(read_journal(self.compacting_path), read_journal(self.journal_path),
+                                             queued)
+                if op.get('seq', 0) > seq]
+        # A flush writing lines right now leaves a gap; rebuilding is then the safe choice
+        if [op['seq'] for op in tail] != list(range(seq + 1, self.seq + 1)):
+            return None
+        return tail
+
+    def _tracked_stats(self, username):
+        """Running statistics of a user if they are already in memory"""
+        return self._stats.get(username) if self._stats is not None else None
+
+    def stats(self, username):
+        with self._lock:
+            if self._stats is None:
+                self._load_stats()
+            user_stats = self._stats.get(username)
+            if user_stats is None:
+                # Never computed or changed since the last snapshot: build it once
+                user_stats = UserStats.from_records(self.iter_pages(username))
+                self._stats[username] = user_stats
+            return user_stats.summary()
+
+    def reader(self):
+        """Store to read from on another thread; reads are serialised by the lock"""
+        return self
+
+    def preload(self, username):
+        """Warm the cache with the newest page of a user's records"""
+        count = self.count(username)
+        self.records_slice(username, count - self._base['page_size'], count)
+
+    def _log(self, op):
+        """Queue one operation for the journal; called with _lock held"""
+        self.seq += 1
+        op['seq'] = self.seq
+        self._buffer.append(json.dumps(op) + '\n')
+        self._touched[op['user']] = self.seq
+        self._pending_ops += 1
+
+    def _changed(self):
+        """Write queued operations now unless a background flush() will"""
+        if not self.deferred:
+            self.flush()
+
+    def flush(self):
+        """Write all queued operations to the journal with a single write"""
+        with self._write_lock:
+            with self._lock:
+                lines = self._buffer
+                self._buffer = []
+                journal = self._journal
+            if lines:
+                journal.write(''.join(lines))
+                journal.flush()
+                if self.fsync:
+                    os.fsync(journal.fileno())
+        if self._pending_ops >= self.compact_every:
+            self.compact()
+
+    def add_user(self, username):
+        with self._lock:
+            op = {'op': 'add_user', 'user': username}
+            self._apply(op)
+            self._log(op)
+        self._changed()
+
+    def append_record(self, username, entry):
+        with self._lock:
+            op = {'op': 'append', 'user': username, 'entry': entry}
+            self._apply(op)
+            user_stats = self._tracked_stats(username)
+            if user_stats is not None:
+                user_stats.push(entry)
+            self._log(op)
+        self._changed()
+
+    def delete_latest(self, username):
+        with self._lock:
+            count = self.count(username)
+            if not count:
+                return
+            user_stats = self._tracked_stats(username)
+            if user_stats is not None:
+                removed = self.records_slice(username, count - 1, count)[0]
+                user_stats.pop(removed, self.records_slice(username, count - 1 - WINDOW, count - 1))
+                if not user_stats.exact:
+                    # Rebuilt from the records the next time they are needed
+                    del self._stats[username]
+            op = {'op': 'delete', 'user': username}
+            self._apply(op)
+            self._log(op)
+        self._changed()
+
+    def _rotate_journal(self):
+        """Move the live journal aside so new changes go to a fresh file"""
+        self._journal.write(''.join(self._buffer))
+        self._buffer = []
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        self._journal.close()
+        if os.path.exists(self.compacting_path):
+            # Keep entries from a failed compaction by appending to them
+            with open(self.journal_path, 'r') as src, open(self.compacting_path, 'a') as dst:
+                dst.write(src.read())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.compacting_path)
+        self._journal = open(self.journal_path, 'a')
+
+    def compact(self, wait=False):
+        """Fold the journal into a new snapshot, in the background by default"""
+        with self._write_lock, self._lock:
+            running = self._compactor is not None and self._compactor.is_alive()
+            if not running:
+                self._rotate_journal()
+                # Freeze the current layers; new changes go to a fresh one on top
+                frozen = self._layers
+                self._layers = frozen + [{}]
+                self._pending_ops = 0
+                if self._stats is not None:
+                    saved_stats = {user: stats.to_dict() for user, stats in self._stats.items()}
+                else:
+                    saved_stats = None
+                self._compactor = threading.Thread(
+                    target=self._compact,
+                    args=(self._base, frozen, list(self._users), self.seq, saved_stats, dict(self._touched)),
+                    daemon=True)
+                self._compactor.start()
+            compactor = self._compactor
+
+        if wait:
+            compactor.join()
+
+    def _compact(self, base, frozen, users, seq, saved_stats, touched):
+        try:
+            index = self._write_snapshot(base, frozen, users, seq)
+            if saved_stats is None:
+                # Statistics were not used this session: carry the saved ones forward
+                saved_stats = fresh_stats(read_json_file(self.stats_path), base['seq'], seq, touched)
+            write_json_synced(self.stats_path + '.tmp', {'seq': seq, 'users': saved_stats},
+                              indent=None)
+            with self._lock:
+                self._install_snapshot()
+                self._base = index
+                self._layers = self._layers[len(frozen):]
+                self._generation += 1
+                self._page_cache.clear()
+                # Changes folded into the snapshot can no longer outdate saved statistics
+                self._touched = {user: last for user, last in self._touched.items() if last > seq}
+                os.remove(self.compacting_path)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e
+
+    def _write_snapshot(self, base, layers, users, seq):
+        """Stream base + layers into temp snapshot and index files.
+
+        Returns the new index; _install_snapshot renames the files into place.
+        """
+        page_size = self.page_size
+        index_users = []
+        source = open(self.path, 'rb') if base['users'] else None
+        try:
+            with open(self.path + '.tmp', 'wb') as out:
+                out.write(b'{')
+                for number, username in enumerate(users):
+                    count, offsets = base['users'].get(username, (0, []))
+                    kept, extra = compose(count, layers, username)
+                    total = kept + len(extra)
+
+                    def base_records():
+                        for page, offset in enumerate(offsets[:-(-kept // page_size)]):
+                            source.seek(offset)
+                            for _ in range(min(page_size, kept - page * page_size)):
+                                yield source.readline().rstrip(b',\n')
+
+                    def extra_records():
+                        for entry in extra:
+                            yield json.dumps(entry).encode()
+
+                    out.write(b',' if number else b'')
+                    out.write(b'\n' + json.dumps(username).encode() + b': [')
+                    new_offsets = []
+                    lines = itertools.chain(base_records(), extra_records()) if kept else extra_records()
+                    for position, line in enumerate(lines):
+                        out.write(b'\n')
+                        if position % page_size == 0:
+                            new_offsets.append(out.tell())
+                        out.write(line + (b',' if position < total - 1 else b''))
+                    out.write(b'\n]' if total else b']')
+                    index_users.append([username, total, new_offsets])
+
+                out.write((b',' if users else b'') + f'\n"{SEQ_KEY}": {seq}\n}}\n'.encode())
+                out.flush()
+                os.fsync(out.fileno())
+        finally:
+            if source is not None:
+                source.close()
+
+        stat = os.stat(self.path + '.tmp')
+        index = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'seq': seq,
+                 'page_size': page_size, 'users': index_users}
+        write_json_synced(self.index_path + '.tmp', index, indent=None)
+        index['users'] = {name: (count, offsets) for name, count, offsets in index_users}
+        return index
+
+    def _install_snapshot(self):
+        """Rename the temp snapshot and index written by _write_snapshot into place"""
+        os.replace(self.path + '.tmp', self.path)
+        os.replace(self.index_path + '.tmp', self.index_path)
+        if os.path.exists(self.stats_path + '.tmp'):
+            os.replace(self.stats_path + '.tmp', self.stats_path)
+
+    def close(self):
+        """Flush queued changes, wait for a running compaction and close the journal"""
+        self.flush()
+        with self._lock:
+            compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            self._journal.close()
+            if self._stats is not None:
+                saved_stats = {user: stats.to_dict() for user, stats in self._stats.items()}
+                try:
+                    atomic_write_json(self.stats_path, {'seq': self.seq, 'users': saved_stats}, indent=None)
+                except OSError:
+                    # Only a cache: the journal tail or the records rebuild it
+                    pass
+
+
+class SQLiteStore:
+    """SQLite backend indexed on (username, date).
+
+    Nothing is loaded up front: every view runs an indexed query, so startup
+    time and memory do not grow with the size of the history.
+
+    Each change runs in a savepoint. Without ``deferred`` it is committed
+    at once; with ``deferred=True`` the changes stay in an open transaction
+    that this connection already reads from, and the next flush() commits
+    them all, so a burst of changes costs one commit on the flushing thread.
+    """
+
+    RECORD_COLUMNS = 'date, weight, height, bmi, category'
+
+    def __init__(self, path, deferred=False):
+        self.path = path
+        self.deferred = deferred
+        # flush() may run on a SaveWorker thread; _lock keeps it apart from changes
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._dirty = False
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY)')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS records ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'username TEXT NOT NULL REFERENCES users(username), '
+                'date TEXT NOT NULL, weight REAL NOT NULL, height REAL NOT NULL, '
+                'bmi REAL NOT NULL, category TEXT NOT NULL)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_records_user_date '
+                              'ON records (username, date)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS user_stats ('
+                              'username TEXT PRIMARY KEY, data TEXT NOT NULL)')
+
+    def users(self):
+        return [row[0] for row in self.conn.execute('SELECT username FROM users ORDER BY rowid')]
+
+    def has_user(self, username):
+        row = self.conn.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone()
+        return row is not None
+
+    def count(self, username):
+        row = self.conn.execute('SELECT COUNT(*) FROM records WHERE username = ?',
+                                (username,)).fetchone()
+        return row[0]
+
+    def records(self, username):
+        return self.records_between(username)
+
+    def records_slice(self, username, start, stop):
+        """Records start..stop-1 of a user, oldest first"""
+        start = max(start, 0)
+        rows = self.conn.execute(
+            f'SELECT {self.RECORD_COLUMNS} FROM records WHERE username = ? '
+            'ORDER BY date, id LIMIT ? OFFSET ?', (username, max(stop - start, 0), start))
+        return [dict(row) for row in rows]
+
+    def iter_pages(self, username, page_size=256):
+        """Yield a user's records one page at a time, oldest first"""
+        rows = self.conn.execute(
+            f'SELECT {self.RECORD_COLUMNS} FROM records WHERE username = ? ORDER BY date, id',
+            (username,))
+        while True:
+            page = rows.fetchmany(page_size)
+            if not page:
+                return
+            yield [dict(row) for row in page]
+
+    def preload(self, username):
+        pass
+
+    def reader(self):
+        """Separate connection for reading on another thread"""
+        return SQLiteStore(self.path)
+
+    def records_between(self, username, start=None, end=None):
+        """Records with start <= date <= end, oldest first"""
+        query = f'SELECT {self.RECORD_COLUMNS} FROM records WHERE username = ?'
+        params = [username]
+        if start is not None:
+            query += ' AND date >= ?'
+            params.append(start)
+        if end is not None:
+            query += ' AND date <= ?'
+            params.append(end)
+        query += ' ORDER BY date, id'
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def _saved_stats(self, username):
+        row = self.conn.execute('SELECT data FROM user_stats WHERE username = ?',
+                                (username,)).fetchone()
+        return UserStats.from_dict(json.loads(row[0])) if row else None
+
+    def _save_stats(self, username, user_stats):
+        self.conn.execute('INSERT OR REPLACE INTO user_stats (username, data) VALUES (?, ?)',
+                          (username, json.dumps(user_stats.to_dict())))
+
+    def stats(self, username):
+        """Running statistics kept in user_stats, built once if missing"""
+        user_stats = self._saved_stats(username)
+        if user_stats is None:
+            user_stats = UserStats.from_records(self.iter_pages(username))
+            with self._change():
+                self._save_stats(username, user_stats)
+        return user_stats.summary()
+
+    @contextmanager
+    def _change(self):
+        """Run one change in a savepoint; committed now unless deferred"""
+        with self._lock:
+            if not self.conn.in_transaction:
+                self.conn.execute('BEGIN')
+            self.conn.execute('SAVEPOINT change')
+            try:
+                yield
+            except BaseException:
+                if self._dirty:
+                    # Keep the earlier deferred changes, drop only this one
+                    self.conn.execute('ROLLBACK TO change')
+                    self.conn.execute('RELEASE change')
+                else:
+                    self.conn.rollback()
+                raise
+            self.conn.execute('RELEASE change')
+            self._dirty = True
+        if not self.deferred:
+            self.flush()
+
+    def add_user(self, username):
+        with self._change():
+            self.conn.execute('INSERT OR IGNORE INTO users (username) VALUES (?)', (username,))
+
+    def append_record(self, username, entry):
+        with self._change():
+            self.conn.execute('INSERT OR IGNORE INTO users (username) VALUES (?)', (username,))
+            self.conn.execute(
+                f'INSERT INTO records (username, {self.RECORD_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)',
+                (username, entry['date'], entry['weight'], entry['height'],
+                 entry['bmi'], entry['category']))
+            user_stats = self._saved_stats(username)
+            if user_stats is not None:
+                user_stats.push(entry)
+                self._save_stats(username, user_stats)
+
+    def delete_latest(self, username):
+        with self._change():
+            latest = self.conn.execute(
+                f'SELECT id, {self.RECORD_COLUMNS} FROM records WHERE username = ? '
+                'ORDER BY date DESC, id DESC LIMIT ?', (username, WINDOW + 1)).fetchall()
+            if not latest:
+                return
+            self.conn.execute('DELETE FROM records WHERE id = ?', (latest[0]['id'],))
+            user_stats = self._saved_stats(username)
+            if user_stats is not None:
+                recent = [dict(row) for row in reversed(latest[1:])]
+                user_stats.pop(dict(latest[0]), recent)
+                if user_stats.exact:
+                    self._save_stats(username, user_stats)
+                else:
+                    self.conn.execute('DELETE FROM user_stats WHERE username = ?', (username,))
+
+    def flush(self):
+        """Commit the changes made since the last flush"""
+        with self._lock:
+            if self._dirty:
+                self.conn.commit()
+                self._dirty = False
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+def migrate_json_to_sqlite(json_path, db_path):
+    """Copy every user and record from a JSON store (and its journal) into SQLite"""
+    source = JournalStore(json_path) if os.path.exists(json_path + '.journal') else JSONStore(json_path)
+    target = SQLiteStore(db_path)
+    users = records = 0
+    try:
+        with target.conn:
+            for username in source.users():
+                target.conn.execute('INSERT OR IGNORE INTO users (username) VALUES (?)', (username,))
+                for entries in source.iter_pages(username):
+                    target.conn.executemany(
+                        f'INSERT INTO records (username, {SQLiteStore.RECORD_COLUMNS}) '
+                        'VALUES (?, ?, ?, ?, ?, ?)',
+                        [(username, e['date'], e['weight'], e['height'], e['bmi'], e['category'])
+                         for e in entries])
+                    records += len(entries)
+                users += 1
+    finally:
+        source.close()
+        target.close()
+    return users, records
+
+
+BACKENDS = {
+    'json': JSONStore,
+    'journal': JournalStore,
+    'sqlite': SQLiteStore,
+}
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+
+def open_store(path, backend=None, **options):
+    """Open the user data at path, picking the backend from the extension by default"""
+    if backend is None:
+        backend = 'sqlite' if path.endswith(SQLITE_EXTENSIONS) else 'journal'
+    try:
+        store_class = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    return store_class(path, **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BMI calculator storage tools")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    migrate = commands.add_parser('migrate', help="copy a JSON data file into a SQLite database")
+    migrate.add_argument('json_path', nargs='?', default='user_data.json')
+    migrate.add_argument('db_path', nargs='?', default='user_data.db')
+
+    args = parser.parse_args()
+    if args.command == 'migrate':
+        if os.path.exists(args.db_path):
+            parser.error(f"{args.db_path} already exists")
+        users, records = migrate_json_to_sqlite(args.json_path, args.db_path)
+        print(f"Migrated {users} users and {records} records to {args.db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib import style
+from matplotlib.figure import Figure
+
+
+def parse_dates(dates):
+    """Parse 'YYYY-MM-DD HH:MM:SS' strings into a datetime64 array in one call"""
+    return np.array(dates, dtype='datetime64[s]')
+
+
+def lttb(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept; every bucket in between
+    keeps the point forming the largest triangle with the previously kept
+    point and the average of the next bucket, which preserves the visual
+    shape of the line.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    edges = (np.arange(threshold - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def build_trend_figure(username, records):
+    """Dark themed BMI trend figure, downsampled to the figure's pixel width"""
+    dates = parse_dates([entry['date'] for entry in records])
+    bmis = np.array([entry['bmi'] for entry in records], dtype=np.float64)
+
+    # A Figure that is not created through pyplot is not kept alive by it,
+    # and the style context leaves the global rcParams untouched
+    with style.context('dark_background'):
+        fig = Figure(figsize=(10, 6), facecolor='#000000')
+        ax = fig.add_subplot()
+        ax.set_facecolor('#1a1a1a')
+
+        keep = lttb(dates.astype(np.int64), bmis, int(fig.get_figwidth() * fig.dpi))
+        dates = dates[keep]
+        bmis = bmis[keep]
+
+        # Plot with bright colors; markers only while individual points are distinguishable
+        ax.plot(dates, bmis, marker='o' if len(bmis) <= 200 else None, linewidth=3, markersize=8,
+                color='#00FF41', markerfacecolor='#FFFFFF', markeredgecolor='#00FF41')
+
+        # Add BMI category zones
+        ax.axhspan(0, 18.5, alpha=0.2, color='#00BFFF', label='Underweight')
+        ax.axhspan(18.5, 25, alpha=0.2, color='#00FF41', label='Normal')
+        ax.axhspan(25, 30, alpha=0.2, color='#FFB74D', label='Overweight')
+        ax.axhspan(30, 50, alpha=0.2, color='#FF5252', label='Obese')
+
+        ax.set_title(f'📈 BMI Trends for {username}', fontsize=16, fontweight='bold', color='#FFFFFF')
+        ax.set_xlabel('Date', fontsize=12, color='#FFFFFF')
+        ax.set_ylabel('BMI', fontsize=12, color='#FFFFFF')
+        ax.grid(True, alpha=0.3, color='#666666')
+        ax.legend(facecolor='#2a2a2a', edgecolor='#666666', labelcolor='#FFFFFF')
+
+        ax.tick_params(colors='#FFFFFF')
+        ax.tick_params(axis='x', labelrotation=45)
+        fig.tight_layout()
+    return fig
+
+
+class TrendCache:
+    """Rendered trend figures for the most recently viewed users"""
+
+    def __init__(self, max_figures=4):
+        self.max_figures = max_figures
+        self._figures = OrderedDict()
+
+    def get(self, username, build):
+        """Cached figure for username, calling build() on a miss"""
+        fig = self._figures.get(username)
+        if fig is None:
+            fig = build()
+            self._figures[username] = fig
+            if len(self._figures) > self.max_figures:
+                self._figures.popitem(last=False)
+        else:
+            self._figures.move_to_end(username)
+        return fig
+
+    def invalidate(self, username):
+        self._figures.pop(username, None)
@@ -0,0 +1,99 @@
+import tkinter as tk
+from tkinter import font as tkfont
+
+
+class VirtualTable(tk.Frame):
+    """Read-only text table that only formats and renders the rows in view.
+
+    Rows are requested from fetch(start, stop) as the user scrolls, with a
+    small buffer on either side, and turned into text by
+    format_row(index, row). Opening a table therefore costs the same for ten
+    rows as for a million.
+    """
+
+    def __init__(self, parent, total, fetch, format_row, buffer=50, **text_options):
+        super().__init__(parent, bg=text_options.get('bg'))
+        self.total = total
+        self.fetch = fetch
+        self.format_row = format_row
+        self.buffer = buffer
+
+        self.top = 0
+        self.visible = 1
+        self._cache_start = 0
+        self._cache = []
+
+        self.text = tk.Text(self, wrap=tk.NONE, **text_options)
+        self.v_scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.h_scrollbar = tk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.text.xview)
+        self.text.configure(xscrollcommand=self.h_scrollbar.set)
+
+        self.text.grid(row=0, column=0, sticky='nsew')
+        self.v_scrollbar.grid(row=0, column=1, sticky='ns')
+        self.h_scrollbar.grid(row=1, column=0, sticky='ew')
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.line_height = tkfont.Font(font=self.text['font']).metrics('linespace')
+
+        self.text.bind('<Configure>', self._on_resize)
+        self.text.bind('<MouseWheel>', lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.text.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.text.bind('<Button-5>', lambda e: self.scroll(3))
+        self.text.bind('<Up>', lambda e: self.scroll(-1))
+        self.text.bind('<Down>', lambda e: self.scroll(1))
+        self.text.bind('<Prior>', lambda e: self.scroll(-self.visible))
+        self.text.bind('<Next>', lambda e: self.scroll(self.visible))
+        self.text.bind('<Home>', lambda e: self.scroll(-self.total))
+        self.text.bind('<End>', lambda e: self.scroll(self.total))
+
+    def _on_resize(self, event):
+        self.visible = max(1, event.height // self.line_height)
+        self.render()
+
+    def scroll(self, rows):
+        self.top += rows
+        self.render()
+        return 'break'
+
+    def yview(self, *args):
+        """Scrollbar callback: maps the thumb position to the first visible row"""
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * self.total)
+        elif args[0] == 'scroll':
+            step = self.visible if args[2] == 'pages' else 1
+            self.top += int(args[1]) * step
+        self.render()
+
+    def _rows(self, start, stop):
+        """Rows start..stop-1, fetching a buffered window when not cached"""
+        cache_stop = self._cache_start + len(self._cache)
+        if start < self._cache_start or stop > cache_stop:
+            self._cache_start = max(0, start - self.buffer)
+            self._cache = self.fetch(self._cache_start, min(self.total, stop + self.buffer))
+        offset = start - self._cache_start
+        return self._cache[offset:offset + stop - start]
+
+    def render(self):
+        """Draw the rows currently in view"""
+        self.top = max(0, min(self.top, self.total - self.visible))
+        stop = min(self.total, self.top + self.visible)
+        lines = [self.format_row(index, row)
+                 for index, row in enumerate(self._rows(self.top, stop), self.top)]
+
+        self.text.config(state=tk.NORMAL)
+        self.text.delete(1.0, tk.END)
+        self.text.insert(tk.END, '\n'.join(lines))
+        self.text.config(state=tk.DISABLED)
+
+        if self.total:
+            self.v_scrollbar.set(self.top / self.total, stop / self.total)
+        else:
+            self.v_scrollbar.set(0, 1)
+
+    def refresh(self, total):
+        """Drop fetched rows and redraw after the underlying data changed"""
+        self.total = total
+        self._cache = []
+        self._cache_start = 0
+        self.render()
@@ -0,0 +1,149 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from passgen import CHARS, CLASS_NAMES, LEVEL_OF_SCORE, LEVELS, OTHER_POOL
+
+READ_CHUNK = 8 << 20
+# Entropy histogram bins are ENTROPY_BIN bits wide; the last bin collects everything above
+ENTROPY_BIN = 10
+ENTROPY_BINS = 16
+
+# Byte -> class bit (lowercase 1, uppercase 2, numbers 4, symbols 8, anything else 16)
+OTHER_BIT = 16
+CLASS_TABLE = np.full(256, OTHER_BIT, dtype=np.uint8)
+for _bit, _name in enumerate(CLASS_NAMES):
+    CLASS_TABLE[np.frombuffer(CHARS[_name].encode('ascii'), dtype=np.uint8)] = 1 << _bit
+CLASS_TABLE[[ord('\n'), ord('\r')]] = 0
+
+# Byte -> 1 when it starts a character, so UTF-8 lengths match len(str)
+CHAR_START = np.ones(256, dtype=np.int32)
+CHAR_START[0x80:0xC0] = 0
+CHAR_START[[ord('\n'), ord('\r')]] = 0
+
+# Class bits of a line -> number of the four classes present, and log2 of the pool size
+CLASS_COUNT = np.array([bin(bits & 15).count('1') for bits in range(32)], dtype=np.int64)
+_pool = np.array([sum(len(CHARS[name]) for bit, name in enumerate(CLASS_NAMES) if bits & (1 << bit))
+                  + (OTHER_POOL if bits & OTHER_BIT else 0) for bits in range(32)], dtype=np.float64)
+LOG2_POOL = np.log2(np.where(_pool > 0, _pool, 1))
+LEVEL_TABLE = np.array(LEVEL_OF_SCORE)
+
+
+def score_chunk(chunk):
+    """Strength level indices and entropy (bits) of every line in chunk.
+
+    chunk must end with a newline. Characters are classified through the
+    256-entry CLASS_TABLE and reduced per line with reduceat, so the cost
+    does not depend on Python-level work per character or per line.
+    Empty lines are dropped.
+    """
+    data = np.frombuffer(chunk, dtype=np.uint8)
+    ends = np.flatnonzero(data == ord('\n'))
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    lengths = np.add.reduceat(CHAR_START[data], starts)
+    bits = np.bitwise_or.reduceat(CLASS_TABLE[data], starts)
+    keep = lengths > 0
+    lengths = lengths[keep]
+    bits = bits[keep]
+
+    score = (lengths >= 8).astype(np.int64) + (lengths >= 12) + (lengths >= 16) + CLASS_COUNT[bits]
+    return LEVEL_TABLE[score], lengths * LOG2_POOL[bits]
+
+
+def iter_chunks(f, chunk_size=READ_CHUNK):
+    """Newline-terminated chunks of a binary file of about chunk_size bytes"""
+    carry = b''
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            if carry:
+                yield carry + b'\n'
+            return
+        data = carry + data
+        cut = data.rfind(b'\n') + 1
+        carry = data[cut:]
+        if cut:
+            yield data[:cut]
+
+
+class AuditReport:
+    """Per-strength and per-entropy histograms of audited passwords"""
+
+    def __init__(self):
+        self.lines = 0
+        self.level_counts = np.zeros(len(LEVELS), dtype=np.int64)
+        self.entropy_counts = np.zeros(ENTROPY_BINS, dtype=np.int64)
+        self.entropy_total = 0.0
+        self.seconds = 0.0
+
+    def add(self, levels, entropy):
+        self.lines += len(levels)
+        self.level_counts += np.bincount(levels, minlength=len(LEVELS))
+        bins = np.minimum(entropy // ENTROPY_BIN, ENTROPY_BINS - 1).astype(np.int64)
+        self.entropy_counts += np.bincount(bins, minlength=ENTROPY_BINS)
+        self.entropy_total += float(entropy.sum())
+
+    @property
+    def mean_entropy(self):
+        return self.entropy_total / self.lines if self.lines else 0.0
+
+    def to_dict(self):
+        return {
+            'lines': self.lines,
+            'levels': {name: int(count) for (name, _), count in zip(LEVELS, self.level_counts)},
+            'entropy_bits': {f"{i * ENTROPY_BIN}+" if i == ENTROPY_BINS - 1
+                             else f"{i * ENTROPY_BIN}-{(i + 1) * ENTROPY_BIN}": int(count)
+                             for i, count in enumerate(self.entropy_counts)},
+            'mean_entropy_bits': round(self.mean_entropy, 2),
+            'seconds': round(self.seconds, 3),
+        }
+
+    def write_text(self, out):
+        total = max(self.lines, 1)
+        out.write(f"Audited {self.lines} passwords\n\n")
+        for (name, _), count in zip(LEVELS, self.level_counts):
+            out.write(f"{name:<12} {count:>12}  {count / total:6.1%}  {'█' * round(40 * count / total)}\n")
+        out.write("\nEntropy (bits)\n")
+        for label, count in self.to_dict()['entropy_bits'].items():
+            out.write(f"{label:>8} {count:>12}  {count / total:6.1%}\n")
+        out.write(f"\nMean entropy: {self.mean_entropy:.1f} bits\n")
+
+
+def audit_file(f, chunk_size=READ_CHUNK, report=None):
+    """Stream a binary file of one password per line into an AuditReport"""
+    report = report or AuditReport()
+    start = time.perf_counter()
+    for chunk in iter_chunks(f, chunk_size):
+        report.add(*score_chunk(chunk))
+    report.seconds += time.perf_counter() - start
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit password lists with the strength checker's scoring")
+    parser.add_argument('inputs', nargs='+', help="files with one password per line ('-' for stdin)")
+    parser.add_argument('--chunk-size', type=int, default=READ_CHUNK, help="bytes read at a time")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = AuditReport()
+    for path in args.inputs:
+        if path == '-':
+            audit_file(sys.stdin.buffer, args.chunk_size, report)
+        else:
+            with open(path, 'rb') as f:
+                audit_file(f, args.chunk_size, report)
+
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        report.write_text(sys.stdout)
+    rate = report.lines / report.seconds if report.seconds else float('inf')
+    print(f"Scored {report.lines} lines in {report.seconds:.2f}s ({rate:,.0f} lines/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import argparse
+import hashlib
+import math
+import mmap
+import struct
+import sys
+import time
+
+import numpy as np
+
+MAGIC = b'PWBLOOM1'
+# magic, number of bits, number of hash functions, number of items added
+HEADER = struct.Struct('<8sQIQ')
+MASK64 = (1 << 64) - 1
+BATCH = 1_000_000
+
+
+def optimal_size(capacity, fp_rate):
+    """(bits, hashes) for capacity items at the given false positive rate"""
+    bits = max(int(math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)), 64)
+    hashes = max(int(round(bits / max(capacity, 1) * math.log(2))), 1)
+    return bits, hashes
+
+
+def _digests(items):
+    """(n, 2) uint64 array of the two 64-bit halves of every item's blake2b hash"""
+    joined = b''.join(hashlib.blake2b(item, digest_size=16).digest() for item in items)
+    return np.frombuffer(joined, dtype='<u8').reshape(-1, 2)
+
+
+def _encode(item):
+    return item.encode('utf-8') if isinstance(item, str) else item
+
+
+class BloomFilter:
+    """Memory-mapped Bloom filter of known-bad passwords.
+
+    Positions come from double hashing one blake2b digest,
+    (h1 + i * h2) mod bits for i < hashes, computed modulo 2**64 so the
+    scalar and the vectorized paths agree. Pages of the file are only read
+    when a lookup touches them, so opening even a multi-GB index is instant.
+    """
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self._file = open(path, 'r+b' if writable else 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, self.bits, self.hashes, self.count = HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a password Bloom filter index")
+        self._array = np.frombuffer(self._mm, dtype=np.uint8, offset=HEADER.size)
+
+    @classmethod
+    def create(cls, path, capacity, fp_rate=0.01):
+        """Empty filter file sized for capacity items"""
+        bits, hashes = optimal_size(capacity, fp_rate)
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, bits, hashes, 0))
+            f.truncate(HEADER.size + (bits + 7) // 8)
+        return cls(path, writable=True)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(_encode(item), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        return [((h1 + i * h2) & MASK64) % self.bits for i in range(self.hashes)]
+
+    def _positions_many(self, items):
+        digests = _digests([_encode(item) for item in items])
+        steps = np.arange(self.hashes, dtype=np.uint64)
+        # uint64 arithmetic wraps modulo 2**64 like the & MASK64 in _positions
+        return (digests[:, :1] + steps * digests[:, 1:]) % np.uint64(self.bits)
+
+    def __contains__(self, item):
+        offset = HEADER.size
+        mm = self._mm
+        return all(mm[offset + (position >> 3)] >> (position & 7) & 1 for position in self._positions(item))
+
+    def contains_many(self, items):
+        """Boolean array telling which items are (probably) in the filter"""
+        if not len(items):
+            return np.zeros(0, dtype=bool)
+        positions = self._positions_many(items)
+        found = (self._array[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return found.all(axis=1)
+
+    def add_many(self, items):
+        positions = self._positions_many(items).ravel()
+        np.bitwise_or.at(self._array, positions >> np.uint64(3),
+                         (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+        self.count += len(items)
+        HEADER.pack_into(self._mm, 0, MAGIC, self.bits, self.hashes, self.count)
+
+    def add(self, item):
+        self.add_many([item])
+
+    @property
+    def size_bytes(self):
+        return HEADER.size + (self.bits + 7) // 8
+
+    def close(self):
+        self._array = None
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_lines(paths):
+    """Lines of every file as bytes, without line endings or empty lines"""
+    for path in paths:
+        with open(path, 'rb', buffering=1 << 20) as f:
+            for line in f:
+                line = line.rstrip(b'\r\n')
+                if line:
+                    yield line
+
+
+def count_lines(paths):
+    total = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(8 << 20), b''):
+                total += chunk.count(b'\n')
+    return total
+
+
+def build(paths, output, fp_rate=0.01, capacity=None):
+    """Build an index from wordlists; returns the filter (open for writing)"""
+    capacity = capacity or count_lines(paths)
+    bloom = BloomFilter.create(output, capacity, fp_rate)
+    batch = []
+    for line in iter_lines(paths):
+        batch.append(line)
+        if len(batch) >= BATCH:
+            bloom.add_many(batch)
+            batch = []
+    if batch:
+        bloom.add_many(batch)
+    bloom._mm.flush()
+    return bloom
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline breached-password index")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', help="build an index from wordlists (one password per line)")
+    build_parser.add_argument('inputs', nargs='+')
+    build_parser.add_argument('-o', '--output', default='breached.bloom')
+    build_parser.add_argument('--fp-rate', type=float, default=0.01, help="false positive rate (default 0.01)")
+    build_parser.add_argument('--capacity', type=int, help="expected entries (counted from the inputs by default)")
+
+    check_parser = commands.add_parser('check', help="look passwords up in an index")
+    check_parser.add_argument('index')
+    check_parser.add_argument('passwords', nargs='*', help="passwords to check (read from stdin when omitted)")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        with build(args.inputs, args.output, args.fp_rate, args.capacity) as bloom:
+            print(f"Indexed {bloom.count} entries into {args.output} "
+                  f"({bloom.size_bytes / 2**20:.1f} MiB, {bloom.hashes} hashes) "
+                  f"in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        return
+
+    with BloomFilter(args.index) as bloom:
+        passwords = args.passwords or [line.rstrip('\r\n') for line in sys.stdin]
+        for password, found in zip(passwords, bloom.contains_many(passwords)):
+            print(f"{'BREACHED' if found else 'ok':<9} {password}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from passgen import add_policy_arguments, check_strength, generate_many, policy_from_args
+
+FORMATS = ('txt', 'csv', 'ndjson', 'json')
+
+
+def format_for(filename):
+    """(format, gzip?) implied by a file name such as batch.ndjson.gz (txt by default)"""
+    compress = filename.lower().endswith('.gz')
+    stem = filename[:-3] if compress else filename
+    extension = os.path.splitext(stem)[1].lower().lstrip('.')
+    return (extension if extension in FORMATS else 'txt'), compress
+
+
+class BatchExporter(threading.Thread):
+    """Generate a batch of passwords and stream it to a file.
+
+    A producer thread generates and encodes batches while this thread
+    compresses and writes them; a bounded queue between the two keeps at
+    most queue_size batches in memory, however large count is. The output
+    goes to a temp file that is only renamed to filename on success.
+    """
+
+    def __init__(self, filename, count, policy, fmt=None, compress=None, batch_size=50_000, queue_size=8,
+                 reject=None):
+        super().__init__(daemon=True)
+        default_fmt, default_compress = format_for(filename)
+        self.filename = filename
+        self.count = count
+        self.policy = policy
+        self.fmt = fmt or default_fmt
+        self.compress = default_compress if compress is None else compress
+        self.batch_size = batch_size
+        self.reject = reject
+
+        self.generated = 0
+        self.written = 0
+        self.bytes_written = 0
+        self.seconds = 0.0
+        self.error = None
+        self._queue = queue.Queue(queue_size)
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def encode(self, passwords, first):
+        """Bytes of one batch in the export format"""
+        if self.fmt == 'txt':
+            return ('\n'.join(passwords) + '\n').encode()
+        if self.fmt == 'csv':
+            text = io.StringIO()
+            csv.writer(text, lineterminator='\n').writerows([p, len(p), check_strength(p)[0]] for p in passwords)
+            return text.getvalue().encode()
+        items = [json.dumps({'password': p, 'length': len(p), 'strength': check_strength(p)[0]})
+                 for p in passwords]
+        if self.fmt == 'ndjson':
+            return ('\n'.join(items) + '\n').encode()
+        return (("" if first else ",\n") + ",\n".join(items)).encode()
+
+    def header(self):
+        return {'csv': b"password,length,strength\n", 'json': b"[\n"}.get(self.fmt, b"")
+
+    def footer(self):
+        return b"\n]\n" if self.fmt == 'json' else b""
+
+    def produce(self):
+        try:
+            while self.generated < self.count and not self._cancel.is_set():
+                size = min(self.batch_size, self.count - self.generated)
+                passwords = generate_many(size, self.policy, reject=self.reject)
+                data = self.encode(passwords, self.generated == 0)
+                self.generated += size
+                self._queue.put((size, data))
+        except Exception as e:
+            self.error = e
+        finally:
+            self._queue.put(None)
+
+    def run(self):
+        tmp_path = self.filename + '.part'
+        start = time.perf_counter()
+        producer = threading.Thread(target=self.produce, daemon=True)
+        producer.start()
+        try:
+            with open(tmp_path, 'wb', buffering=1 << 20) as raw:
+                out = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) if self.compress else raw
+                with out:
+                    out.write(self.header())
+                    while True:
+                        item = self._queue.get()
+                        if item is None:
+                            break
+                        size, data = item
+                        out.write(data)
+                        self.written += size
+                        self.bytes_written += len(data)
+                    out.write(self.footer())
+            if self.error is not None or self._cancel.is_set():
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, self.filename)
+        except Exception as e:
+            self.error = e
+            self._cancel.set()
+            # Unblock the producer so it can finish
+            while producer.is_alive():
+                try:
+                    self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        finally:
+            producer.join()
+            self.seconds = time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a generated batch as txt/CSV/NDJSON/JSON, optionally gzipped")
+    parser.add_argument('-n', '--count', type=int, required=True, help="number of passwords")
+    add_policy_arguments(parser)
+    parser.add_argument('-o', '--output', required=True,
+                        help="output file; the format follows the extension (.txt .csv .ndjson .json, plus .gz)")
+    parser.add_argument('--format', choices=FORMATS, help="override the format implied by the extension")
+    parser.add_argument('--batch-size', type=int, default=50_000, help="passwords generated at a time")
+    parser.add_argument('--reject', metavar='INDEX', help="never emit passwords found in this passbloom index")
+    args = parser.parse_args()
+
+    try:
+        policy = policy_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    reject = None
+    if args.reject:
+        from passbloom import BloomFilter
+        reject = BloomFilter(args.reject)
+
+    exporter = BatchExporter(args.output, args.count, policy, args.format, batch_size=args.batch_size,
+                             reject=reject)
+    exporter.start()
+    exporter.join()
+    if exporter.error is not None:
+        print(f"Export failed: {exporter.error}", file=sys.stderr)
+        sys.exit(1)
+
+    seconds = exporter.seconds or float('inf')
+    print(f"Exported {exporter.written} passwords to {args.output} in {exporter.seconds:.2f}s "
+          f"({exporter.written / seconds:,.0f} passwords/s, {exporter.bytes_written / seconds / 2**20:.1f} MiB/s)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
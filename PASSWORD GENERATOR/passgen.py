@@ -0,0 +1,287 @@
+import argparse
+import math
+import os
+import secrets
+import sys
+import time
+from array import array
+
+# Character sets (JavaScript style), shared with the GUI
+CHARS = {
+    'lowercase': "abcdefghijklmnopqrstuvwxyz",
+    'uppercase': "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    'numbers': "0123456789",
+    'symbols': "!@#$%^&*()-_=+[]{}|;:,.<>?"
+}
+CLASS_NAMES = ('lowercase', 'uppercase', 'numbers', 'symbols')
+
+# Strength levels and colors, indexed through LEVEL_OF_SCORE by the score
+# (one point per length threshold 8/12/16 and per character class present)
+LEVELS = [("Very Weak", "#FF4757"), ("Weak", "#FF6B7A"), ("Good", "#FFA502"),
+          ("Strong", "#4ECDC4"), ("Very Strong", "#2ED573")]
+LEVEL_OF_SCORE = (0, 0, 0, 1, 1, 2, 3, 4)
+# Upper entropy bounds (bits) of the first four levels, for passphrases
+ENTROPY_LEVELS = (28, 36, 60, 128)
+
+# Candidates drawn per requested password before a breach index is taken to cover the whole policy
+MAX_CANDIDATES = 100
+
+# Pool size assumed for characters outside the four classes (rest of printable ASCII)
+OTHER_POOL = 95 - sum(len(chars) for chars in CHARS.values())
+
+# Every class character translates to its class's marker letter
+_POOL = {marker: len(CHARS[name]) for marker, name in zip('luns', CLASS_NAMES)}
+_CLASS_MARKERS = str.maketrans({c: marker for marker, name in zip('luns', CLASS_NAMES) for c in CHARS[name]})
+
+
+class Policy:
+    """Length and character classes of generated passwords"""
+
+    def __init__(self, length=24, upper=False, lower=False, nums=True, special=True):
+        # Lowercase, uppercase, numbers, symbols: the order the original generator concatenated them in
+        enabled = {'lowercase': lower, 'uppercase': upper, 'numbers': nums, 'symbols': special}
+        self.length = length
+        self.classes = [name for name, on in enabled.items() if on]
+        self.alphabet = ''.join(CHARS[name] for name in self.classes)
+
+        if not self.classes:
+            raise ValueError("Please select at least one character type!")
+        if length < len(self.classes):
+            raise ValueError(f"Length must be at least {len(self.classes)} for the selected character types")
+
+    def __repr__(self):
+        return f"Policy(length={self.length}, classes={self.classes})"
+
+
+class SecureRandom:
+    """Buffered os.urandom source with unbiased rejection sampling"""
+
+    def __init__(self, buffer_size=1 << 16):
+        self.buffer_size = buffer_size
+        self._buffer = b''
+        self._position = 0
+        self._tables = {}
+
+    def reset(self):
+        """Drop buffered bytes, e.g. so a forked child never reuses its parent's"""
+        self._buffer = b''
+        self._position = 0
+
+    def bytes(self, count):
+        if self._position + count > len(self._buffer):
+            self._buffer = self._buffer[self._position:] + os.urandom(max(self.buffer_size, count))
+            self._position = 0
+        data = self._buffer[self._position:self._position + count]
+        self._position += count
+        return data
+
+    def below(self, n):
+        """Uniform integer in [0, n)"""
+        if n > 256:
+            return secrets.randbelow(n)
+        limit = 256 - 256 % n
+        while True:
+            value = self.bytes(1)[0]
+            if value < limit:
+                return value % n
+
+    def indices(self, bound, count):
+        """count uniform integers in [0, bound) for bound up to 2**32.
+
+        Draws 32-bit values in bulk and rejects those at or above the largest
+        multiple of bound, so every index is exactly equally likely.
+        """
+        limit = (1 << 32) - (1 << 32) % bound
+        result = []
+        while len(result) < count:
+            needed = count - len(result)
+            values = array('I')
+            values.frombytes(self.bytes(4 * (needed + needed // 64 + 8)))
+            result += [value % bound for value in values if value < limit][:needed]
+        return result
+
+    def _table(self, alphabet):
+        """Translation table mapping accepted bytes to characters, plus bytes to reject"""
+        table = self._tables.get(alphabet)
+        if table is None:
+            size = len(alphabet)
+            limit = 256 - 256 % size
+            encoded = alphabet.encode('ascii')
+            table = (bytes(encoded[b % size] if b < limit else 0 for b in range(256)),
+                     bytes(range(limit, 256)), limit)
+            self._tables[alphabet] = table
+        return table
+
+    def choices(self, alphabet, count):
+        """count characters drawn uniformly from an ASCII alphabet of up to 256 characters.
+
+        Random bytes are mapped to characters with bytes.translate, which
+        also deletes the bytes above the largest multiple of the alphabet
+        size, so there is no modulo bias and no per-character Python work.
+        """
+        table, rejected, limit = self._table(alphabet)
+        parts = []
+        needed = count
+        while needed > 0:
+            # Ask for enough bytes that one round almost always suffices
+            chunk = self.bytes(needed * 256 // limit + 16).translate(table, rejected)
+            parts.append(chunk[:needed])
+            needed -= len(parts[-1])
+        return b''.join(parts).decode('ascii')
+
+
+_random = SecureRandom()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_random.reset)
+
+
+def _generate(count, policy, rng):
+    """count passwords for policy.
+
+    Each password holds one uniformly chosen character of every enabled
+    class and is filled with characters from the combined alphabet; the
+    mandatory characters are then inserted at uniformly random positions,
+    which gives the same distribution as an unbiased shuffle.
+    """
+    mandatory_count = len(policy.classes)
+    fill_length = policy.length - mandatory_count
+    fill = rng.choices(policy.alphabet, count * fill_length)
+    mandatory = [rng.choices(CHARS[name], count) for name in policy.classes]
+    below = rng.below
+
+    passwords = []
+    for i in range(count):
+        chars = list(fill[i * fill_length:(i + 1) * fill_length])
+        for j, class_chars in enumerate(mandatory):
+            chars.insert(below(fill_length + j + 1), class_chars[i])
+        passwords.append(''.join(chars))
+    return passwords
+
+
+def generate_many(count, policy, rng=None, reject=None):
+    """Generate count passwords for policy.
+
+    reject is an optional index of known-bad passwords (see passbloom);
+    passwords it contains are dropped and replaced.
+    """
+    rng = rng or _random
+    passwords = _generate(count, policy, rng)
+    if reject is None:
+        return passwords
+    return replace_rejected(passwords, count, lambda missing: _generate(missing, policy, rng), reject)
+
+
+def replace_rejected(passwords, count, generate, reject):
+    """Drop the passwords reject contains and refill with generate(missing) until count remain.
+
+    Raises ValueError once MAX_CANDIDATES per password have been drawn, as
+    the index then covers nearly every password the policy can produce.
+    """
+    drawn = len(passwords)
+    while True:
+        passwords = [password for password, bad in zip(passwords, reject.contains_many(passwords)) if not bad]
+        missing = count - len(passwords)
+        if not missing:
+            return passwords
+        if drawn >= count * MAX_CANDIDATES:
+            raise ValueError("This policy is too weak: nearly every password it allows is in the breach list. "
+                             "Use a longer length or more character types.")
+        passwords += generate(missing)
+        drawn += missing
+
+
+def generate(policy, rng=None, reject=None):
+    return generate_many(1, policy, rng, reject)[0]
+
+
+def _markers(password):
+    """Set of class markers ('l', 'u', 'n', 's') of password plus any characters outside the classes"""
+    return set(password.translate(_CLASS_MARKERS))
+
+
+def check_strength(password, breached=None):
+    """Strength level and color, scored like the GUI's check_password_strength.
+
+    Passwords found in the optional breached index are always "Very Weak".
+    """
+    if breached is not None and password in breached:
+        return LEVELS[0]
+    length = len(password)
+    score = (length >= 8) + (length >= 12) + (length >= 16) + len(_markers(password) & _POOL.keys())
+    return LEVELS[LEVEL_OF_SCORE[score]]
+
+
+def entropy_bits(password):
+    """Brute-force entropy estimate: length times log2 of the pool of character classes used"""
+    markers = _markers(password)
+    pool = sum(_POOL[marker] for marker in markers & _POOL.keys())
+    if markers - _POOL.keys():
+        pool += OTHER_POOL
+    return len(password) * math.log2(pool) if pool else 0.0
+
+
+def level_for_entropy(bits):
+    """Strength level and color for an entropy estimate in bits"""
+    for threshold, level in zip(ENTROPY_LEVELS, LEVELS):
+        if bits < threshold:
+            return level
+    return LEVELS[-1]
+
+
+def benchmark(policy, count):
+    """Passwords per second of generate_many for a batch of count passwords"""
+    start = time.perf_counter()
+    generate_many(count, policy)
+    return count / (time.perf_counter() - start)
+
+
+def add_policy_arguments(parser):
+    parser.add_argument('-l', '--length', type=int, default=24)
+    parser.add_argument('--upper', action='store_true', help="include uppercase letters")
+    parser.add_argument('--lower', action='store_true', help="include lowercase letters")
+    parser.add_argument('--numbers', action='store_true', help="include numbers")
+    parser.add_argument('--symbols', action='store_true', help="include symbols")
+
+
+def policy_from_args(args):
+    """Policy from parsed arguments; every class is enabled when none was chosen"""
+    flags = [args.upper, args.lower, args.numbers, args.symbols]
+    if not any(flags):
+        flags = [True] * 4
+    return Policy(args.length, *flags)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate passwords in bulk")
+    parser.add_argument('-n', '--count', type=int, default=1, help="number of passwords")
+    add_policy_arguments(parser)
+    parser.add_argument('--batch-size', type=int, default=100_000, help="passwords generated at a time")
+    parser.add_argument('--reject', metavar='INDEX', help="never emit passwords found in this passbloom index")
+    parser.add_argument('--benchmark', action='store_true', help="report passwords per second instead")
+    args = parser.parse_args()
+
+    try:
+        policy = policy_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    reject = None
+    if args.reject:
+        from passbloom import BloomFilter
+        reject = BloomFilter(args.reject)
+
+    if args.benchmark:
+        rate = benchmark(policy, args.count)
+        print(f"{args.count} passwords of length {policy.length}: {rate:,.0f} passwords/s")
+        return
+
+    try:
+        for start in range(0, args.count, args.batch_size):
+            batch = generate_many(min(args.batch_size, args.count - start), policy, reject=reject)
+            sys.stdout.write('\n'.join(batch) + '\n')
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from passgen import CHARS, add_policy_arguments, generate_many, policy_from_args
+
+
+def _alphabet_array(alphabet):
+    return np.frombuffer(alphabet.encode('ascii'), dtype=np.uint8)
+
+
+def random_below(bound, count):
+    """count uniform integers in [0, bound) from os.urandom, bound <= 256.
+
+    Bytes at or above the largest multiple of bound are rejected as a
+    whole array at a time, so the result carries no modulo bias.
+    """
+    if count == 0:
+        return np.empty(0, dtype=np.uint8)
+    limit = 256 - 256 % bound
+    parts = []
+    needed = count
+    while needed > 0:
+        data = np.frombuffer(os.urandom(needed * 256 // limit + 64), dtype=np.uint8)
+        accepted = data[data < limit][:needed]
+        parts.append(accepted)
+        needed -= len(accepted)
+    result = np.concatenate(parts) if len(parts) > 1 else parts[0]
+    # Every byte is already below 256, which np.uint8 cannot hold
+    return result if bound == 256 else result % np.uint8(bound)
+
+
+def shuffle_rows(matrix):
+    """Fisher–Yates shuffle every row independently, one column step at a time"""
+    count, length = matrix.shape
+    rows = np.arange(count)
+    for i in range(length - 1, 0, -1):
+        j = random_below(i + 1, count)
+        column = matrix[:, i].copy()
+        matrix[:, i] = matrix[rows, j]
+        matrix[rows, j] = column
+    return matrix
+
+
+def generate_matrix(count, policy):
+    """(count, length) uint8 matrix of passwords for policy.
+
+    The first columns hold one character of every enabled class and the
+    rest are drawn from the combined alphabet; an unbiased per-row shuffle
+    then moves the mandatory characters to uniformly random positions.
+    """
+    mandatory_count = len(policy.classes)
+    matrix = np.empty((count, policy.length), dtype=np.uint8)
+    for column, name in enumerate(policy.classes):
+        chars = _alphabet_array(CHARS[name])
+        matrix[:, column] = chars[random_below(len(chars), count)]
+    alphabet = _alphabet_array(policy.alphabet)
+    fill = random_below(len(alphabet), count * (policy.length - mandatory_count))
+    matrix[:, mandatory_count:] = alphabet[fill].reshape(count, policy.length - mandatory_count)
+    return shuffle_rows(matrix)
+
+
+def to_lines(matrix):
+    """Newline-terminated password lines as one bytes object"""
+    lines = np.empty((matrix.shape[0], matrix.shape[1] + 1), dtype=np.uint8)
+    lines[:, :-1] = matrix
+    lines[:, -1] = ord('\n')
+    return lines.tobytes()
+
+
+def decode(matrix):
+    """Passwords of a matrix as a list of str"""
+    return to_lines(matrix).decode('ascii').splitlines()
+
+
+def expected_frequencies(policy):
+    """Probability of every alphabet character at any single position"""
+    length = policy.length
+    fill_share = (length - len(policy.classes)) / length
+    probabilities = {c: fill_share / len(policy.alphabet) for c in policy.alphabet}
+    for name in policy.classes:
+        for c in CHARS[name]:
+            probabilities[c] += 1 / (length * len(CHARS[name]))
+    return probabilities
+
+
+def uniformity_check(policy, count=200_000, generator=None):
+    """Chi-square test of character frequencies at every position.
+
+    Returns a list of (position, chi2, dof, z) rows plus one for all positions
+    together (position None); z is the Wilson–Hilferty normal score, so
+    |z| above ~4 means the output is very unlikely to be unbiased.
+    """
+    generator = generator or generate_matrix
+    matrix = generator(count, policy)
+    probabilities = expected_frequencies(policy)
+    alphabet = _alphabet_array(''.join(probabilities))
+    expected = np.array(list(probabilities.values()))
+    dof = len(expected) - 1
+
+    def row(position, counts, total):
+        chi2 = float((((counts - expected * total) ** 2) / (expected * total)).sum())
+        ratio = chi2 / dof
+        z = (ratio ** (1 / 3) - (1 - 2 / (9 * dof))) / (2 / (9 * dof)) ** 0.5
+        return position, chi2, dof, z
+
+    lookup = np.zeros(256, dtype=np.int64)
+    lookup[alphabet] = np.arange(len(alphabet))
+    indices = lookup[matrix]
+    counts = np.zeros((policy.length, len(alphabet)), dtype=np.int64)
+    for position in range(policy.length):
+        counts[position] = np.bincount(indices[:, position], minlength=len(alphabet))
+
+    results = [row(position, counts[position], count) for position in range(policy.length)]
+    results.append(row(None, counts.sum(axis=0), count * policy.length))
+    return results
+
+
+def benchmark(policy, count):
+    """Passwords per second of the NumPy and pure-Python paths"""
+    start = time.perf_counter()
+    decode(generate_matrix(count, policy))
+    vectorized = count / (time.perf_counter() - start)
+    start = time.perf_counter()
+    generate_many(count, policy)
+    pure = count / (time.perf_counter() - start)
+    return vectorized, pure
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate passwords in bulk with NumPy")
+    parser.add_argument('-n', '--count', type=int, default=1, help="number of passwords")
+    add_policy_arguments(parser)
+    parser.add_argument('-o', '--output', help="write passwords to this file instead of stdout")
+    parser.add_argument('--batch-size', type=int, default=1_000_000, help="passwords generated at a time")
+    parser.add_argument('--check', action='store_true', help="run a chi-square uniformity check on COUNT passwords")
+    parser.add_argument('--benchmark', action='store_true', help="compare passwords per second with passgen")
+    args = parser.parse_args()
+
+    try:
+        policy = policy_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.check:
+        results = uniformity_check(policy, args.count)
+        for position, chi2, dof, z in results:
+            label = "all" if position is None else f"{position:>3}"
+            print(f"position {label}: chi2 {chi2:10.1f}  dof {dof}  z {z:+.2f}")
+        worst = max(abs(z) for *_, z in results)
+        print("uniform" if worst < 4 else f"BIASED (|z| = {worst:.1f})")
+        sys.exit(0 if worst < 4 else 1)
+
+    if args.benchmark:
+        vectorized, pure = benchmark(policy, args.count)
+        print(f"numpy:   {vectorized:>12,.0f} passwords/s")
+        print(f"passgen: {pure:>12,.0f} passwords/s  ({vectorized / pure:.1f}x)")
+        return
+
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for start in range(0, args.count, args.batch_size):
+            out.write(to_lines(generate_matrix(min(args.batch_size, args.count - start), policy)))
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
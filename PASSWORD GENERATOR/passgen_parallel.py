@@ -0,0 +1,255 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from passbloom import BloomFilter
+from passgen import MAX_CANDIDATES, add_policy_arguments, policy_from_args
+from passgen_numpy import generate_matrix, to_lines
+
+SHARD_SIZE = 1_000_000
+# Fingerprints per dedup bucket; the parent holds one bucket in memory at a time
+BUCKET_SIZE = 1 << 20
+
+
+def plan_shards(count, output, shard_size=SHARD_SIZE):
+    """(index, count, path) of every shard; depends only on the arguments"""
+    return [(index, min(shard_size, count - start), f"{output}.shard{index:05d}")
+            for index, start in enumerate(range(0, count, shard_size))]
+
+
+def bucket_bits(count):
+    """Top fingerprint bits to bucket by, so a bucket holds about BUCKET_SIZE fingerprints at most"""
+    return (max(count - 1, 0) // BUCKET_SIZE).bit_length()
+
+
+def buckets_of(hashes, bits):
+    return (hashes >> np.uint64(64 - bits)).astype(np.intp) if bits else np.zeros(len(hashes), dtype=np.intp)
+
+
+def fingerprints(matrix):
+    """64-bit FNV-1a hash of every row of a (count, length) uint8 matrix.
+
+    Rows with equal fingerprints are treated as duplicates. Two different
+    passwords collide with probability ~n**2 / 2**65, and a collision only
+    costs a discarded password that is topped up like any duplicate.
+    """
+    hashes = np.full(matrix.shape[0], 0xcbf29ce484222325, dtype=np.uint64)
+    prime = np.uint64(0x100000001b3)
+    for column in range(matrix.shape[1]):
+        hashes ^= matrix[:, column]
+        hashes *= prime
+    return hashes
+
+
+def generate_lines(policy, count, reject=None):
+    """count passwords as a uint8 matrix, less those found in the passbloom index at reject"""
+    matrix = generate_matrix(count, policy)
+    if reject:
+        with BloomFilter(reject) as bloom:
+            matrix = matrix[~bloom.contains_many(matrix.view(f'S{policy.length}').ravel().tolist())]
+    return matrix
+
+
+def write_fingerprints(hashes, path, bits):
+    """Save (fingerprint, line number) pairs to one file per bucket of the top bits of the fingerprint"""
+    buckets = buckets_of(hashes, bits)
+    order = np.argsort(buckets, kind='stable')
+    pairs = np.column_stack((hashes, np.arange(len(hashes), dtype=np.uint64)))[order]
+    splits = np.cumsum(np.bincount(buckets, minlength=1 << bits))[:-1]
+    for bucket, part in enumerate(np.split(pairs, splits)):
+        part.tofile(f"{path}.fp{bucket:04d}")
+
+
+def generate_shard(policy, count, path, reject=None, bits=0):
+    """Worker: write count passwords to path in generation order.
+
+    Every process reads os.urandom itself, so the streams are independent
+    without any seeding. Passwords found in the passbloom index at reject
+    are left out. The fingerprints of the lines go to per-bucket files next
+    to path (see write_fingerprints). Returns how many lines were written.
+    """
+    matrix = generate_lines(policy, count, reject)
+    with open(path, 'wb') as out:
+        out.write(to_lines(matrix))
+    write_fingerprints(fingerprints(matrix), path, bits)
+    return len(matrix)
+
+
+def first_occurrences(hashes, seen=None):
+    """Mask of the hashes that are neither in the sorted array seen nor repeats of an earlier hash"""
+    _, first = np.unique(hashes, return_index=True)
+    mask = np.zeros(len(hashes), dtype=bool)
+    mask[first] = True
+    if seen is not None and len(seen):
+        mask &= ~np.isin(hashes, seen, assume_unique=False)
+    return mask
+
+
+def dedupe_bucket(paths, bucket, seen_path):
+    """Find the repeats within one fingerprint bucket of every shard, in generation order.
+
+    Shards are read in order and each shard's pairs are in line order, so
+    the first occurrence of a fingerprint is the earliest line. Repeated
+    line numbers are appended to the shard's .drop file, and the bucket's
+    distinct fingerprints are saved sorted to seen_path for the top-up.
+    """
+    parts = [np.fromfile(f"{path}.fp{bucket:04d}", dtype=np.uint64).reshape(-1, 2) for path in paths]
+    pairs = np.concatenate(parts) if parts else np.zeros((0, 2), dtype=np.uint64)
+    distinct, first = np.unique(pairs[:, 0], return_index=True)
+    distinct.tofile(seen_path)
+    repeated = np.ones(len(pairs), dtype=bool)
+    repeated[first] = False
+    end = 0
+    for path, part in zip(paths, parts):
+        start, end = end, end + len(part)
+        drops = pairs[start:end, 1][repeated[start:end]]
+        if len(drops):
+            with open(f"{path}.drop", 'ab') as f:
+                drops.tofile(f)
+
+
+def remember(hashes, seen_paths, bits):
+    """Mask of the hashes not in the per-bucket seen files nor repeated earlier; adds them to the files"""
+    mask = np.zeros(len(hashes), dtype=bool)
+    buckets = buckets_of(hashes, bits)
+    for bucket in np.unique(buckets):
+        here = buckets == bucket
+        seen = np.fromfile(seen_paths[bucket], dtype=np.uint64)
+        fresh = first_occurrences(hashes[here], seen)
+        mask[here] = fresh
+        np.union1d(seen, hashes[here][fresh]).tofile(seen_paths[bucket])
+    return mask
+
+
+def append_shard(out, path, length, limit):
+    """Copy the lines of a shard not listed in its .drop file to out, at most limit of them; returns how many"""
+    lines = np.fromfile(path, dtype=np.uint8).reshape(-1, length + 1)
+    if os.path.exists(f"{path}.drop"):
+        lines = np.delete(lines, np.fromfile(f"{path}.drop", dtype=np.uint64).astype(np.intp), axis=0)
+    lines = lines[:limit]
+    out.write(lines.tobytes())
+    return len(lines)
+
+
+def _remove(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def generate_parallel(count, policy, output, workers=None, shard_size=SHARD_SIZE, pool=None, keep_shards=False,
+                      reject=None):
+    """Generate count unique passwords into output using a pool of processes.
+
+    Workers write shards plus their 64-bit fingerprints split into buckets
+    by the top bits. The parent dedupes one bucket at a time, so its memory
+    stays at about BUCKET_SIZE fingerprints however large count is, then
+    copies the surviving lines in generation order, so a line's position
+    says nothing about its content. Passwords lost as duplicates, or
+    rejected by the index at reject, are topped up until output has exactly
+    count lines; ValueError is raised once MAX_CANDIDATES per password have
+    been drawn, as the policy then allows too few distinct passwords.
+    """
+    workers = workers or os.cpu_count()
+    bits = bucket_bits(count)
+    shards = plan_shards(count, output, shard_size)
+    paths = [path for _, _, path in shards]
+    seen_paths = [f"{output}.seen{bucket:04d}" for bucket in range(1 << bits)]
+    scratch = seen_paths + [f"{path}.drop" for path in paths] + [f"{path}.fp{bucket:04d}" for path in paths
+                                                                 for bucket in range(1 << bits)]
+    tasks = [(policy, size, path, reject, bits) for _, size, path in shards]
+    tmp_path = output + '.part'
+    try:
+        if pool is None:
+            with ProcessPoolExecutor(workers) as own_pool:
+                list(own_pool.map(generate_shard, *zip(*tasks)))
+        else:
+            list(pool.map(generate_shard, *zip(*tasks)))
+
+        for bucket, seen_path in enumerate(seen_paths):
+            dedupe_bucket(paths, bucket, seen_path)
+            _remove(f"{path}.fp{bucket:04d}" for path in paths)
+
+        written = 0
+        with open(tmp_path, 'wb') as out:
+            for path in paths:
+                written += append_shard(out, path, policy.length, count - written)
+
+            drawn = count
+            while written < count:
+                if drawn >= count * MAX_CANDIDATES:
+                    raise ValueError(f"Only {written} of {count} passwords are unique: this policy allows too few "
+                                     f"distinct passwords. Use a longer length or more character types.")
+                # Ask for a few more than missing in case the top-up collides as well
+                size = count - written + 16
+                drawn += size
+                matrix = generate_lines(policy, size, reject)
+                lines = to_lines(matrix[remember(fingerprints(matrix), seen_paths, bits)][:count - written])
+                out.write(lines)
+                written += len(lines) // (policy.length + 1)
+        os.replace(tmp_path, output)
+    finally:
+        _remove(scratch + [tmp_path] + ([] if keep_shards else paths))
+    return written
+
+
+def benchmark(count, policy, max_workers=None):
+    """Print throughput of generate_parallel for 1, 2, 4, ... workers"""
+    output = f"passgen_benchmark_{os.getpid()}.txt"
+    max_workers = max_workers or os.cpu_count()
+    counts = sorted({2 ** i for i in range(max_workers.bit_length()) if 2 ** i <= max_workers} | {max_workers})
+    baseline = None
+    try:
+        for workers in counts:
+            shard_size = max(count // (workers * 4), 10_000)
+            with ProcessPoolExecutor(workers) as pool:
+                # Warm up the pool so process start-up is not part of the timing
+                list(pool.map(abs, range(workers)))
+                start = time.perf_counter()
+                generate_parallel(count, policy, output, workers, shard_size, pool)
+                seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            print(f"{workers:>3} workers: {count / seconds:>14,.0f} passwords/s  speedup {baseline / seconds:.2f}x")
+    finally:
+        if os.path.exists(output):
+            os.remove(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate unique passwords across processes")
+    parser.add_argument('-n', '--count', type=int, required=True, help="number of passwords")
+    add_policy_arguments(parser)
+    parser.add_argument('-o', '--output', default='passwords.txt', help="file to write the merged passwords to")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help="passwords per shard file")
+    parser.add_argument('--keep-shards', action='store_true', help="leave the per-worker shard files in place")
+    parser.add_argument('--reject', metavar='INDEX', help="never emit passwords found in this passbloom index")
+    parser.add_argument('--benchmark', action='store_true', help="measure scaling per worker count instead")
+    args = parser.parse_args()
+
+    try:
+        policy = policy_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.benchmark:
+        benchmark(args.count, policy, args.workers)
+        return
+
+    start = time.perf_counter()
+    try:
+        written = generate_parallel(args.count, policy, args.output, args.workers, args.shard_size,
+                                    keep_shards=args.keep_shards, reject=args.reject)
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+    seconds = time.perf_counter() - start
+    print(f"Wrote {written} unique passwords to {args.output} in {seconds:.2f}s "
+          f"({written / seconds:,.0f} passwords/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+from collections import deque
+from datetime import datetime
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+
+
+def config_dir():
+    """Per-user settings directory: %APPDATA% on Windows, else $XDG_CONFIG_HOME or ~/.config"""
+    base = os.environ.get('APPDATA') if os.name == 'nt' else os.environ.get('XDG_CONFIG_HOME')
+    return os.path.join(base or os.path.join(os.path.expanduser('~'), '.config'), 'password-generator')
+
+
+HISTORY_FILE = "password_history.dat"
+# The key lives outside the working directory so it is never committed next to the history
+KEY_FILE = os.path.join(config_dir(), "password_history.key")
+# Where earlier versions kept the key
+LEGACY_KEY_FILE = "password_history.key"
+KEY_ENV = "PASSWORD_HISTORY_KEY"
+
+
+class HistoryEntry:
+    """One generated password; number counts every password ever added"""
+
+    __slots__ = ('number', 'password', 'strength', 'timestamp', 'length')
+
+    def __init__(self, number, password, strength, timestamp=None):
+        self.number = number
+        self.password = password
+        self.strength = strength
+        self.timestamp = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.length = len(password)
+
+    def to_dict(self):
+        return {'number': self.number, 'password': self.password, 'strength': self.strength,
+                'timestamp': self.timestamp, 'length': self.length}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['number'], data['password'], data['strength'], data['timestamp'])
+
+    def format(self):
+        """Row text as shown in the history window"""
+        return (f"#{self.number} - {self.timestamp}\n"
+                f"Password: {self.password}\n"
+                f"Length: {self.length} | Strength: {self.strength}\n"
+                + "-" * 50 + "\n\n")
+
+
+# Lines one formatted entry takes in the history window
+ENTRY_LINES = 5
+
+
+def load_key(path=KEY_FILE):
+    """Fernet key from $PASSWORD_HISTORY_KEY or the key file, created on first use.
+
+    The key file is readable by its owner only; a key left in the working
+    directory by an earlier version is moved there. Returns None when the
+    cryptography package is not installed.
+    """
+    if Fernet is None:
+        return None
+    if os.environ.get(KEY_ENV):
+        return os.environ[KEY_ENV].encode()
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or '.', mode=0o700, exist_ok=True)
+        if os.path.exists(LEGACY_KEY_FILE) and os.path.abspath(LEGACY_KEY_FILE) != os.path.abspath(path):
+            shutil.move(LEGACY_KEY_FILE, path)
+            os.chmod(path, 0o600)
+        else:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(Fernet.generate_key())
+    with open(path, 'rb') as f:
+        return f.read().strip()
+
+
+class PasswordHistory:
+    """The most recent passwords in a fixed-capacity ring buffer.
+
+    Appending is O(1) and silently drops the oldest entry once capacity is
+    reached. With a path the history is persisted there, encrypted with
+    the Fernet key when one is given; the file is only read on the first
+    call that needs the older entries (iteration, len, save). A file the
+    key cannot decrypt (the key was lost or replaced) is renamed and its
+    new name left in set_aside, and the history starts over.
+    """
+
+    def __init__(self, capacity=10, path=None, key=None):
+        self.capacity = capacity
+        self.path = path
+        self._fernet = Fernet(key) if key else None
+        self._entries = deque(maxlen=capacity)
+        self._loaded = path is None
+        self._dirty = False
+        self.added = 0
+        self.set_aside = None
+
+    def append(self, password, strength):
+        entry = HistoryEntry(self.added + 1, password, strength)
+        self._entries.append(entry)
+        self.added += 1
+        self._dirty = True
+        return entry
+
+    def load(self):
+        """Read the saved entries in front of the ones added this session"""
+        if self._loaded:
+            return
+        if not os.path.exists(self.path):
+            self._loaded = True
+            return
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        if self._fernet is not None:
+            try:
+                data = self._fernet.decrypt(data)
+            except InvalidToken:
+                # Keep the old file in case the right key turns up again
+                self.set_aside = f"{self.path}.unreadable-{datetime.now():%Y%m%d-%H%M%S}"
+                os.replace(self.path, self.set_aside)
+                data = b'[]'
+        saved = [HistoryEntry.from_dict(item) for item in json.loads(data)]
+
+        # Renumber this session's entries so numbers keep increasing after the saved ones
+        offset = saved[-1].number if saved else 0
+        for entry in self._entries:
+            entry.number += offset
+        self.added += offset
+        self._entries = deque(saved + list(self._entries), maxlen=self.capacity)
+        self._loaded = True
+
+    def save(self):
+        """Write the history atomically if anything was added"""
+        if self.path is None or not self._dirty:
+            return
+        self.load()
+        data = json.dumps([entry.to_dict() for entry in self._entries]).encode()
+        if self._fernet is not None:
+            data = self._fernet.encrypt(data)
+        tmp_path = self.path + '.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def newest_first(self):
+        self.load()
+        return reversed(self._entries)
+
+    def __len__(self):
+        self.load()
+        return len(self._entries)
@@ -0,0 +1,81 @@
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+
+async def request(reader, writer, host, target):
+    """Send one keep-alive GET and return (status, body)"""
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, target, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, host, target)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(url, connections, seconds):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, target, start + seconds, latencies, errors)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, body = await request(reader, writer, host, '/metrics')
+    writer.close()
+    return latencies, errors, elapsed, json.loads(body)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test a running passserver on localhost")
+    parser.add_argument('url', nargs='?', default='http://127.0.0.1:8787/password')
+    parser.add_argument('-c', '--connections', type=int, default=32, help="concurrent keep-alive connections")
+    parser.add_argument('-d', '--duration', type=float, default=10, help="seconds to run")
+    args = parser.parse_args()
+
+    latencies, errors, elapsed, metrics = asyncio.run(run(args.url, args.connections, args.duration))
+    latencies.sort()
+    if not latencies:
+        print("No requests completed")
+        return
+    print(f"{len(latencies)} requests in {elapsed:.1f}s over {args.connections} connections: "
+          f"{len(latencies) / elapsed:,.0f} req/s, {len(errors)} errors")
+    print("client latency  " + "  ".join(f"p{int(f * 100)} {percentile(latencies, f) * 1e3:.2f} ms"
+                                         for f in (0.5, 0.9, 0.99)))
+    print("server metrics")
+    for path, stats in metrics['endpoints'].items():
+        print(f"  {path:<11} {stats['requests']:>9} requests  {stats['requests_per_s']:>9,.0f}/s  "
+              f"p50 {stats['p50_us']} us  p99 {stats['p99_us']} us")
+    for policy, pool in metrics['pools'].items():
+        print(f"  pool {policy:<10} {pool['size']:>6} ready, {pool['misses']} misses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import argparse
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from passgen import _random, level_for_entropy
+
+MAGIC = b'PWWORDS1'
+# magic, number of words; followed by count + 1 little-endian uint64 offsets and the word bytes
+HEADER = struct.Struct('<8sQ')
+# Word lists tried when none is configured
+DEFAULT_WORDLISTS = ("wordlist.txt", "words.idx", "/usr/share/dict/words")
+
+
+class WordIndex:
+    """A word list stored as one contiguous buffer plus an array of offsets.
+
+    Word i is buffer[offsets[i]:offsets[i + 1]]. A list built into an index
+    file is memory-mapped, so opening it costs nothing however long it is
+    and only the pages of the words actually picked are ever read.
+    """
+
+    def __init__(self, buffer, offsets, mapping=None):
+        self.buffer = buffer
+        self.offsets = offsets
+        self._mapping = mapping
+
+    @classmethod
+    def from_wordlist(cls, path):
+        """Index a text list with one word per line; diceware "11111<tab>word" lines keep the word"""
+        words = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                if fields:
+                    # Duplicates would make some words likelier than others
+                    words.setdefault(fields[-1], None)
+        if len(words) < 2:
+            raise ValueError(f"{path} needs at least two different words")
+
+        encoded = [word.encode('utf-8') for word in words]
+        offsets = array('Q', [0])
+        total = 0
+        for word in encoded:
+            total += len(word)
+            offsets.append(total)
+        return cls(b''.join(encoded), offsets)
+
+    @classmethod
+    def open(cls, path):
+        """Map an index file built by save(), or index a plain word list"""
+        with open(path, 'rb') as f:
+            is_index = f.read(len(MAGIC)) == MAGIC
+        if not is_index:
+            return cls.from_wordlist(path)
+
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _, count = HEADER.unpack_from(mapping)
+        view = memoryview(mapping)
+        start = HEADER.size + 8 * (count + 1)
+        offsets = view[HEADER.size:start]
+        if sys.byteorder == 'little':
+            offsets = offsets.cast('Q')
+        else:
+            # Big-endian hosts read a swapped copy; the words themselves stay mapped
+            offsets = array('Q', offsets.tobytes())
+            offsets.byteswap()
+        return cls(view[start:], offsets, mapping)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(self)))
+            offsets = self.offsets
+            if sys.byteorder == 'big':
+                offsets = array('Q', offsets)
+                offsets.byteswap()
+            f.write(bytes(offsets))
+            f.write(self.buffer)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.buffer[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+    def entropy_bits(self, words):
+        """Entropy of a passphrase of this many uniformly picked words"""
+        return words * math.log2(len(self))
+
+    def close(self):
+        self.buffer = self.offsets = None
+        if self._mapping is not None:
+            self._mapping.close()
+
+
+def find_wordlist(path=None):
+    """path, or the first default word list that exists"""
+    for candidate in ([path] if path else DEFAULT_WORDLISTS):
+        if os.path.exists(candidate):
+            return candidate
+    raise FileNotFoundError(f"No word list found (tried {', '.join([path] if path else DEFAULT_WORDLISTS)})")
+
+
+def generate_many(count, index, words=6, separator='-', capitalize=False, rng=None):
+    """count passphrases of uniformly, independently picked words"""
+    rng = rng or _random
+    picks = rng.indices(len(index), count * words)
+    buffer = index.buffer
+    offsets = index.offsets
+    # Slice the buffer directly; decoding the joined bytes once is cheaper than per word
+    sep = separator.encode('utf-8')
+    phrases = []
+    for start in range(0, len(picks), words):
+        chosen = [bytes(buffer[offsets[i]:offsets[i + 1]]) for i in picks[start:start + words]]
+        if capitalize:
+            chosen = [word[:1].upper() + word[1:] for word in chosen]
+        phrases.append(sep.join(chosen).decode('utf-8'))
+    return phrases
+
+
+def generate(index, words=6, separator='-', capitalize=False, rng=None):
+    return generate_many(1, index, words, separator, capitalize, rng)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diceware-style passphrases from a local word list")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', help="build a memory-mappable index from a word list")
+    build_parser.add_argument('wordlist')
+    build_parser.add_argument('-o', '--output', default='words.idx')
+
+    generate_parser = commands.add_parser('generate', help="print passphrases")
+    generate_parser.add_argument('-w', '--wordlist', help="word list or index (default: wordlist.txt, words.idx, "
+                                                          "/usr/share/dict/words)")
+    generate_parser.add_argument('-n', '--count', type=int, default=1)
+    generate_parser.add_argument('--words', type=int, default=6, help="words per passphrase")
+    generate_parser.add_argument('--separator', default='-')
+    generate_parser.add_argument('--capitalize', action='store_true')
+    generate_parser.add_argument('--batch-size', type=int, default=100_000, help="passphrases generated at a time")
+    generate_parser.add_argument('--benchmark', action='store_true', help="report passphrases per second instead")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        index = WordIndex.from_wordlist(args.wordlist)
+        index.save(args.output)
+        print(f"Indexed {len(index)} words into {args.output} ({index.entropy_bits(1):.2f} bits per word)",
+              file=sys.stderr)
+        return
+
+    try:
+        index = WordIndex.open(find_wordlist(args.wordlist))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    bits = index.entropy_bits(args.words)
+    level, _ = level_for_entropy(bits)
+
+    if args.benchmark:
+        start = time.perf_counter()
+        generate_many(args.count, index, args.words, args.separator, args.capitalize)
+        rate = args.count / (time.perf_counter() - start)
+        print(f"{args.count} passphrases of {args.words} words: {rate:,.0f} passphrases/s")
+        return
+
+    for start in range(0, args.count, args.batch_size):
+        batch = generate_many(min(args.batch_size, args.count - start), index, args.words, args.separator,
+                              args.capitalize)
+        sys.stdout.write('\n'.join(batch) + '\n')
+    print(f"{len(index)} words, {bits:.1f} bits per passphrase ({level})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+import argparse
+import json
+import sys
+import time
+
+from passgen import CHARS, CLASS_NAMES, Policy, _random, replace_rejected
+from passgen import generate_many as generate_simple
+
+# Classes whose characters can form sequences such as "abc", "XYZ" or "321"
+SEQUENCE_CLASSES = ('lowercase', 'uppercase', 'numbers')
+
+
+def _class_of(c):
+    for name in CLASS_NAMES:
+        if c in CHARS[name]:
+            return name
+    return None
+
+
+def _continuation(first, second):
+    """Character that would make first, second, x an ascending or descending run, or ''"""
+    name = _class_of(first)
+    if name not in SEQUENCE_CLASSES or _class_of(second) != name or abs(ord(second) - ord(first)) != 1:
+        return ''
+    following = chr(2 * ord(second) - ord(first))
+    return following if following in CHARS[name] else ''
+
+
+class PasswordPolicy:
+    """Per-tenant password rules, compiled once into alphabets and lookup tables.
+
+    min_counts maps the allowed classes to the number of characters each
+    must contribute (0 allows a class without requiring it). exclude removes
+    characters (e.g. ambiguous ones) from every class, no_repeats forbids
+    the same character twice in a row, no_sequences forbids runs of three
+    such as "abc" or "987", and prefix is put in front of every password
+    (counting towards length and the minimums).
+    """
+
+    def __init__(self, length=16, min_counts=None, exclude='', no_repeats=False, no_sequences=False, prefix=''):
+        self.length = length
+        self.min_counts = dict(min_counts if min_counts is not None else {name: 1 for name in CLASS_NAMES})
+        self.exclude = exclude
+        self.no_repeats = no_repeats
+        self.no_sequences = no_sequences
+        self.prefix = prefix
+        self._compile()
+
+    @classmethod
+    def from_dict(cls, data, length=None):
+        options = dict(data)
+        if length is not None:
+            options['length'] = length
+        return cls(**options)
+
+    @classmethod
+    def from_file(cls, path, length=None):
+        with open(path) as f:
+            return cls.from_dict(json.load(f), length)
+
+    @classmethod
+    def from_options(cls, length, upper, lower, nums, special, **options):
+        """Policy for the GUI's slider and checkboxes, with a tenant's extra rules on top.
+
+        Ticked classes are required at least once; a class the tenant
+        requires cannot be switched off and raises ValueError.
+        """
+        tenant_counts = options.pop('min_counts', {})
+        enabled = {'lowercase': lower, 'uppercase': upper, 'numbers': nums, 'symbols': special}
+        missing = [name for name, count in tenant_counts.items() if count > 0 and not enabled.get(name, True)]
+        if missing:
+            raise ValueError(f"Your organisation requires {', '.join(missing)}; please tick them again")
+        min_counts = {name: count for name, count in tenant_counts.items() if enabled.get(name, True)}
+        for name, on in enabled.items():
+            if on:
+                min_counts[name] = max(1, min_counts.get(name, 1))
+        return cls(length, min_counts, **options)
+
+    def to_dict(self):
+        return {'length': self.length, 'min_counts': self.min_counts, 'exclude': self.exclude,
+                'no_repeats': self.no_repeats, 'no_sequences': self.no_sequences, 'prefix': self.prefix}
+
+    def _compile(self):
+        unknown = set(self.min_counts) - set(CLASS_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown character classes: {', '.join(sorted(unknown))}")
+        if not self.min_counts:
+            raise ValueError("Please select at least one character type!")
+
+        excluded = set(self.exclude)
+        self.alphabets = {name: ''.join(c for c in CHARS[name] if c not in excluded) for name in self.min_counts}
+        self.alphabet = ''.join(self.alphabets.values())
+
+        # Every slot must keep a choice after removing the repeated and the sequence character
+        needed = 1 + self.no_repeats + self.no_sequences
+        for name, chars in self.alphabets.items():
+            if len(chars) < needed:
+                raise ValueError(f"Too few {name} characters left after exclusions")
+
+        if self.no_repeats and any(a == b for a, b in zip(self.prefix, self.prefix[1:])):
+            raise ValueError("The prefix itself repeats a character")
+        if self.no_sequences and any(_continuation(a, b) == c
+                                     for a, b, c in zip(self.prefix, self.prefix[1:], self.prefix[2:])):
+            raise ValueError("The prefix itself contains a character sequence")
+
+        # Required characters still missing after the prefix, then free slots
+        prefix_counts = {name: sum(1 for c in self.prefix if c in CHARS[name]) for name in self.min_counts}
+        self._slots = [name for name, count in self.min_counts.items()
+                       for _ in range(max(0, count - prefix_counts[name]))]
+        free = self.length - len(self.prefix) - len(self._slots)
+        if free < 0:
+            raise ValueError(f"Length must be at least {len(self.prefix) + len(self._slots)} for this policy")
+        self._slots += [None] * free
+        self._slot_alphabets = {None: self.alphabet, **self.alphabets}
+
+        # (previous, last) -> the character that would continue a run
+        seed = set(self.alphabet) | set(self.prefix)
+        self._continuations = {}
+        if self.no_sequences:
+            for first in seed:
+                for second in seed:
+                    following = _continuation(first, second)
+                    if following:
+                        self._continuations[first, second] = following
+        # (slot, repeated char, sequence char) -> allowed characters, filled on demand
+        self._allowed = {}
+
+    def _allowed_chars(self, slot, repeated, following):
+        key = (slot, repeated, following)
+        allowed = self._allowed.get(key)
+        if allowed is None:
+            allowed = ''.join(c for c in self._slot_alphabets[slot] if c != repeated and c != following)
+            self._allowed[key] = allowed
+        return allowed
+
+    def generate(self, rng=None):
+        """One password that satisfies the policy by construction.
+
+        Slots for the required characters are shuffled in with the free ones,
+        then each character is drawn uniformly from its slot's characters
+        minus the (at most two) that would break a repeat or sequence rule
+        given the previous two, so no candidate is ever rejected.
+        """
+        rng = rng or _random
+        below = rng.below
+        slots = self._slots[:]
+        for i in range(len(slots) - 1, 0, -1):
+            j = below(i + 1)
+            slots[i], slots[j] = slots[j], slots[i]
+
+        chars = list(self.prefix)
+        previous = chars[-2] if len(chars) > 1 else ''
+        last = chars[-1] if chars else ''
+        allowed_table = self._allowed
+        continuations = self._continuations
+        no_repeats = self.no_repeats
+        for slot in slots:
+            repeated = last if no_repeats else ''
+            following = continuations.get((previous, last), '')
+            allowed = allowed_table.get((slot, repeated, following)) or self._allowed_chars(slot, repeated, following)
+            c = allowed[below(len(allowed))]
+            chars.append(c)
+            previous, last = last, c
+        return ''.join(chars)
+
+    def violations(self, password):
+        """Descriptions of every rule password breaks (empty when it complies)"""
+        problems = []
+        if len(password) != self.length:
+            problems.append(f"length {len(password)} instead of {self.length}")
+        if not password.startswith(self.prefix):
+            problems.append(f"missing prefix {self.prefix!r}")
+        body = password[len(self.prefix):]
+        for name, count in self.min_counts.items():
+            if sum(1 for c in password if c in CHARS[name]) < count:
+                problems.append(f"fewer than {count} {name}")
+        if any(c not in self.alphabet for c in body):
+            problems.append("characters outside the allowed set")
+        if self.no_repeats and any(a == b for a, b in zip(password, password[1:])):
+            problems.append("repeated characters")
+        if self.no_sequences and any(_continuation(a, b) == c for a, b, c in zip(password, password[1:], password[2:])):
+            problems.append("character sequence")
+        return problems
+
+
+def generate_many(count, policy, rng=None, reject=None):
+    """count passwords for a PasswordPolicy; passwords in reject (a passbloom index) are replaced"""
+    rng = rng or _random
+    passwords = [policy.generate(rng) for _ in range(count)]
+    if reject is None:
+        return passwords
+    return replace_rejected(passwords, count, lambda missing: [policy.generate(rng) for _ in range(missing)], reject)
+
+
+def generate_naive(count, policy):
+    """Generate-and-retry baseline: simple passwords filtered by violations()"""
+    simple = Policy(policy.length - len(policy.prefix), *(name in policy.min_counts for name in
+                                                          ('uppercase', 'lowercase', 'numbers', 'symbols')))
+    passwords = []
+    attempts = 0
+    while len(passwords) < count:
+        for candidate in generate_simple(count, simple):
+            attempts += 1
+            password = policy.prefix + candidate
+            if not policy.violations(password):
+                passwords.append(password)
+    return passwords[:count], attempts
+
+
+def benchmark(policy, count):
+    """Passwords per second of the compiled policy and of generate-and-retry"""
+    start = time.perf_counter()
+    generate_many(count, policy)
+    compiled = count / (time.perf_counter() - start)
+    start = time.perf_counter()
+    _, attempts = generate_naive(count, policy)
+    naive = count / (time.perf_counter() - start)
+    return compiled, naive, attempts / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate passwords for a password policy")
+    parser.add_argument('-n', '--count', type=int, default=1, help="number of passwords")
+    parser.add_argument('-p', '--policy', help="JSON policy file (keys as in PasswordPolicy)")
+    parser.add_argument('-l', '--length', type=int, help="override the policy's length")
+    parser.add_argument('--min', action='append', default=[], metavar='CLASS=N',
+                        help="minimum count of a class (lowercase, uppercase, numbers, symbols); repeatable")
+    parser.add_argument('--exclude', help="characters never to use, e.g. 0O1lI")
+    parser.add_argument('--no-repeats', action='store_true', help="no character twice in a row")
+    parser.add_argument('--no-sequences', action='store_true', help="no runs like abc or 321")
+    parser.add_argument('--prefix', help="text every password starts with")
+    parser.add_argument('--reject', metavar='INDEX', help="never emit passwords found in this passbloom index")
+    parser.add_argument('--benchmark', action='store_true', help="compare with generate-and-retry instead")
+    args = parser.parse_args()
+
+    try:
+        options = {}
+        if args.policy:
+            with open(args.policy) as f:
+                options = json.load(f)
+        if args.length is not None:
+            options['length'] = args.length
+        if args.min:
+            options['min_counts'] = {name: int(count) for name, count in (item.split('=') for item in args.min)}
+        for key in ('exclude', 'prefix'):
+            if getattr(args, key) is not None:
+                options[key] = getattr(args, key)
+        options['no_repeats'] = args.no_repeats or options.get('no_repeats', False)
+        options['no_sequences'] = args.no_sequences or options.get('no_sequences', False)
+        policy = PasswordPolicy.from_dict(options)
+    except (OSError, ValueError, TypeError) as e:
+        parser.error(str(e))
+
+    if args.benchmark:
+        compiled, naive, attempts = benchmark(policy, args.count)
+        print(f"compiled:          {compiled:>10,.0f} passwords/s")
+        print(f"generate-and-retry: {naive:>9,.0f} passwords/s  ({attempts:.1f} candidates per password)")
+        return
+
+    reject = None
+    if args.reject:
+        from passbloom import BloomFilter
+        reject = BloomFilter(args.reject)
+    try:
+        sys.stdout.write('\n'.join(generate_many(args.count, policy, reject=reject)) + '\n')
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import argparse
+import asyncio
+import bisect
+import json
+import time
+from collections import OrderedDict, deque
+from urllib.parse import parse_qs, urlsplit
+
+from passgen import Policy, check_strength, entropy_bits, generate_many
+
+MAX_BATCH = 10_000
+# Pooled passwords per policy: top up below LOW_WATER, stop at HIGH_WATER.
+# LOW_WATER >= MAX_BATCH so a full pool always covers the largest batch
+LOW_WATER = MAX_BATCH
+HIGH_WATER = 2 * MAX_BATCH
+# Passwords generated between yields to the event loop while topping up (~0.5 ms)
+TOP_UP_CHUNK = 128
+# Passwords per executor call when a request finds the pool dry
+MISS_CHUNK = 1_000
+MAX_POOLS = 32
+# Latency histogram bucket upper bounds in microseconds
+LATENCY_BUCKETS_US = [25 * 2 ** (i / 2) for i in range(36)]
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+           500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class EndpointMetrics:
+    """Request count, errors and a latency histogram for one endpoint"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.items = 0
+        self.total_us = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_US) + 1)
+
+    def record(self, micros, items, error=False):
+        self.requests += 1
+        self.errors += error
+        self.items += items
+        self.total_us += micros
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_US, micros)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound (us) of the bucket holding the given fraction of requests"""
+        target = fraction * self.requests
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_US + [float('inf')], self.buckets):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def to_dict(self, seconds):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'items': self.items,
+            'requests_per_s': round(self.requests / seconds, 1),
+            'items_per_s': round(self.items / seconds, 1),
+            'mean_us': round(self.total_us / self.requests, 1) if self.requests else None,
+            'p50_us': round(self.percentile(0.5), 1) if self.requests else None,
+            'p99_us': round(self.percentile(0.99), 1) if self.requests else None,
+        }
+
+
+class PasswordPool:
+    """Pre-generated passwords for one policy, topped up by a background task"""
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.passwords = deque()
+        self.misses = 0
+        self._wanted = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._top_up())
+        self._wanted.set()
+
+    async def take(self, count):
+        passwords = self.passwords
+        if len(passwords) < count:
+            # Pool ran dry: generate the shortfall in a worker thread, a chunk at a
+            # time, so other clients keep being served meanwhile
+            self.misses += 1
+            loop = asyncio.get_running_loop()
+            while len(passwords) < count:
+                chunk = min(MISS_CHUNK, count - len(passwords))
+                passwords.extend(await loop.run_in_executor(None, generate_many, chunk, self.policy))
+        batch = [passwords.popleft() for _ in range(count)]
+        if len(passwords) < LOW_WATER:
+            self._wanted.set()
+        return batch
+
+    async def _top_up(self):
+        while True:
+            await self._wanted.wait()
+            self._wanted.clear()
+            while len(self.passwords) < HIGH_WATER:
+                self.passwords.extend(generate_many(TOP_UP_CHUNK, self.policy))
+                # Let waiting requests run between chunks
+                await asyncio.sleep(0)
+
+    def close(self):
+        self._task.cancel()
+
+
+def _flag(query, name, default):
+    value = query.get(name, [None])[0]
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def _int(query, name, default, low, high):
+    try:
+        value = int(query.get(name, [default])[0])
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer")
+    if not low <= value <= high:
+        raise HTTPError(400, f"{name} must be between {low} and {high}")
+    return value
+
+
+def _content_length(value):
+    """Body length from a Content-Length header value; HTTPError if it is missing a number or too large"""
+    if not value:
+        return 0
+    try:
+        length = int(value)
+    except ValueError:
+        raise HTTPError(400, "Content-Length must be an integer")
+    if length < 0:
+        raise HTTPError(400, "Content-Length must not be negative")
+    if length > 16 << 20:
+        raise HTTPError(413, "request body too large")
+    return length
+
+
+class PasswordServer:
+    """Minimal asyncio HTTP/1.1 server (keep-alive, JSON) around the passgen core.
+
+    GET  /password?length=24&upper=1&lower=1&numbers=1&symbols=1
+    GET  /passwords?count=100&...           batch from the same pool
+    GET  /strength?password=...             or POST {"passwords": [...]}
+    GET  /metrics                           per-endpoint throughput and latency
+    """
+
+    def __init__(self):
+        self.pools = OrderedDict()
+        self.metrics = {}
+        self.started = time.perf_counter()
+        self.routes = {'/password': self.handle_password, '/passwords': self.handle_passwords,
+                       '/strength': self.handle_strength, '/metrics': self.handle_metrics}
+
+    def pool(self, policy_key):
+        pool = self.pools.get(policy_key)
+        if pool is None:
+            pool = PasswordPool(Policy(*policy_key))
+            self.pools[policy_key] = pool
+            if len(self.pools) > MAX_POOLS:
+                self.pools.popitem(last=False)[1].close()
+        else:
+            self.pools.move_to_end(policy_key)
+        return pool
+
+    def policy_key(self, query):
+        length = _int(query, 'length', 24, 4, 256)
+        key = (length, _flag(query, 'upper', True), _flag(query, 'lower', True), _flag(query, 'numbers', True),
+               _flag(query, 'symbols', True))
+        try:
+            Policy(*key)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        return key
+
+    async def handle_password(self, method, query, body):
+        password = (await self.pool(self.policy_key(query)).take(1))[0]
+        strength, _ = check_strength(password)
+        return {'password': password, 'strength': strength}, 1
+
+    async def handle_passwords(self, method, query, body):
+        count = _int(query, 'count', 100, 1, MAX_BATCH)
+        passwords = await self.pool(self.policy_key(query)).take(count)
+        return {'passwords': passwords}, count
+
+    async def handle_strength(self, method, query, body):
+        if method == 'POST':
+            try:
+                passwords = json.loads(body)['passwords']
+            except (ValueError, KeyError, TypeError):
+                raise HTTPError(400, 'expected {"passwords": [...]}')
+            if not isinstance(passwords, list) or len(passwords) > MAX_BATCH:
+                raise HTTPError(400, f"passwords must be a list of at most {MAX_BATCH} strings")
+        else:
+            passwords = query.get('password', [])
+        results = [{'strength': check_strength(str(p))[0], 'entropy_bits': round(entropy_bits(str(p)), 1)}
+                   for p in passwords]
+        return {'results': results}, len(results)
+
+    async def handle_metrics(self, method, query, body):
+        seconds = time.perf_counter() - self.started
+        return {
+            'uptime_s': round(seconds, 1),
+            'endpoints': {path: metrics.to_dict(seconds) for path, metrics in self.metrics.items()},
+            'pools': {f"{key[0]}:{''.join('ulns'[i] for i, on in enumerate(key[1:]) if on)}":
+                      {'size': len(pool.passwords), 'misses': pool.misses} for key, pool in self.pools.items()},
+        }, 0
+
+    async def dispatch(self, method, target, body):
+        """(status, payload) for one request, recording its latency"""
+        start = time.perf_counter()
+        url = urlsplit(target)
+        handler = self.routes.get(url.path)
+        items = 0
+        try:
+            if handler is None:
+                raise HTTPError(404, f"no endpoint {url.path}")
+            if method not in ('GET', 'POST'):
+                raise HTTPError(405, f"{method} not allowed")
+            payload, items = await handler(method, parse_qs(url.query), body)
+            status = 200
+        except HTTPError as e:
+            status, payload = e.status, {'error': str(e)}
+        except Exception as e:
+            status, payload = 500, {'error': str(e)}
+        if handler is not None:
+            metrics = self.metrics.setdefault(url.path, EndpointMetrics())
+            metrics.record((time.perf_counter() - start) * 1e6, items, status != 200)
+        return status, payload
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = _content_length(headers.get('content-length'))
+                except HTTPError as e:
+                    # The body cannot be skipped without a length, so the connection cannot be reused
+                    status, payload = e.status, {'error': str(e)}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = await self.dispatch(method, target, body)
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port, warm=True):
+        if warm:
+            # Fill the default pool before accepting requests
+            pool = self.pool((24, True, True, True, True))
+            pool.passwords.extend(generate_many(HIGH_WATER, pool.policy))
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        print(f"Serving passwords on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP password service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    args = parser.parse_args()
+    try:
+        asyncio.run(PasswordServer().serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,21 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import random
-import math
 import json
+import os
 from datetime import datetime
 
+from passgen import CHARS, Policy, check_strength, generate, level_for_entropy
+from passpolicy import PasswordPolicy, generate_many as generate_for_policy
+from passphrase import WordIndex, find_wordlist, generate as make_passphrase
+from passhistory import ENTRY_LINES, HISTORY_FILE, PasswordHistory, load_key
+
+# Optional offline index of breached passwords, built with `python passbloom.py build`
+BREACH_INDEX = "breached.bloom"
+# Optional tenant rules (min counts, exclusions, no repeats/sequences, prefix), see passpolicy.py
+POLICY_FILE = "policy.json"
+HISTORY_SIZE = 10
+PASSPHRASE_WORDS = 6
+
 class JSStylePasswordGenerator:
     def __init__(self):
         self.root = tk.Tk()
@@ -15,15 +26,34 @@ class JSStylePasswordGenerator:
         self.root.configure(bg='#4ECDC4')  # Turquoise like in your image
         
         # Character sets (JavaScript style)
-        self.chars = {
-            'lowercase': "abcdefghijklmnopqrstuvwxyz",
-            'uppercase': "ABCDEFGHIJKLMNOPQRSTUVWXYZ", 
-            'numbers': "0123456789",
-            'symbols': "!@#$%^&*()-_=+[]{}|;:,.<>?"
-        }
+        self.chars = CHARS
+        
+        # Password history, saved encrypted when the cryptography package is available
+        key = load_key()
+        self.password_history = PasswordHistory(HISTORY_SIZE, HISTORY_FILE if key else None, key)
+        self.history_text = None
         
-        # Password history
-        self.password_history = []
+        # Word list for passphrases, loaded on first use
+        self.word_index = None
+        
+        # Known-bad passwords are rejected during generation and rated "Very Weak"
+        self.breached = None
+        if os.path.exists(BREACH_INDEX):
+            from passbloom import BloomFilter
+            self.breached = BloomFilter(BREACH_INDEX)
+        
+        # Tenant policy applied on top of the length slider and checkboxes
+        self.tenant_policy = {}
+        if os.path.exists(POLICY_FILE):
+            try:
+                with open(POLICY_FILE) as f:
+                    self.tenant_policy = json.load(f)
+                # The length slider decides the length
+                self.tenant_policy.pop('length', None)
+                PasswordPolicy.from_options(50, True, True, True, True, **self.tenant_policy)
+            except Exception as e:
+                self.tenant_policy = {}
+                messagebox.showerror("Policy Error", f"Ignoring {POLICY_FILE}: {str(e)}")
         
         self.create_interface()
     
@@ -157,6 +187,9 @@ class JSStylePasswordGenerator:
         button_container.pack(expand=True)
         
         # Minimal footer buttons
+        tk.Button(button_container, text="Passphrase", command=self.generate_passphrase,
+                 bg='#45B7B8', fg='white', font=('Arial', 10), bd=0, padx=15).pack(side=tk.LEFT, padx=5)
+        
         tk.Button(button_container, text="History", command=self.show_history,
                  bg='#45B7B8', fg='white', font=('Arial', 10), bd=0, padx=15).pack(side=tk.LEFT, padx=5)
         
@@ -170,6 +203,11 @@ class JSStylePasswordGenerator:
         """JavaScript-style password generation function"""
         try:
             length = int(self.length_var.get())
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Please enter a valid number for length!")
+            return
+        
+        try:
             include_upper = self.include_upper.get()
             include_lower = self.include_lower.get() 
             include_nums = self.include_nums.get()
@@ -179,22 +217,11 @@ class JSStylePasswordGenerator:
                 messagebox.showerror("Invalid Length", "Password length must be between 6 and 50 characters!")
                 return
             
-            available_chars = ""
-            
-            if include_lower:
-                available_chars += self.chars['lowercase']
-            if include_upper:
-                available_chars += self.chars['uppercase']
-            if include_nums:
-                available_chars += self.chars['numbers']
-            if include_special:
-                available_chars += self.chars['symbols']
-            
-            if not available_chars:
+            if not (include_lower or include_upper or include_nums or include_special):
                 messagebox.showerror("No Character Set", "Please select at least one character type!")
                 return
             
-            password = self.gen_pass(length, available_chars, include_upper, include_lower, include_nums, include_special)
+            password = self.gen_pass(length, include_upper, include_lower, include_nums, include_special)
             
             # Display password
             self.password_text.delete(1.0, tk.END)
@@ -210,8 +237,34 @@ class JSStylePasswordGenerator:
             
             self.add_to_history(password, strength)
             
-        except ValueError:
-            messagebox.showerror("Invalid Input", "Please enter a valid number for length!")
+        except ValueError as e:
+            # The tenant policy cannot be met, or the breach list covers nearly all it allows
+            messagebox.showerror("Policy Error", str(e))
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+    
+    def generate_passphrase(self):
+        """Diceware-style passphrase from the local word list"""
+        try:
+            if self.word_index is None:
+                self.word_index = WordIndex.open(find_wordlist())
+            
+            passphrase = make_passphrase(self.word_index, PASSPHRASE_WORDS)
+            
+            self.password_text.delete(1.0, tk.END)
+            self.password_text.insert(1.0, passphrase)
+            
+            # Strength comes from the entropy of the word picks, not from character classes
+            bits = self.word_index.entropy_bits(PASSPHRASE_WORDS)
+            strength, color = level_for_entropy(bits)
+            self.strength_var.set(f"{strength} ({bits:.0f} bits)")
+            self.strength_label.config(fg=color)
+            self.update_strength_bar(strength)
+            
+            self.add_to_history(passphrase, strength)
+            
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Word List Error", f"Could not load a word list: {str(e)}")
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
     
@@ -236,77 +289,16 @@ class JSStylePasswordGenerator:
         color = colors.get(strength, "#4ECDC4")
         self.strength_bar.config(bg=color)
     
-    def gen_pass(self, length, available_chars, upper, lower, nums, special):
-        """JavaScript-style password generation"""
-        password = ""
-        mandatory_chars = ""
-        
-        if upper and self.chars['uppercase']:
-            rand_upper = self.chars['uppercase'][math.floor(random.random() * len(self.chars['uppercase']))]
-            mandatory_chars += rand_upper
-        
-        if lower and self.chars['lowercase']:
-            rand_lower = self.chars['lowercase'][math.floor(random.random() * len(self.chars['lowercase']))]
-            mandatory_chars += rand_lower
-        
-        if nums and self.chars['numbers']:
-            rand_num = self.chars['numbers'][math.floor(random.random() * len(self.chars['numbers']))]
-            mandatory_chars += rand_num
-        
-        if special and self.chars['symbols']:
-            rand_special = self.chars['symbols'][math.floor(random.random() * len(self.chars['symbols']))]
-            mandatory_chars += rand_special
-        
-        remaining_length = length - len(mandatory_chars)
-        
-        for i in range(remaining_length):
-            rand_index = math.floor(random.random() * len(available_chars))
-            password += available_chars[rand_index]
-        
-        password += mandatory_chars
-        
-        password_array = list(password)
-        for i in range(len(password_array)):
-            rand_index = math.floor(random.random() * len(password_array))
-            password_array[i], password_array[rand_index] = password_array[rand_index], password_array[i]
-        
-        return ''.join(password_array)
+    def gen_pass(self, length, upper, lower, nums, special):
+        """JavaScript-style password generation, backed by the passgen CSPRNG core"""
+        if self.tenant_policy:
+            policy = PasswordPolicy.from_options(length, upper, lower, nums, special, **self.tenant_policy)
+            return generate_for_policy(1, policy, reject=self.breached)[0]
+        return generate(Policy(length, upper, lower, nums, special), reject=self.breached)
     
     def check_password_strength(self, password):
         """JavaScript-style password strength checker"""
-        score = 0
-        
-        if len(password) >= 8:
-            score += 1
-        if len(password) >= 12:
-            score += 1
-        if len(password) >= 16:
-            score += 1
-        
-        has_lower = any(c in self.chars['lowercase'] for c in password)
-        has_upper = any(c in self.chars['uppercase'] for c in password)
-        has_nums = any(c in self.chars['numbers'] for c in password)
-        has_special = any(c in self.chars['symbols'] for c in password)
-        
-        if has_lower:
-            score += 1
-        if has_upper:
-            score += 1
-        if has_nums:
-            score += 1
-        if has_special:
-            score += 1
-        
-        if score <= 2:
-            return "Very Weak", "#FF4757"
-        elif score <= 4:
-            return "Weak", "#FF6B7A"
-        elif score <= 5:
-            return "Good", "#FFA502"
-        elif score <= 6:
-            return "Strong", "#4ECDC4"
-        else:
-            return "Very Strong", "#2ED573"
+        return check_strength(password, self.breached)
     
     def copy_password(self):
         """Copy password to clipboard"""
@@ -324,21 +316,31 @@ class JSStylePasswordGenerator:
     
     def add_to_history(self, password, strength):
         """Add password to history"""
-        entry = {
-            'password': password,
-            'strength': strength,
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'length': len(password)
-        }
-        
-        self.password_history.insert(0, entry)
-        
-        if len(self.password_history) > 10:
-            self.password_history = self.password_history[:10]
+        entry = self.password_history.append(password, strength)
+        if self.history_text is not None:
+            self.append_history_row(entry)
+    
+    def append_history_row(self, entry):
+        """Show a new entry at the top of the open history window"""
+        self.history_text.config(state=tk.NORMAL)
+        self.history_text.insert(1.0, entry.format())
+        # Drop the row of the entry that fell out of the history
+        self.history_text.delete(f"{self.password_history.capacity * ENTRY_LINES + 1}.0", tk.END)
+        self.history_text.config(state=tk.DISABLED)
     
     def show_history(self):
         """Display password history"""
-        if len(self.password_history) == 0:
+        if self.history_text is not None:
+            self.history_text.winfo_toplevel().lift()
+            return
+        
+        try:
+            empty = len(self.password_history) == 0
+        except Exception as e:
+            messagebox.showerror("History Error", f"Could not load history: {str(e)}")
+            return
+        self.warn_history_reset()
+        if empty:
             messagebox.showinfo("No History", "No passwords generated yet.")
             return
         
@@ -346,6 +348,7 @@ class JSStylePasswordGenerator:
         history_window.title("Password History")
         history_window.geometry("700x400")
         history_window.configure(bg='#4ECDC4')
+        history_window.protocol("WM_DELETE_WINDOW", lambda: self.close_history(history_window))
         
         tk.Label(history_window, text="Password History", 
                 font=('Arial', 16, 'bold'), bg='#4ECDC4', fg='#2C5F41').pack(pady=10)
@@ -357,16 +360,18 @@ class JSStylePasswordGenerator:
         scrollbar = tk.Scrollbar(history_frame, orient=tk.VERTICAL, command=history_text.yview)
         history_text.configure(yscrollcommand=scrollbar.set)
         
-        for i, entry in enumerate(self.password_history):
-            history_text.insert(tk.END, f"#{i+1} - {entry['timestamp']}\n")
-            history_text.insert(tk.END, f"Password: {entry['password']}\n")
-            history_text.insert(tk.END, f"Length: {entry['length']} | Strength: {entry['strength']}\n")
-            history_text.insert(tk.END, "-" * 50 + "\n\n")
-        
+        history_text.insert(tk.END, ''.join(entry.format() for entry in self.password_history.newest_first()))
         history_text.config(state=tk.DISABLED)
         
         history_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # New passwords are added to this window as they are generated
+        self.history_text = history_text
+    
+    def close_history(self, history_window):
+        self.history_text = None
+        history_window.destroy()
     
     def save_to_file(self):
         """Save password to file"""
@@ -383,11 +388,16 @@ class JSStylePasswordGenerator:
             )
             
             if filename:
+                generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 with open(filename, 'w') as f:
-                    f.write(f"Generated Password: {password}\n")
-                    f.write(f"Generated At: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    f.write(f"Length: {len(password)}\n")
-                    f.write(f"Strength: {self.strength_var.get()}\n")
+                    if filename.lower().endswith('.json'):
+                        json.dump({'password': password, 'generated_at': generated_at,
+                                   'length': len(password), 'strength': self.strength_var.get()}, f, indent=2)
+                    else:
+                        f.write(f"Generated Password: {password}\n"
+                                f"Generated At: {generated_at}\n"
+                                f"Length: {len(password)}\n"
+                                f"Strength: {self.strength_var.get()}\n")
                 
                 messagebox.showinfo("Saved", f"Password saved to {filename}")
         
@@ -409,8 +419,26 @@ class JSStylePasswordGenerator:
         
         messagebox.showinfo("Reset", "Form reset to default values!")
     
+    def warn_history_reset(self):
+        """Tell the user, once, that an undecryptable history was set aside"""
+        moved = self.password_history.set_aside
+        if moved:
+            self.password_history.set_aside = None
+            messagebox.showwarning("History Reset", "The saved history could not be decrypted with the current key, "
+                                   f"so a new one was started. The old file was kept as {moved}.")
+    
+    def close(self):
+        """Save the history while the window can still show a warning, then quit"""
+        try:
+            self.password_history.save()
+        except Exception as e:
+            messagebox.showwarning("History Not Saved", f"Could not save password history: {str(e)}")
+        self.warn_history_reset()
+        self.root.destroy()
+    
     def run(self):
         """Start the application"""
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
         self.root.mainloop()
 
 # Run the application
@@ -0,0 +1,87 @@
+import unittest
+from statistics import NormalDist
+
+import numpy as np
+
+from passgen import CHARS, Policy
+from passgen_numpy import decode, expected_frequencies, generate_matrix, random_below
+
+# Chance that a correct generator fails any one chi-square test
+SIGNIFICANCE = 1e-4
+
+
+def chi_square(counts, probabilities):
+    expected = np.asarray(probabilities) * counts.sum()
+    return float(((counts - expected) ** 2 / expected).sum())
+
+
+def critical_value(dof, significance=SIGNIFICANCE):
+    """Chi-square quantile 1 - significance, by the Wilson–Hilferty approximation"""
+    z = NormalDist().inv_cdf(1 - significance)
+    return dof * (1 - 2 / (9 * dof) + z * (2 / (9 * dof)) ** 0.5) ** 3
+
+
+class RandomBelowTest(unittest.TestCase):
+    def test_empty_request(self):
+        result = random_below(10, 0)
+        self.assertEqual(result.shape, (0,))
+        self.assertEqual(result.dtype, np.uint8)
+
+    def test_values_in_range(self):
+        result = random_below(7, 10_000)
+        self.assertEqual(len(result), 10_000)
+        self.assertLess(int(result.max()), 7)
+
+    def test_uniform(self):
+        # Bounds that divide 256 and ones whose rejection step matters, including alphabet sizes
+        for bound in (2, 7, 10, 26, 32, 94, 200, 256):
+            with self.subTest(bound=bound):
+                counts = np.bincount(random_below(bound, 2_000 * bound), minlength=bound)
+                self.assertLess(chi_square(counts, np.full(bound, 1 / bound)), critical_value(bound - 1))
+
+
+class GenerateMatrixTest(unittest.TestCase):
+    def test_length_equals_number_of_classes(self):
+        policy = Policy(length=4, upper=True, lower=True, nums=True, special=True)
+        passwords = decode(generate_matrix(500, policy))
+        self.assertEqual(len(passwords), 500)
+        for password in passwords:
+            self.assertEqual(len(password), 4)
+            for name in policy.classes:
+                self.assertEqual(sum(c in CHARS[name] for c in password), 1, password)
+
+    def test_single_class_single_character(self):
+        policy = Policy(length=1, upper=False, lower=False, nums=True, special=False)
+        passwords = decode(generate_matrix(50, policy))
+        self.assertTrue(all(len(p) == 1 and p in CHARS['numbers'] for p in passwords))
+
+    def test_character_frequencies_per_position(self):
+        policy = Policy(length=8, upper=True, lower=True, nums=True, special=True)
+        probabilities = expected_frequencies(policy)
+        alphabet = np.frombuffer(''.join(probabilities).encode('ascii'), dtype=np.uint8)
+        lookup = np.zeros(256, dtype=np.intp)
+        lookup[alphabet] = np.arange(len(alphabet))
+        indices = lookup[generate_matrix(100_000, policy)]
+        # Split the significance across positions so the test as a whole keeps SIGNIFICANCE
+        limit = critical_value(len(alphabet) - 1, SIGNIFICANCE / policy.length)
+        for position in range(policy.length):
+            with self.subTest(position=position):
+                counts = np.bincount(indices[:, position], minlength=len(alphabet))
+                self.assertLess(chi_square(counts, list(probabilities.values())), limit)
+
+    def test_every_class_in_every_row(self):
+        for classes in ((True, True, True, True), (True, False, True, False), (False, True, False, True)):
+            policy = Policy(12, *classes)
+            with self.subTest(classes=policy.classes):
+                for password in decode(generate_matrix(5_000, policy)):
+                    for name in policy.classes:
+                        self.assertTrue(any(c in CHARS[name] for c in password), password)
+                    self.assertTrue(all(c in policy.alphabet for c in password), password)
+
+    def test_zero_passwords(self):
+        policy = Policy(length=4, upper=True, lower=True, nums=True, special=True)
+        self.assertEqual(generate_matrix(0, policy).shape, (0, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,30 @@
 import tkinter as tk
 from tkinter import messagebox
+import os
 import requests
 from datetime import datetime
 from time import strftime
 
+from weather_api import format_weather, normalize_city
+from weather_cache import CacheEntry, WeatherCache
+from weather_cities import CITY_INDEX, CityIndex
+from weather_dashboard import DASHBOARD_FILE, Dashboard, load_cities
+from weather_fetch import WeatherFetcher
+from weather_scheduler import RefreshScheduler
+
+# Replies are cached in memory and in weather_cache.json
+cache = WeatherCache()
+# The shown city and the dashboard refresh this often, within the API's calls per minute
+REFRESH_MINUTES = 10
+QUOTA_PER_MINUTE = 60
+SUGGESTIONS = 6
+watched_city = None
+# What the user last searched for, as typed
+current_search = None
+
+# Optional offline list of cities, built with `python weather_cities.py build city.list.json.gz`
+city_index = CityIndex.open(CITY_INDEX) if os.path.exists(CITY_INDEX) else None
+
 def update_time():
     """Update the time display every second"""
     current_time = strftime('%I:%M:%S %p')  # 12-hour format with AM/PM
@@ -15,67 +36,140 @@ def update_time():
     # Update every 1000 milliseconds (1 second)
     root.after(1000, update_time)
 
+def show_entry(entry, note=""):
+    """Display a cached or fresh reply"""
+    if entry.status == 200:
+        result_label.config(text=format_weather(entry.data) + note)
+    else:
+        result_label.config(text="❌ City not found!\nPlease check spelling and try again.")
+
+def show_error(error):
+    """Display a request that failed before any reply arrived"""
+    if isinstance(error, requests.exceptions.ConnectionError):
+        result_label.config(text="🚫 No internet connection!\nPlease check your connection.")
+    elif isinstance(error, requests.exceptions.Timeout):
+        result_label.config(text="⏱️ Request timed out!\nPlease try again.")
+    else:
+        result_label.config(text=f"⚠️ Error occurred!\n{str(error)}")
+
+def show_reply(city, entry, status, data):
+    show_entry(entry or CacheEntry(status, data))
+    watch_city(city if status == 200 else None)
+
+def watch_city(city):
+    """Keep the shown city refreshed in the background (None stops it)"""
+    global watched_city
+    if watched_city is not None and (city is None or normalize_city(city) != normalize_city(watched_city)):
+        scheduler.unwatch(watched_city)
+    watched_city = city
+    if city is not None:
+        scheduler.watch(city, on_update=lambda entry: city_refreshed(city, entry))
+
+def city_refreshed(city, entry):
+    """New data from the scheduler; show it unless the user has moved on"""
+    if not fetcher.busy and normalize_city(city_entry.get()) == current_search:
+        show_entry(entry)
+
 def get_weather():
-    city = city_entry.get()
-    api_key = "0efc3505d8f6399f4f1625487ca71e2b"  # Replace with your API key
+    global current_search
+    text = city_entry.get()
     
-    if not city:
+    if not text:
         messagebox.showwarning("Warning", "Please enter a city name!")
         return
     
-    # Show loading
-    result_label.config(text="🔄 Loading weather data...")
+    hide_suggestions()
+    current_search = normalize_city(text)
+    city = text
+    if city_index is not None:
+        match = city_index.resolve(text)
+        if match is not None:
+            # Ask for the exact city; its id is also a stable cache key
+            city = match.id
+        elif not city_index.lookup(text):
+            # Misspelled: no need to ask the server
+            fetcher.cancel()
+            watch_city(None)
+            labels = city_index.labels(city_index.complete(text, 3))
+            hint = f"Did you mean {' or '.join(labels)}?" if labels else "Please check spelling and try again."
+            result_label.config(text=f"❌ City not found!\n{hint}")
+            return
     
+    entry = cache.get(city)
+    if entry is not None:
+        if cache.is_fresh(entry):
+            fetcher.cancel()
+            show_entry(entry)
+            watch_city(city if entry.status == 200 else None)
+            return
+        # Stale: show it right away and refresh in the background
+        show_entry(entry, f"\n🕒 Updated {int(entry.age() // 60)} min ago, refreshing...")
+        fetcher.request(city, lambda *reply: show_reply(city, *reply), lambda error: refresh_failed(city))
+        return
+    
+    # Show loading; the reply arrives later through root.after
+    result_label.config(text="🔄 Loading weather data...")
+    fetcher.request(city, lambda *reply: show_reply(city, *reply), show_error)
+
+def refresh_failed(city):
+    stale = cache.get(city)
+    if stale is not None:
+        show_entry(stale, f"\n🕒 Updated {int(stale.age() // 60)} min ago (refresh failed)")
+
+def city_typed(event):
+    """Typing a different city cancels the search still in flight and updates the suggestions"""
+    if event.keysym in ('Return', 'Escape', 'Down', 'Up'):
+        return
+    if fetcher.busy and normalize_city(city_entry.get()) != current_search:
+        fetcher.cancel()
+        result_label.config(text="🔍 Press Enter to search for the new city")
+    update_suggestions()
+
+def update_suggestions():
+    """List the cities of the offline index that match what has been typed"""
+    if city_index is None:
+        return
+    text = city_entry.get()
+    cities = city_index.complete(text, SUGGESTIONS) if len(text.strip()) >= 2 else []
+    labels = city_index.labels(cities)
+    suggestion_list.delete(0, 'end')
+    for label in labels:
+        suggestion_list.insert('end', label)
+    if labels and labels != [text.strip()]:
+        suggestion_list.config(height=len(labels))
+        suggestion_list.pack(after=city_entry, pady=(0, 8))
+    else:
+        hide_suggestions()
+
+def hide_suggestions():
+    suggestion_list.pack_forget()
+
+def focus_suggestions():
+    if suggestion_list.winfo_ismapped():
+        suggestion_list.focus_set()
+        suggestion_list.selection_clear(0, 'end')
+        suggestion_list.selection_set(0)
+        suggestion_list.activate(0)
+
+def choose_suggestion():
+    selected = suggestion_list.curselection()
+    if selected:
+        city_entry.delete(0, 'end')
+        city_entry.insert(0, suggestion_list.get(selected[0]))
+        city_entry.focus_set()
+        get_weather()
+
+def open_dashboard():
+    """Show every city listed in dashboard_cities.txt at once"""
     try:
-        # API request
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
-        response = requests.get(url)
-        data = response.json()
-        
-        if response.status_code == 200:
-            # Get weather info
-            temp = data['main']['temp']
-            feels_like = data['main']['feels_like']
-            humidity = data['main']['humidity']
-            description = data['weather'][0]['description']
-            city_name = data['name']
-            country = data['sys']['country']
-            wind_speed = data['wind']['speed']
-            pressure = data['main']['pressure']
-            
-            # Get weather emoji
-            weather_main = data['weather'][0]['main']
-            weather_emojis = {
-                'Clear': '☀️',
-                'Clouds': '☁️',
-                'Rain': '🌧️',
-                'Drizzle': '🌦️',
-                'Thunderstorm': '⛈️',
-                'Snow': '🌨️',
-                'Mist': '🌫️',
-                'Fog': '🌫️'
-            }
-            emoji = weather_emojis.get(weather_main, '🌤️')
-            
-            # Display weather with emoji
-            weather_text = f"""
-🌍 City: {city_name}, {country}
-{emoji} Weather: {description.title()}
-🌡️ Temperature: {temp:.1f}°C
-🔥 Feels Like: {feels_like:.1f}°C
-💧 Humidity: {humidity}%
-💨 Wind Speed: {wind_speed} m/s
-📊 Pressure: {pressure} hPa
-            """
-            result_label.config(text=weather_text)
-            
-        else:
-            result_label.config(text="❌ City not found!\nPlease check spelling and try again.")
-            
-    except requests.exceptions.ConnectionError:
-        result_label.config(text="🚫 No internet connection!\nPlease check your connection.")
-    except Exception as e:
-        result_label.config(text=f"⚠️ Error occurred!\n{str(e)}")
+        cities = load_cities()
+    except OSError:
+        messagebox.showinfo("Dashboard", f"Put one city per line in {DASHBOARD_FILE} to use the dashboard.")
+        return
+    if not cities:
+        messagebox.showwarning("Warning", f"{DASHBOARD_FILE} lists no cities!")
+        return
+    Dashboard(root, cities, cache, REFRESH_MINUTES * 60, bucket=scheduler.bucket)
 
 # Create main window
 root = tk.Tk()
@@ -83,6 +177,10 @@ root.title("🌤️ Weather App with Live Clock")
 root.geometry("500x650")
 root.config(bg='lightblue')
 
+# Requests run on worker threads so the window never freezes
+fetcher = WeatherFetcher(root, cache)
+scheduler = RefreshScheduler(root, cache, QUOTA_PER_MINUTE, REFRESH_MINUTES * 60)
+
 # Header Frame for Time and Date
 header_frame = tk.Frame(root, bg='darkblue', relief='raised', bd=2)
 header_frame.pack(fill='x', pady=(0, 10))
@@ -118,6 +216,16 @@ city_entry.pack(pady=8)
 
 # Bind Enter key to search
 city_entry.bind('<Return>', lambda e: get_weather())
+city_entry.bind('<KeyRelease>', city_typed)
+city_entry.bind('<Down>', lambda e: focus_suggestions())
+city_entry.bind('<Escape>', lambda e: hide_suggestions())
+
+# Autocomplete from the offline city index (shown while typing)
+suggestion_list = tk.Listbox(input_frame, font=('Arial', 12), width=30, 
+                            relief='flat', bd=2, activestyle='none')
+suggestion_list.bind('<Return>', lambda e: choose_suggestion())
+suggestion_list.bind('<ButtonRelease-1>', lambda e: choose_suggestion())
+suggestion_list.bind('<Escape>', lambda e: (hide_suggestions(), city_entry.focus_set()))
 
 # Search button
 search_btn = tk.Button(input_frame, text="🔍 Get Weather", 
@@ -128,6 +236,14 @@ search_btn = tk.Button(input_frame, text="🔍 Get Weather",
                       cursor='hand2')
 search_btn.pack(pady=10)
 
+dashboard_btn = tk.Button(input_frame, text="📋 Dashboard", 
+                         command=open_dashboard,
+                         font=('Arial', 12, 'bold'), 
+                         bg='darkblue', fg='white',
+                         width=15, relief='flat', bd=0,
+                         cursor='hand2')
+dashboard_btn.pack(pady=(0, 10))
+
 # Result display
 result_label = tk.Label(root, text="🌟 Welcome to Weather App! 🌟\n\nEnter a city name above and click 'Get Weather'\nto see live weather information!\n\n⏰ Current time is displayed at the top", 
                        font=('Arial', 12), 
@@ -148,3 +264,6 @@ update_time()
 
 # Run the app
 root.mainloop()
+fetcher.close()
+scheduler.close()
+cache.flush()
@@ -0,0 +1,93 @@
+import os
+
+import requests
+
+# Point WEATHER_API_URL at a local stub (see weather_stub.py) for testing
+API_URL = os.environ.get('WEATHER_API_URL', "http://api.openweathermap.org/data/2.5").rstrip('/')
+API_KEY = os.environ.get('WEATHER_API_KEY', "0efc3505d8f6399f4f1625487ca71e2b")  # Replace with your API key
+# Seconds to wait for the server to connect / answer
+TIMEOUT = (3.05, 10)
+# Most city ids the group endpoint accepts per call
+GROUP_SIZE = 20
+
+WEATHER_EMOJIS = {
+    'Clear': '☀️',
+    'Clouds': '☁️',
+    'Rain': '🌧️',
+    'Drizzle': '🌦️',
+    'Thunderstorm': '⛈️',
+    'Snow': '🌨️',
+    'Mist': '🌫️',
+    'Fog': '🌫️'
+}
+
+
+def normalize_city(city):
+    """Cache key for a city name (case and surrounding/repeated spaces do not matter) or an int city id"""
+    if isinstance(city, int):
+        return f"#{city}"
+    return ' '.join(city.split()).casefold()
+
+
+def city_params(city):
+    """Query parameters for a city name as typed, or for an int city id (see weather_cities.py)"""
+    return {'id': city} if isinstance(city, int) else {'q': city}
+
+
+def fetch_current(city, session=None, timeout=TIMEOUT):
+    """(status code, JSON body) of the current weather for a city"""
+    status, data, _ = fetch_conditional(city, None, session, timeout)
+    return status, data
+
+
+def fetch_conditional(city, etag=None, session=None, timeout=TIMEOUT):
+    """(status code, JSON body, response headers) for a city name or id.
+
+    With the ETag of a cached reply the server may answer 304 Not Modified
+    and send no body at all.
+    """
+    headers = {'If-None-Match': etag} if etag else None
+    response = (session or requests).get(f"{API_URL}/weather",
+                                         params={**city_params(city), 'appid': API_KEY, 'units': 'metric'},
+                                         headers=headers, timeout=timeout)
+    try:
+        data = response.json() if response.status_code != 304 else {}
+    except ValueError:
+        data = {}
+    return response.status_code, data, response.headers
+
+
+def fetch_group(city_ids, session=None, timeout=TIMEOUT):
+    """(status code, JSON body) of the current weather for up to GROUP_SIZE city ids in one call"""
+    response = (session or requests).get(f"{API_URL}/group",
+                                         params={'id': ','.join(map(str, city_ids)), 'appid': API_KEY,
+                                                 'units': 'metric'},
+                                         timeout=timeout)
+    try:
+        data = response.json()
+    except ValueError:
+        data = {}
+    return response.status_code, data
+
+
+def format_weather(data):
+    """Text shown in the result label for a successful reply"""
+    temp = data['main']['temp']
+    feels_like = data['main']['feels_like']
+    humidity = data['main']['humidity']
+    description = data['weather'][0]['description']
+    city_name = data['name']
+    country = data['sys']['country']
+    wind_speed = data['wind']['speed']
+    pressure = data['main']['pressure']
+    emoji = WEATHER_EMOJIS.get(data['weather'][0]['main'], '🌤️')
+
+    return f"""
+🌍 City: {city_name}, {country}
+{emoji} Weather: {description.title()}
+🌡️ Temperature: {temp:.1f}°C
+🔥 Feels Like: {feels_like:.1f}°C
+💧 Humidity: {humidity}%
+💨 Wind Speed: {wind_speed} m/s
+📊 Pressure: {pressure} hPa
+            """
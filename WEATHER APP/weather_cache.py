@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from weather_api import normalize_city
+
+CACHE_FILE = "weather_cache.json"
+
+
+class CacheEntry:
+    """One cached reply: HTTP status, JSON body, when it was fetched and its ETag"""
+
+    __slots__ = ('status', 'data', 'fetched_at', 'etag')
+
+    def __init__(self, status, data, fetched_at=None, etag=None):
+        self.status = status
+        self.data = data
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self.etag = etag
+
+    @property
+    def not_found(self):
+        return self.status == 404
+
+    def age(self, now=None):
+        return (now if now is not None else time.time()) - self.fetched_at
+
+    def to_list(self):
+        return [self.status, self.data, self.fetched_at, self.etag]
+
+
+class WeatherCache:
+    """Two-tier cache of weather replies keyed by normalized city name.
+
+    The memory tier is an LRU of at most max_entries; every entry is also
+    written to a JSON file so it survives restarts. That write runs on a
+    timer thread save_delay seconds after a change, so replies arriving
+    together share one write and the Tk thread never waits on the disk;
+    call flush() before exiting. An entry is fresh for
+    ttl seconds and may then still be shown, as stale, for up to stale_ttl
+    seconds while a refresh runs. "City not found" replies are cached too,
+    for negative_ttl seconds, so a typo does not hit the network each time.
+    The cache is shared by the Tk thread and the dashboard's fetch thread,
+    so every access goes through one lock.
+    """
+
+    def __init__(self, path=CACHE_FILE, ttl=600, stale_ttl=3600, negative_ttl=300, max_entries=256,
+                 max_disk_entries=2000, save_delay=1.0):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.save_delay = save_delay
+        self._memory = OrderedDict()
+        self._disk = None
+        self._lock = threading.RLock()
+        # Held for a whole write, so an older snapshot never replaces a newer file
+        self._write_lock = threading.Lock()
+        self._save_timer = None
+
+    def _load_disk(self):
+        if self._disk is None:
+            self._disk = OrderedDict()
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path) as f:
+                        for key, values in json.load(f).items():
+                            self._disk[key] = CacheEntry(*values)
+                except (OSError, ValueError, TypeError):
+                    # A damaged cache is only a cache; start over
+                    self._disk = OrderedDict()
+        return self._disk
+
+    def _save_disk(self):
+        """Schedule a write of the disk tier unless one is already pending"""
+        if not self.path or self._save_timer is not None:
+            return
+        self._save_timer = threading.Timer(self.save_delay, self.flush)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def flush(self):
+        """Write pending changes to disk now; False if the write failed"""
+        with self._write_lock:
+            with self._lock:
+                if self._save_timer is None:
+                    return True
+                self._save_timer.cancel()
+                self._save_timer = None
+                snapshot = {key: entry.to_list() for key, entry in self._disk.items()}
+            tmp_path = self.path + '.tmp'
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                # A read-only or full disk only costs the cache its persistence
+                return False
+        return True
+
+    def lifetime(self, entry):
+        """Seconds an entry counts as fresh"""
+        return self.negative_ttl if entry.not_found else self.ttl
+
+    def is_fresh(self, entry, now=None):
+        return entry.age(now) < self.lifetime(entry)
+
+    def get(self, city, now=None):
+        """Cached entry for city that is fresh or still usable as stale, else None"""
+        key = normalize_city(city)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                entry = self._load_disk().get(key)
+                if entry is not None:
+                    self._remember(key, entry)
+            else:
+                self._memory.move_to_end(key)
+        if entry is None:
+            return None
+
+        # Negative entries are never served stale
+        limit = self.lifetime(entry) if entry.not_found else self.stale_ttl
+        if entry.age(now) >= limit:
+            return None
+        return entry
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, city, status, data, fetched_at=None, etag=None):
+        """Store a reply; only successes and "not found" are cacheable"""
+        with self._lock:
+            entry = self._store(city, status, data, fetched_at, etag)
+            if entry is not None:
+                self._save_disk()
+        return entry
+
+    def touch(self, city, fetched_at=None):
+        """Mark a cached reply as just confirmed (a 304 Not Modified); None if it is gone"""
+        with self._lock:
+            entry = self.get(city)
+            if entry is None:
+                return None
+            return self.put(city, entry.status, entry.data, fetched_at, entry.etag)
+
+    def put_many(self, replies, fetched_at=None):
+        """Store {city: (status, data)} replies with a single write to disk"""
+        with self._lock:
+            entries = {city: self._store(city, status, data, fetched_at) for city, (status, data) in replies.items()}
+            if any(entry is not None for entry in entries.values()):
+                self._save_disk()
+        return entries
+
+    def _store(self, city, status, data, fetched_at, etag=None):
+        if status not in (200, 404):
+            return None
+        key = normalize_city(city)
+        entry = CacheEntry(status, data if status == 200 else {}, fetched_at, etag)
+        self._remember(key, entry)
+
+        disk = self._load_disk()
+        disk[key] = entry
+        disk.move_to_end(key)
+        while len(disk) > self.max_disk_entries:
+            disk.popitem(last=False)
+        return entry
@@ -0,0 +1,351 @@
+import argparse
+import bisect
+import gzip
+import json
+import mmap
+import struct
+import sys
+import time
+import unicodedata
+from array import array
+
+MAGIC = b'WCITIES1'
+# magic, number of cities; followed by the sections listed in CityIndex, little-endian like the header
+HEADER = struct.Struct('<8sQ')
+CITY_INDEX = "cities.idx"
+# Every SPARSE_STEP-th key is kept in memory to narrow a binary search before touching the map
+SPARSE_STEP = 16
+# bytes([0xff]) never occurs in UTF-8, so prefix + END sorts after every key starting with prefix
+END = b'\xff'
+
+
+def city_key(name):
+    """Search key for a city name: no accents, case or punctuation; single spaces"""
+    decomposed = unicodedata.normalize('NFKD', name)
+    plain = ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    return ' '.join(''.join(c if c.isalnum() or c == "'" else ' ' for c in plain).split())
+
+
+def split_label(text):
+    """(name, country or None, (lat, lon) or None) from "Name, CC (lat, lon)" as shown in suggestions"""
+    coords = None
+    text = text.strip()
+    if text.endswith(')') and '(' in text:
+        text, _, inner = text[:-1].rpartition('(')
+        try:
+            lat, lon = (float(value) for value in inner.split(','))
+            coords = (lat, lon)
+        except ValueError:
+            return text.strip(), None, None
+    name, _, country = text.strip().rpartition(',')
+    country = country.strip()
+    if name and len(country) == 2 and country.isalpha():
+        return name.strip(), country.upper(), coords
+    return text.strip(), None, coords
+
+
+class City:
+    """One city of the index"""
+
+    __slots__ = ('id', 'name', 'country', 'lat', 'lon', 'label')
+
+    def __init__(self, city_id, name, country, lat, lon):
+        self.id = city_id
+        self.name = name
+        self.country = country
+        self.lat = lat
+        self.lon = lon
+        self.label = f"{name}, {country}" if country else name
+
+    def __repr__(self):
+        return f"City({self.id}, {self.label!r}, {self.lat:.4f}, {self.lon:.4f})"
+
+
+def _to_little_endian(section, code):
+    """The bytes of a numeric section in file order, whatever the host's byte order"""
+    if sys.byteorder == 'big':
+        section = array(code, section)
+        section.byteswap()
+    return bytes(section)
+
+
+def _from_little_endian(part, code):
+    """A numeric section of a mapped file; a zero-copy cast unless the host is big-endian"""
+    if sys.byteorder == 'little':
+        return part.cast(code)
+    section = array(code)
+    section.frombytes(part)
+    section.byteswap()
+    return section
+
+
+class CityIndex:
+    """Cities sorted by search key, stored as flat arrays for binary search.
+
+    Keys and display names are each one contiguous buffer plus an array of
+    offsets, as in passphrase.WordIndex; ids, coordinates and countries are
+    parallel arrays. An index file is memory-mapped, so opening the full
+    200k-city list is instant and a lookup only reads the pages it needs.
+    """
+
+    def __init__(self, keys, key_offsets, names, name_offsets, ids, coords, countries, mapping=None):
+        self.keys = keys
+        self.key_offsets = key_offsets
+        self.names = names
+        self.name_offsets = name_offsets
+        self.ids = ids
+        self.coords = coords
+        self.countries = countries
+        self._mapping = mapping
+        self._sparse = [self.key(i) for i in range(0, len(self), SPARSE_STEP)]
+
+    @classmethod
+    def from_records(cls, records):
+        """Index (id, name, country, lat, lon) tuples"""
+        rows = sorted((key.encode('utf-8'), country or '', city_id, name, lat, lon)
+                      for city_id, name, country, lat, lon in records if (key := city_key(name)))
+        key_offsets = array('I', [0])
+        name_offsets = array('I', [0])
+        encoded_names = []
+        for key, _, _, name, _, _ in rows:
+            key_offsets.append(key_offsets[-1] + len(key))
+            encoded_names.append(name.encode('utf-8'))
+            name_offsets.append(name_offsets[-1] + len(encoded_names[-1]))
+        coords = array('f')
+        for row in rows:
+            coords.extend(row[4:6])
+        return cls(b''.join(row[0] for row in rows), key_offsets, b''.join(encoded_names), name_offsets,
+                   array('I', (row[2] for row in rows)),
+                   coords, ''.join(f"{row[1]:<2.2}" for row in rows).encode('ascii'))
+
+    @classmethod
+    def from_city_list(cls, path):
+        """Index OpenWeatherMap's city.list.json (optionally gzipped)"""
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            cities = json.load(f)
+        return cls.from_records((city['id'], city['name'], city.get('country', ''), city['coord']['lat'],
+                                 city['coord']['lon']) for city in cities)
+
+    @classmethod
+    def open(cls, path=CITY_INDEX):
+        """Map an index file built by save()"""
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(mapping)
+        if magic != MAGIC:
+            mapping.close()
+            raise ValueError(f"{path} is not a city index")
+
+        view = memoryview(mapping)
+        sections = []
+        start = HEADER.size
+        # Fixed-size sections first, so every array starts 4-byte aligned
+        for size, code in ((4 * (count + 1), 'I'), (4 * (count + 1), 'I'), (4 * count, 'I'), (8 * count, 'f'),
+                           (2 * count, None)):
+            part = view[start:start + size]
+            sections.append(_from_little_endian(part, code) if code else part)
+            start += size
+        key_offsets, name_offsets, ids, coords, countries = sections
+        keys = view[start:start + key_offsets[-1]]
+        names = view[start + key_offsets[-1]:start + key_offsets[-1] + name_offsets[-1]]
+        return cls(keys, key_offsets, names, name_offsets, ids, coords, countries, mapping)
+
+    def save(self, path=CITY_INDEX):
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(self)))
+            for section, code in ((self.key_offsets, 'I'), (self.name_offsets, 'I'), (self.ids, 'I'),
+                                  (self.coords, 'f')):
+                f.write(_to_little_endian(section, code))
+            for section in (self.countries, self.keys, self.names):
+                f.write(bytes(section))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def key(self, i):
+        return bytes(self.keys[self.key_offsets[i]:self.key_offsets[i + 1]])
+
+    def __getitem__(self, i):
+        name = bytes(self.names[self.name_offsets[i]:self.name_offsets[i + 1]]).decode('utf-8')
+        country = bytes(self.countries[2 * i:2 * i + 2]).decode('ascii').strip()
+        return City(self.ids[i], name, country, self.coords[2 * i], self.coords[2 * i + 1])
+
+    def _lower_bound(self, key, lo=0, hi=None):
+        """First position in [lo, hi) whose key is >= key (hi if none is)"""
+        hi = len(self) if hi is None else hi
+        if hi - lo > SPARSE_STEP:
+            # Sample block - 1 is below key and sample block is not (keys repeat, so not bisect_right)
+            block = bisect.bisect_left(self._sparse, key)
+            if (block - 1) * SPARSE_STEP >= hi:
+                return hi
+            if block * SPARSE_STEP <= lo:
+                return lo
+            lo = max(lo, (block - 1) * SPARSE_STEP)
+            hi = min(hi, block * SPARSE_STEP)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def prefix_range(self, prefix, lo=0, hi=None):
+        """(start, stop) positions of the keys beginning with prefix (bytes)"""
+        start = self._lower_bound(prefix, lo, hi)
+        return start, self._lower_bound(prefix + END, start, hi)
+
+    def _has_prefix(self, prefix, lo=0, hi=None):
+        i = self._lower_bound(prefix, lo, hi)
+        return i < (len(self) if hi is None else hi) and self.key(i).startswith(prefix)
+
+    def _next_bytes(self, head, lo, hi):
+        """Each byte that follows head in the keys of [lo, hi), which all start with head"""
+        depth = len(head)
+        while lo < hi:
+            key = self.key(lo)
+            if len(key) == depth:
+                lo = self._lower_bound(head + b'\x00', lo, hi)
+                continue
+            following = key[depth:depth + 1]
+            yield following
+            lo = self._lower_bound(head + following + END, lo, hi)
+
+    def complete(self, text, limit=8):
+        """Up to limit cities for what has been typed so far, best first.
+
+        Names starting with the text come first; when there are none, names
+        starting with a one-typo variant of it (a letter missing, extra,
+        swapped or wrong) are suggested instead.
+        """
+        key = city_key(text)
+        if not key:
+            return []
+        found = self._complete_prefix(key.encode('utf-8'), limit)
+        if not found and len(key) >= 3:
+            for variant in self._typo_variants(key.encode('utf-8')):
+                for i in self._complete_prefix(variant, limit - len(found)):
+                    if i not in found:
+                        found.append(i)
+                if len(found) >= limit:
+                    break
+        return [self[i] for i in found[:limit]]
+
+    def _complete_prefix(self, prefix, limit):
+        """Positions of up to limit cities starting with prefix: one per name, then their namesakes"""
+        groups = []
+        i, stop = self.prefix_range(prefix)
+        while i < stop and len(groups) < limit:
+            # b'\x00' sorts before any character a key can hold, so this skips the namesakes of key(i)
+            end = self._lower_bound(self.key(i) + b'\x00')
+            groups.append((i, end))
+            i = end
+        picks = [start for start, _ in groups]
+        for start, end in groups:
+            picks.extend(range(start + 1, min(end, start + limit)))
+        return sorted(picks[:limit])
+
+    def _typo_variants(self, key):
+        """Keys one edit away from key (bytes) that begin some city key; the first letter is trusted.
+
+        The sorted keys are walked like a trie: edits at position i keep
+        key[:i], so only bytes that actually follow key[:i] are tried, and
+        once no city starts with key[:i] no later edit can help.
+        """
+        seen = {key}
+        for i in range(1, len(key)):
+            head = key[:i]
+            lo, hi = self.prefix_range(head)
+            if lo == hi:
+                return
+            # Swaps and deletions first: the likeliest typos, and the fewest candidates
+            candidates = [head + key[i + 1:i + 2] + key[i:i + 1] + key[i + 2:], head + key[i + 1:]]
+            for following in self._next_bytes(head, lo, hi):
+                candidates += [head + following + key[i + 1:], head + following + key[i:]]
+            for candidate in candidates:
+                if candidate not in seen:
+                    seen.add(candidate)
+                    if self._has_prefix(candidate, lo, hi):
+                        yield candidate
+
+    def lookup(self, text):
+        """Every city matching "Name", "Name, CC" or a suggestion label exactly"""
+        name, country, coords = split_label(text)
+        key = city_key(name).encode('utf-8')
+        start, stop = self.prefix_range(key)
+        cities = [self[i] for i in range(start, stop) if self.key(i) == key]
+        if country:
+            cities = [city for city in cities if city.country == country]
+        if coords:
+            cities = [city for city in cities if abs(city.lat - coords[0]) < 0.01 and abs(city.lon - coords[1]) < 0.01]
+        return cities
+
+    def resolve(self, text):
+        """The one city text names, or None if it names none or several"""
+        cities = self.lookup(text)
+        return cities[0] if len(cities) == 1 else None
+
+    def labels(self, cities):
+        """Suggestion texts; namesakes in one country get their coordinates so every label resolves"""
+        labels = []
+        for city in cities:
+            label = city.label
+            if len(self.lookup(label)) > 1:
+                label = f"{label} ({city.lat:.2f}, {city.lon:.2f})"
+            labels.append(label)
+        return labels
+
+    def close(self):
+        self.keys = self.names = self.key_offsets = self.name_offsets = self.ids = self.coords = None
+        self.countries = None
+        if self._mapping is not None:
+            self._mapping.close()
+
+
+def benchmark(index, queries, repeat=20):
+    """Mean milliseconds per complete() call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            index.complete(query)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline city index for autocomplete and id lookup")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', help="index OpenWeatherMap's city.list.json(.gz)")
+    build_parser.add_argument('city_list')
+    build_parser.add_argument('-o', '--output', default=CITY_INDEX)
+
+    search_parser = commands.add_parser('search', help="show suggestions for what has been typed")
+    search_parser.add_argument('text', nargs='+')
+    search_parser.add_argument('-i', '--index', default=CITY_INDEX)
+    search_parser.add_argument('-n', '--limit', type=int, default=8)
+    search_parser.add_argument('--benchmark', action='store_true', help="report the time per lookup too")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        index = CityIndex.from_city_list(args.city_list)
+        index.save(args.output)
+        print(f"Indexed {len(index)} cities into {args.output} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        return
+
+    try:
+        index = CityIndex.open(args.index)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    for text in args.text:
+        cities = index.complete(text, args.limit)
+        print(f"{text}:")
+        for city, label in zip(cities, index.labels(cities)):
+            print(f"  {label:<40} id {city.id:<9} {city.lat:8.4f} {city.lon:9.4f}")
+    if args.benchmark:
+        print(f"{benchmark(index, args.text):.3f} ms per lookup over {len(index)} cities")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+import argparse
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from weather_api import GROUP_SIZE, TIMEOUT, WEATHER_EMOJIS, fetch_current, fetch_group, normalize_city
+
+DASHBOARD_FILE = "dashboard_cities.txt"
+# Seconds between refreshes of each city on the dashboard
+REFRESH_INTERVAL = 600
+
+
+def load_cities(path=DASHBOARD_FILE):
+    """City names from a text file, one per line; blank lines and # comments are skipped"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def stagger_offsets(count, interval):
+    """Start offsets that spread count refresh slots evenly over interval seconds"""
+    return [interval * i / count for i in range(count)]
+
+
+class DashboardClient:
+    """Fetch many cities at once over one pooled keep-alive session.
+
+    At most workers requests run at a time and at most per_host
+    connections are opened to the API host. Cities whose id is known
+    (learned from earlier replies) are fetched GROUP_SIZE at a time from
+    the group endpoint; the rest, and everything once the provider turns
+    out not to offer that endpoint, are fetched with concurrent single
+    calls.
+    """
+
+    def __init__(self, cache=None, workers=8, per_host=8, timeout=TIMEOUT, group_size=GROUP_SIZE):
+        self.cache = cache
+        self.timeout = timeout
+        self.group_size = group_size
+        self.group_supported = True
+        self.ids = {}
+        self.closed = False
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=per_host, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix='dashboard')
+
+    def city_id(self, city):
+        key = normalize_city(city)
+        city_id = self.ids.get(key)
+        if city_id is None and self.cache is not None:
+            entry = self.cache.get(city)
+            if entry is not None and entry.status == 200:
+                city_id = self.ids[key] = entry.data.get('id')
+        return city_id
+
+    def _fetch_one(self, city):
+        status, data = fetch_current(city, self.session, self.timeout)
+        if status == 200 and 'id' in data:
+            self.ids[normalize_city(city)] = data['id']
+        return {city: (status, data)}
+
+    def _fetch_group(self, by_id):
+        """Replies for {id: city}; None if the provider has no group endpoint"""
+        status, data = fetch_group(list(by_id), self.session, self.timeout)
+        if status in (400, 401, 403, 404):
+            self.group_supported = False
+            return None
+        if status != 200:
+            return {city: (status, data) for city in by_id.values()}
+        replies = {}
+        for item in data.get('list', []):
+            city = by_id.get(item.get('id'))
+            if city is not None:
+                replies[city] = (200, item)
+        return replies
+
+    def calls_for(self, cities):
+        """HTTP calls fetch_many(cities) is expected to make"""
+        if not self.group_supported:
+            return len(cities)
+        known = sum(self.city_id(city) is not None for city in cities)
+        return -(-known // self.group_size) + len(cities) - known
+
+    def _submit(self, pending, fn, arg, cities):
+        """Start fn(arg) for cities unless the client has been closed"""
+        if self.closed:
+            return
+        try:
+            pending[self._pool.submit(fn, arg)] = cities
+        except RuntimeError:
+            # close() shut the pool down from another thread
+            pass
+
+    def fetch_many(self, cities):
+        """{city: (status, data)} for every city; network failures give (None, {'message': ...}).
+
+        Once the client is closed no new calls are started and only the
+        replies already received are returned.
+        """
+        results = {}
+        pending = {}
+        by_id = {}
+        for city in cities:
+            city_id = self.city_id(city) if self.group_supported else None
+            if city_id is None:
+                self._submit(pending, self._fetch_one, city, [city])
+            else:
+                by_id[city_id] = city
+        ids = list(by_id)
+        for start in range(0, len(ids), self.group_size):
+            batch = {city_id: by_id[city_id] for city_id in ids[start:start + self.group_size]}
+            self._submit(pending, self._fetch_group, batch, list(batch.values()))
+
+        while pending and not self.closed:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                asked = pending.pop(future)
+                if future.cancelled():
+                    continue
+                try:
+                    replies = future.result()
+                except requests.exceptions.RequestException as e:
+                    replies = {city: (None, {'message': str(e)}) for city in asked}
+                if replies is None:
+                    replies = {}
+                results.update(replies)
+                # Fall back to single calls for a failed or incomplete group
+                for city in asked:
+                    if city not in replies:
+                        self._submit(pending, self._fetch_one, city, [city])
+
+        if self.cache is not None:
+            self.cache.put_many(results)
+        return results
+
+    def close(self):
+        self.closed = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+def format_cell(city, reply):
+    """Short text for one dashboard tile"""
+    if reply is None:
+        return f"{city}\n🔄"
+    status, data = reply
+    if status == 200:
+        emoji = WEATHER_EMOJIS.get(data['weather'][0]['main'], '🌤️')
+        return f"{data['name']}, {data['sys']['country']}\n{emoji} {data['main']['temp']:.1f}°C"
+    if status == 404:
+        return f"{city}\n❌ Not found"
+    return f"{city}\n⚠️ {data.get('message', status)}"
+
+
+class Dashboard:
+    """Window with one tile per city, refreshed a slice at a time.
+
+    The cities are split into slices of GROUP_SIZE whose refreshes are
+    spread evenly over the interval, so the API sees a steady trickle of
+    requests instead of every city at once. Cities whose cached reply is
+    still fresh are left out of a refresh. With a token bucket every fetch,
+    the first load included, waits until the quota has room for its calls,
+    and a slice needing more calls than the bucket holds goes in parts.
+    """
+
+    def __init__(self, root, cities, cache=None, interval=REFRESH_INTERVAL, columns=4, bucket=None):
+        import tkinter as tk
+
+        self.root = root
+        self.interval = interval
+        self.cache = cache
+        self.bucket = bucket
+        self.client = DashboardClient(cache)
+        self.window = tk.Toplevel(root)
+        self.window.title("📋 Weather Dashboard")
+        self.window.config(bg='lightblue')
+        self.window.protocol('WM_DELETE_WINDOW', self.close)
+        self.status_label = tk.Label(self.window, text="🔄 Loading...", font=('Arial', 10, 'italic'),
+                                     bg='lightblue', fg='gray')
+        self.status_label.grid(row=0, column=0, columnspan=columns, pady=5)
+
+        self.tiles = {}
+        for i, city in enumerate(cities):
+            tile = tk.Label(self.window, text=format_cell(city, None), font=('Arial', 11), width=22, height=3,
+                            bg='white', fg='darkblue', relief='sunken', bd=2)
+            tile.grid(row=1 + i // columns, column=i % columns, padx=4, pady=4)
+            self.tiles[city] = tile
+
+        self.closed = False
+        # Cities with a fetch on the wire
+        self.fetching = set()
+        self.slices = [cities[i:i + GROUP_SIZE] for i in range(0, len(cities), GROUP_SIZE)]
+        # The first load fetches everything not fresh in the cache; refreshes after that are staggered
+        due = self.stale(cities)
+        for city in cities:
+            if city not in due:
+                entry = self.cache.get(city)
+                self.tiles[city].config(text=format_cell(city, (entry.status, entry.data)))
+        for offset, cities_slice in zip(stagger_offsets(len(self.slices), interval), self.slices):
+            if any(city in due for city in cities_slice):
+                self.tick(cities_slice, interval + offset)
+            else:
+                self.root.after(int((interval + offset) * 1000), lambda s=cities_slice: self.tick(s))
+
+    def tick(self, cities_slice, next_in=None):
+        """Refresh the stale cities of a slice as the quota allows, then again after next_in seconds"""
+        if self.closed:
+            return
+        next_in = next_in or self.interval
+        due = self.stale(cities_slice)
+        if due and self.bucket is not None:
+            due = self.fitting(due, self.bucket.capacity)
+            calls = self.client.calls_for(due)
+            if not self.bucket.take(calls):
+                self.root.after(int(self.bucket.wait_time(calls) * 1000) + 1,
+                                lambda: self.tick(cities_slice, next_in))
+                return
+        if due:
+            self.refresh(due)
+            if self.stale(cities_slice):
+                # The rest of the slice follows once the bucket has refilled
+                self.root.after(1, lambda: self.tick(cities_slice, next_in))
+                return
+        self.root.after(int(next_in * 1000), lambda: self.tick(cities_slice))
+
+    def fitting(self, cities, calls):
+        """The leading cities that fetch_many can fetch with at most calls requests"""
+        chosen = []
+        for city in cities:
+            if self.client.calls_for(chosen + [city]) > calls:
+                break
+            chosen.append(city)
+        return chosen
+
+    def stale(self, cities):
+        """The cities without a fresh cached reply that are not being fetched already"""
+        cities = [city for city in cities if city not in self.fetching]
+        if self.cache is None:
+            return cities
+        return [city for city in cities if (entry := self.cache.get(city)) is None or not self.cache.is_fresh(entry)]
+
+    def refresh(self, cities):
+        """Fetch off the Tk thread and update the tiles through root.after"""
+        self.fetching.update(cities)
+
+        def run():
+            start = time.perf_counter()
+            results = self.client.fetch_many(cities)
+            elapsed = time.perf_counter() - start
+            try:
+                self.root.after(0, lambda: self.show(cities, results, elapsed))
+            except RuntimeError:
+                pass
+        threading.Thread(target=run, daemon=True).start()
+
+    def show(self, cities, results, elapsed):
+        self.fetching.difference_update(cities)
+        if self.closed:
+            return
+        for city, reply in results.items():
+            self.tiles[city].config(text=format_cell(city, reply))
+        self.status_label.config(text=f"🕐 {time.strftime('%I:%M:%S %p')}: {len(results)} cities "
+                                      f"refreshed in {elapsed * 1000:.0f} ms")
+
+    def close(self):
+        self.closed = True
+        self.client.close()
+        self.window.destroy()
+
+
+def benchmark(count=100, delay=0.05, workers=8):
+    """End-to-end refresh times for count cities against a local stub"""
+    import weather_api
+    from weather_stub import start_stub
+
+    cities = [f"Stubtown {i}" for i in range(1, count + 1)]
+    results = []
+    for group in (True, False):
+        stub = start_stub(delay=delay, extra_cities=count, group=group)
+        weather_api.API_URL = stub.url
+        client = DashboardClient(workers=workers, per_host=workers)
+        for label in ("cold", "warm"):
+            start = time.perf_counter()
+            replies = client.fetch_many(cities)
+            elapsed = time.perf_counter() - start
+            ok = sum(status == 200 for status, _ in replies.values())
+            calls = sum(stub.requests.values())
+            stub.requests.clear()
+            results.append((f"{'group' if group else 'no group'}, {label}", elapsed, ok, calls))
+        client.close()
+        stub.shutdown()
+
+    stub = start_stub(delay=delay, extra_cities=count)
+    weather_api.API_URL = stub.url
+    start = time.perf_counter()
+    for city in cities:
+        fetch_current(city)
+    results.append(("one at a time, no session", time.perf_counter() - start, count, sum(stub.requests.values())))
+    stub.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a dashboard refresh of many cities against a local stub")
+    parser.add_argument('--cities', type=int, default=100)
+    parser.add_argument('--delay', type=float, default=0.05, help="stub reply delay, standing in for network latency")
+    parser.add_argument('--workers', type=int, default=8, help="concurrent requests (and connections per host)")
+    args = parser.parse_args()
+
+    print(f"Refreshing {args.cities} cities, stub delay {args.delay * 1000:.0f} ms, {args.workers} workers")
+    for label, elapsed, ok, calls in benchmark(args.cities, args.delay, args.workers):
+        print(f"  {label:<26} {elapsed * 1000:>8.0f} ms  {ok} ok  {calls} requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from weather_api import TIMEOUT, fetch_current
+
+
+class WeatherFetcher:
+    """Fetch weather on worker threads and deliver results on the Tk thread.
+
+    Only the latest request counts: starting a new one (or calling
+    cancel()) cancels a request that has not started yet and discards the
+    result of one already on the wire. Results always reach the cache,
+    even when superseded, but callbacks only run for the current request
+    and always run on the Tk thread through root.after.
+    """
+
+    def __init__(self, root, cache, workers=4, timeout=TIMEOUT):
+        self.root = root
+        self.cache = cache
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix='weather')
+        self._local = threading.local()
+        self._future = None
+        self._generation = 0
+        self.city = None
+
+    def _session(self):
+        """One pooled keep-alive session per worker thread"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _fetch(self, city):
+        return fetch_current(city, self._session(), self.timeout)
+
+    def request(self, city, on_result, on_error):
+        """Fetch city, superseding any earlier request.
+
+        on_result(entry, status, data) gets the reply and its CacheEntry
+        (None when the status is not cacheable); on_error(exception) gets
+        connection errors and timeouts.
+        """
+        self.cancel()
+        generation = self._generation
+        self.city = city
+        future = self._pool.submit(self._fetch, city)
+        self._future = future
+        future.add_done_callback(lambda f: self._done(f, generation, city, on_result, on_error))
+
+    def _done(self, future, generation, city, on_result, on_error):
+        """Worker thread: hand the outcome over to the Tk thread"""
+        if future.cancelled():
+            return
+        try:
+            self.root.after(0, lambda: self._deliver(future, generation, city, on_result, on_error))
+        except RuntimeError:
+            # The window is already gone
+            pass
+
+    def _deliver(self, future, generation, city, on_result, on_error):
+        current = generation == self._generation
+        if current:
+            self._future = None
+            self.city = None
+        error = future.exception()
+        if error is not None:
+            if current:
+                on_error(error)
+            return
+
+        status, data = future.result()
+        entry = self.cache.put(city, status, data)
+        if current:
+            on_result(entry, status, data)
+
+    @property
+    def busy(self):
+        return self._future is not None
+
+    def cancel(self):
+        """Forget the current request; its result will be ignored"""
+        self._generation += 1
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+        self.city = None
+
+    def close(self):
+        self.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class FrameMonitor:
+    """Largest gap between Tk timer ticks, i.e. how long the UI was unresponsive"""
+
+    def __init__(self, root, interval_ms=5):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.worst_ms = 0.0
+        self._last = None
+        self._running = False
+
+    def start(self):
+        self._running = True
+        self._last = time.perf_counter()
+        self.root.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        now = time.perf_counter()
+        # Subtract the requested interval so an idle loop reports ~0 ms
+        self.worst_ms = max(self.worst_ms, (now - self._last) * 1000 - self.interval_ms)
+        self._last = now
+        if self._running:
+            self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        self._running = False
+        return self.worst_ms
+
+
+def main():
+    """Check that slow replies never block the UI, using weather_stub with a delay"""
+    import tkinter as tk
+
+    import weather_api
+    from weather_cache import WeatherCache
+    from weather_stub import start_stub
+
+    parser = argparse.ArgumentParser(description="Measure UI frame latency while fetching from a slow stub")
+    parser.add_argument('--delay', type=float, default=1.5, help="seconds the stub waits before replying")
+    parser.add_argument('--requests', type=int, default=20, help="searches to start, each superseding the last")
+    args = parser.parse_args()
+
+    stub = start_stub(delay=args.delay)
+    weather_api.API_URL = stub.url
+
+    root = tk.Tk()
+    label = tk.Label(root, text="🔄 Loading weather data...")
+    label.pack()
+    fetcher = WeatherFetcher(root, WeatherCache(path=None))
+    monitor = FrameMonitor(root)
+    results = []
+
+    def on_result(entry, status, data):
+        results.append(status)
+        label.config(text=f"{status} {data.get('name', '')}")
+
+    cities = ["London", "Paris", "Berlin", "Madrid", "Rome"]
+    for i in range(args.requests):
+        root.after(50 * i, lambda i=i: fetcher.request(cities[i % len(cities)], on_result, results.append))
+    root.after(int((args.delay + 1) * 1000 + 50 * args.requests), root.quit)
+
+    monitor.start()
+    start = time.perf_counter()
+    root.mainloop()
+    worst = monitor.stop()
+    fetcher.close()
+    root.destroy()
+    stub.shutdown()
+
+    print(f"{args.requests} searches against a {args.delay}s stub in {time.perf_counter() - start:.1f}s: "
+          f"{len(results)} delivered (superseded ones dropped)")
+    print(f"Worst UI frame gap: {worst:.1f} ms ({'OK' if worst < 16 else 'over the 16 ms budget'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+import argparse
+import heapq
+import itertools
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from weather_api import TIMEOUT, fetch_conditional, normalize_city
+
+# Seconds between refreshes of a watched city
+REFRESH_INTERVAL = 600
+# Calls per minute the API allows (OpenWeatherMap's free plan: 60)
+QUOTA_PER_MINUTE = 60
+# Backoff after a failed refresh: BACKOFF_BASE seconds, doubling up to BACKOFF_CAP
+BACKOFF_BASE = 5
+BACKOFF_CAP = 900
+
+
+class TokenBucket:
+    """Allow at most per_minute calls in any minute, in bursts of up to capacity.
+
+    The default burst is a tenth of the quota. The bucket refills at
+    (per_minute - capacity) a minute, so a full burst plus a minute of
+    refill still stays within a provider that counts calls over a sliding
+    minute.
+    """
+
+    def __init__(self, per_minute=QUOTA_PER_MINUTE, capacity=None, clock=time.monotonic):
+        self.capacity = capacity or max(1, per_minute // 10)
+        self.rate = max(per_minute - self.capacity, 1) / 60
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.updated = clock()
+
+    def _fill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _check(self, count):
+        if count > self.capacity:
+            raise ValueError(f"{count} calls can never fit in a bucket of {self.capacity}; split them up")
+
+    def take(self, count=1):
+        """Spend count tokens if there are that many; True if the calls may go ahead"""
+        self._check(count)
+        self._fill()
+        if self.tokens >= count:
+            self.tokens -= count
+            return True
+        return False
+
+    def wait_time(self, count=1):
+        """Seconds until count tokens are available"""
+        self._check(count)
+        self._fill()
+        return max(0.0, (count - self.tokens) / self.rate)
+
+    def drain(self):
+        """The server says we are over quota: start again from an empty bucket"""
+        self._fill()
+        self.tokens = 0.0
+
+
+def backoff_delay(failures, base=BACKOFF_BASE, cap=BACKOFF_CAP, rng=random):
+    """Exponential backoff with jitter: between half and all of base * 2**(failures - 1), capped"""
+    delay = min(cap, base * 2 ** (failures - 1))
+    return rng.uniform(delay / 2, delay)
+
+
+class Watch:
+    """A city the scheduler keeps fresh"""
+
+    __slots__ = ('city', 'interval', 'on_update', 'due', 'failures', 'busy')
+
+    def __init__(self, city, interval, on_update, due):
+        self.city = city
+        self.interval = interval
+        self.on_update = on_update
+        self.due = due
+        self.failures = 0
+        self.busy = False
+
+
+class RefreshScheduler:
+    """Refresh watched cities in the background within the API quota.
+
+    A single root.after timer is armed for the next due city. When a city
+    comes due it is skipped if its cache entry is still fresh (something
+    else fetched it), delayed if the token bucket is empty, and otherwise
+    fetched with If-None-Match so an unchanged reply costs a bodiless 304.
+    Errors and 429s back off exponentially with jitter, honouring
+    Retry-After. on_update(entry) runs on the Tk thread after a refresh.
+    """
+
+    def __init__(self, root, cache, quota=QUOTA_PER_MINUTE, interval=REFRESH_INTERVAL, workers=2, timeout=TIMEOUT):
+        self.root = root
+        self.cache = cache
+        self.interval = interval
+        self.timeout = timeout
+        self.bucket = TokenBucket(quota)
+        self.session = requests.Session()
+        self.stats = Counter()
+        self.watches = {}
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix='refresh')
+        self._timer = None
+        # Earliest time the bucket will have a token again
+        self._not_before = 0.0
+
+    def next_due(self, entry, interval):
+        """When a cached entry should next be refreshed"""
+        return entry.fetched_at + max(interval, self.cache.lifetime(entry))
+
+    def watch(self, city, on_update=None, interval=None):
+        key = normalize_city(city)
+        interval = interval or self.interval
+        entry = self.cache.get(city)
+        due = self.next_due(entry, interval) if entry is not None else time.time()
+        watch = self.watches.get(key)
+        if watch is None:
+            self.watches[key] = Watch(city, interval, on_update, due)
+        else:
+            watch.interval = interval
+            watch.on_update = on_update
+            if not watch.failures:
+                watch.due = due
+        self._schedule()
+
+    def unwatch(self, city):
+        self.watches.pop(normalize_city(city), None)
+        self._schedule()
+
+    def _schedule(self):
+        """Arm one timer for the earliest due city"""
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+        waiting = [watch.due for watch in self.watches.values() if not watch.busy]
+        if waiting:
+            delay = max(0.0, min(waiting) - time.time(), self._not_before - time.monotonic())
+            self._timer = self.root.after(int(delay * 1000) + 1, self._run)
+
+    def _run(self):
+        self._timer = None
+        now = time.time()
+        # Longest overdue first, so a tight quota still rotates through every city
+        due = sorted((watch for watch in self.watches.values() if not watch.busy and watch.due <= now),
+                     key=lambda watch: watch.due)
+        for watch in due:
+            entry = self.cache.get(watch.city)
+            if entry is not None and self.cache.is_fresh(entry, now):
+                self.stats['skipped_fresh'] += 1
+                watch.due = self.next_due(entry, watch.interval)
+                continue
+            if not self.bucket.take():
+                # Everyone left stays due and keeps their place in line
+                self.stats['throttled'] += 1
+                self._not_before = time.monotonic() + self.bucket.wait_time()
+                break
+
+            watch.busy = True
+            self.stats['requests'] += 1
+            etag = entry.etag if entry is not None else None
+            future = self._pool.submit(fetch_conditional, watch.city, etag, self.session, self.timeout)
+            future.add_done_callback(lambda f, watch=watch: self._done(f, watch))
+        self._schedule()
+
+    def _done(self, future, watch):
+        """Worker thread: hand the reply over to the Tk thread"""
+        try:
+            self.root.after(0, lambda: self._finish(future, watch))
+        except RuntimeError:
+            # The window is already gone
+            pass
+
+    def _finish(self, future, watch):
+        watch.busy = False
+        status = retry_after = None
+        try:
+            status, data, headers = future.result()
+        except requests.exceptions.RequestException:
+            self.stats['errors'] += 1
+        else:
+            retry_after = headers.get('Retry-After')
+
+        entry = None
+        if status == 304:
+            self.stats['not_modified'] += 1
+            entry = self.cache.touch(watch.city)
+        elif status in (200, 404):
+            self.stats['updated'] += 1
+            entry = self.cache.put(watch.city, status, data, etag=headers.get('ETag'))
+        elif status == 429:
+            self.stats['rate_limited'] += 1
+            self.bucket.drain()
+            self._not_before = time.monotonic() + self.bucket.wait_time()
+        elif status is not None:
+            self.stats['errors'] += 1
+
+        if entry is not None:
+            watch.failures = 0
+            watch.due = self.next_due(entry, watch.interval)
+            if watch.on_update is not None and self.watches.get(normalize_city(watch.city)) is watch:
+                watch.on_update(entry)
+        else:
+            watch.failures += 1
+            delay = backoff_delay(watch.failures)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            watch.due = time.time() + delay
+        self._schedule()
+
+    def close(self):
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+        self.watches.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class EventLoop:
+    """Minimal stand-in for a Tk root (after, after_cancel) to run the scheduler without a window"""
+
+    def __init__(self):
+        self._timers = []
+        self._cancelled = set()
+        self._ids = itertools.count()
+        self._incoming = []
+
+    def after(self, ms, callback):
+        timer = next(self._ids)
+        if ms == 0:
+            # Calls from worker threads; list.append is atomic
+            self._incoming.append(callback)
+        else:
+            heapq.heappush(self._timers, (time.monotonic() + ms / 1000, timer, callback))
+        return timer
+
+    def after_cancel(self, timer):
+        self._cancelled.add(timer)
+
+    def run(self, seconds):
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            while self._incoming:
+                self._incoming.pop(0)()
+            if self._timers and self._timers[0][0] <= time.monotonic():
+                _, timer, callback = heapq.heappop(self._timers)
+                if timer not in self._cancelled:
+                    callback()
+                continue
+            time.sleep(0.005)
+
+
+def main():
+    """Compare the scheduler's upstream traffic with plain polling, against the stub"""
+    import weather_api
+    from weather_cache import WeatherCache
+    from weather_stub import start_stub
+
+    parser = argparse.ArgumentParser(description="Upstream calls of the refresh scheduler vs. polling every interval")
+    parser.add_argument('--cities', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=2, help="requested refresh interval in seconds")
+    parser.add_argument('--ttl', type=float, default=5, help="seconds a cached reply stays fresh")
+    parser.add_argument('--quota', type=int, default=300, help="stub and scheduler calls per minute")
+    parser.add_argument('--duration', type=float, default=20)
+    args = parser.parse_args()
+
+    cities = [f"Stubtown {i}" for i in range(1, args.cities + 1)]
+
+    stub = start_stub(extra_cities=args.cities, quota=args.quota)
+    weather_api.API_URL = stub.url
+    session = requests.Session()
+    statuses = Counter()
+    end = time.monotonic() + args.duration
+    while time.monotonic() < end:
+        started = time.monotonic()
+        for city in cities:
+            statuses[fetch_conditional(city, None, session)[0]] += 1
+        time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+    stub.shutdown()
+    print(f"Polling every {args.interval}s: {sum(statuses.values())} calls, "
+          + ", ".join(f"{count} x {status}" for status, count in sorted(statuses.items())))
+
+    stub = start_stub(extra_cities=args.cities, quota=args.quota)
+    weather_api.API_URL = stub.url
+    loop = EventLoop()
+    cache = WeatherCache(path=None, ttl=args.ttl, negative_ttl=args.ttl)
+    scheduler = RefreshScheduler(loop, cache, quota=args.quota, interval=args.interval)
+    for city in cities:
+        scheduler.watch(city)
+    loop.run(args.duration)
+    scheduler.close()
+    ages = [entry.age() for entry in map(cache.get, cities) if entry is not None]
+    stub.shutdown()
+    print(f"Scheduler: {scheduler.stats['requests']} calls "
+          f"({scheduler.stats['updated']} full replies, {scheduler.stats['not_modified']} x 304, "
+          f"{scheduler.stats['rate_limited']} x 429), {scheduler.stats['throttled']} held back by the token bucket, "
+          f"{len(ages)}/{len(cities)} cities cached, oldest {max(ages, default=0):.1f}s old (ttl {args.ttl}s)")
+
+
+if __name__ == "__main__":
+    main()
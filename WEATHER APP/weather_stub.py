@@ -0,0 +1,204 @@
+import argparse
+import json
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# (name, country, lat, lon) served by the stub; --cities adds synthetic ones
+CITIES = [
+    ("London", "GB", 51.5085, -0.1257), ("Paris", "FR", 48.8534, 2.3488), ("Berlin", "DE", 52.5244, 13.4105),
+    ("Madrid", "ES", 40.4165, -3.7026), ("Rome", "IT", 41.8919, 12.5113), ("Vienna", "AT", 48.2085, 16.3721),
+    ("Amsterdam", "NL", 52.3740, 4.8897), ("Brussels", "BE", 50.8505, 4.3488), ("Lisbon", "PT", 38.7167, -9.1333),
+    ("Dublin", "IE", 53.3331, -6.2489), ("Oslo", "NO", 59.9127, 10.7461), ("Stockholm", "SE", 59.3326, 18.0649),
+    ("Helsinki", "FI", 60.1695, 24.9354), ("Warsaw", "PL", 52.2298, 21.0118), ("Prague", "CZ", 50.0880, 14.4208),
+    ("Athens", "GR", 37.9838, 23.7278), ("New York", "US", 40.7143, -74.0060), ("Chicago", "US", 41.8500, -87.6500),
+    ("Toronto", "CA", 43.7001, -79.4163), ("Mexico City", "MX", 19.4285, -99.1277),
+    ("Sao Paulo", "BR", -23.5475, -46.6361), ("Buenos Aires", "AR", -34.6132, -58.3772),
+    ("Cairo", "EG", 30.0626, 31.2497), ("Lagos", "NG", 6.4541, 3.3947), ("Nairobi", "KE", -1.2833, 36.8167),
+    ("Mumbai", "IN", 19.0144, 72.8479), ("Delhi", "IN", 28.6667, 77.2167), ("Ahmedabad", "IN", 23.0258, 72.5873),
+    ("Tokyo", "JP", 35.6895, 139.6917), ("Seoul", "KR", 37.5660, 126.9784), ("Beijing", "CN", 39.9075, 116.3972),
+    ("Singapore", "SG", 1.2897, 103.8501), ("Sydney", "AU", -33.8679, 151.2073),
+    ("Auckland", "NZ", -36.8485, 174.7633),
+]
+CONDITIONS = [("Clear", "clear sky"), ("Clouds", "scattered clouds"), ("Rain", "light rain"),
+              ("Drizzle", "light intensity drizzle"), ("Thunderstorm", "thunderstorm"), ("Snow", "light snow"),
+              ("Mist", "mist")]
+
+
+def build_cities(extra=0):
+    """{normalized name: city dict} of the stub's cities, with ids like OpenWeatherMap's"""
+    cities = list(CITIES) + [(f"Stubtown {i}", "ZZ", (i % 180) - 90.0, (i * 7 % 360) - 180.0)
+                             for i in range(1, extra + 1)]
+    return {name.casefold(): {'id': 1000 + i, 'name': name, 'country': country, 'lat': lat, 'lon': lon}
+            for i, (name, country, lat, lon) in enumerate(cities)}
+
+
+def weather_for(city, now=None):
+    """Deterministic fake reply for a city; it changes every ten minutes"""
+    bucket = int((now or time.time()) // 600)
+    seed = zlib.crc32(f"{city['name']}:{bucket}".encode())
+    main, description = CONDITIONS[seed % len(CONDITIONS)]
+    temp = round(-5 + (seed >> 8) % 400 / 10, 2)
+    return {
+        'coord': {'lon': city['lon'], 'lat': city['lat']},
+        'weather': [{'main': main, 'description': description}],
+        'main': {'temp': temp, 'feels_like': round(temp - 1.5, 2), 'humidity': 30 + seed % 60,
+                 'pressure': 990 + (seed >> 4) % 40},
+        'wind': {'speed': round((seed >> 12) % 150 / 10, 1)},
+        'sys': {'country': city['country']},
+        'dt': bucket * 600,
+        'id': city['id'],
+        'name': city['name'],
+        'cod': 200,
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None, conditional=False):
+        body = json.dumps(payload).encode()
+        if conditional:
+            etag = f'"{zlib.crc32(body):08x}"'
+            headers = dict(headers or {}, ETag=etag)
+            if self.headers.get('If-None-Match') == etag:
+                with self.server.lock:
+                    self.server.requests['not_modified'] = self.server.requests.get('not_modified', 0) + 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        endpoint = url.path.rsplit('/', 1)[-1]
+        with server.lock:
+            server.requests[endpoint] = server.requests.get(endpoint, 0) + 1
+
+        if endpoint == 'stats':
+            with server.lock:
+                return self.send_json(200, dict(server.requests))
+        retry_after = server.throttle()
+        if retry_after:
+            return self.send_json(429, {'cod': 429, 'message': 'rate limit exceeded'},
+                                  {'Retry-After': str(retry_after)})
+        if server.delay:
+            time.sleep(server.delay)
+
+        if endpoint == 'weather':
+            if 'id' in query:
+                city_id = query['id'][0]
+                city = server.by_id.get(int(city_id)) if city_id.isdigit() else None
+            else:
+                name = ' '.join(query.get('q', [''])[0].split(',')[0].split()).casefold()
+                city = server.cities.get(name)
+            if city is None:
+                return self.send_json(404, {'cod': '404', 'message': 'city not found'})
+            return self.send_json(200, weather_for(city), conditional=True)
+        if endpoint == 'group' and server.group:
+            try:
+                ids = [int(value) for value in query.get('id', [''])[0].split(',')]
+            except ValueError:
+                return self.send_json(400, {'cod': '400', 'message': 'bad id list'})
+            if len(ids) > 20:
+                return self.send_json(400, {'cod': '400', 'message': 'too many ids'})
+            found = [weather_for(server.by_id[city_id]) for city_id in ids if city_id in server.by_id]
+            return self.send_json(200, {'cnt': len(found), 'list': found})
+        self.send_json(404, {'cod': '404', 'message': 'unknown endpoint'})
+
+
+class StubServer(ThreadingHTTPServer):
+    """Local stand-in for the OpenWeatherMap API (/weather and /group); counts requests per endpoint at /stats.
+
+    /weather replies carry an ETag and honour If-None-Match. With a quota,
+    calls beyond that many per minute get 429 with a Retry-After header.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, delay=0.0, extra_cities=0, group=True, quota=0):
+        super().__init__(address, StubHandler)
+        self.delay = delay
+        self.group = group
+        self.quota = quota
+        self.calls = deque()
+        self.cities = build_cities(extra_cities)
+        self.by_id = {city['id']: city for city in self.cities.values()}
+        self.requests = {}
+        self.lock = threading.Lock()
+
+    def throttle(self):
+        """Seconds to wait if this call is over the per-minute quota, else 0"""
+        if not self.quota:
+            return 0
+        now = time.monotonic()
+        with self.lock:
+            while self.calls and self.calls[0] <= now - 60:
+                self.calls.popleft()
+            if len(self.calls) >= self.quota:
+                self.requests['rate_limited'] = self.requests.get('rate_limited', 0) + 1
+                return int(self.calls[0] + 60 - now) + 1
+            self.calls.append(now)
+        return 0
+
+    def handle_error(self, request, client_address):
+        # Clients that time out or cancel hang up before a delayed reply is sent
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/data/2.5"
+
+
+def start_stub(port=0, **options):
+    """Run a stub server on a background thread; returns it (call shutdown() to stop)"""
+    server = StubServer(('127.0.0.1', port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the OpenWeatherMap API for testing")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.0, help="seconds to wait before every reply")
+    parser.add_argument('--cities', type=int, default=0, help="extra synthetic cities (Stubtown 1..N)")
+    parser.add_argument('--no-group', action='store_true', help="answer /group with 404, like a provider without it")
+    parser.add_argument('--quota', type=int, default=0, help="calls allowed per minute before 429s (0: unlimited)")
+    parser.add_argument('--city-list', metavar='PATH', help="write the stub's cities as a city.list.json and exit")
+    args = parser.parse_args()
+
+    if args.city_list:
+        with open(args.city_list, 'w', encoding='utf-8') as f:
+            json.dump([{'id': city['id'], 'name': city['name'], 'country': city['country'],
+                        'coord': {'lon': city['lon'], 'lat': city['lat']}}
+                       for city in build_cities(args.cities).values()], f)
+        return
+
+    server = StubServer(('127.0.0.1', args.port), args.delay, args.cities, not args.no_group, args.quota)
+    print(f"Stub weather API on {server.url} (set WEATHER_API_URL to this)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()